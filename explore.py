@@ -1,5 +1,5 @@
-import pandas as pd
-df = pd.read_csv("dataset/TMDB_movie_dataset_v11.csv")
+from tmdb_cache import load_dataset
+df = load_dataset("dataset/TMDB_movie_dataset_v11.csv")
 
 print(df.dtypes)
 
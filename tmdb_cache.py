@@ -0,0 +1,201 @@
+"""
+Columnar cache for the TMDB CSV.
+
+The CSV is parsed once with Arrow's multi-threaded reader and stored as Parquet
+next to the source file. The cache is keyed by the source file's size, mtime and
+SHA-256, so it is rebuilt only when the CSV actually changes. Later loads read
+only the projected columns with their types already resolved.
+
+Values read back through the cache match pd.read_csv: empty cells and the usual
+NA markers become NaN, and text columns stay plain object columns.
+
+pyarrow is optional - without it every call falls back to pd.read_csv.
+"""
+
+import hashlib
+import json
+import os
+import time
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+
+TMDB_COLUMN_TYPES = {
+    'id': 'int64',
+    'vote_average': 'float64',
+    'vote_count': 'int64',
+    'revenue': 'int64',
+    'runtime': 'int64',
+    'budget': 'int64',
+    'popularity': 'float64',
+    'adult': 'bool_',
+}
+
+# pd.read_csv's default NA markers, so both paths agree on what counts as missing
+NA_VALUES = ['', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND',
+             '1.#QNAN', '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null']
+
+ROW_GROUP_SIZE = 64 * 1024
+
+
+class DatasetCache:
+
+    def __init__(self, csv_path: str, cache_dir: Optional[str] = None):
+        self.csv_path = csv_path
+        self.cache_dir = cache_dir or os.path.join(os.path.dirname(os.path.abspath(csv_path)), '.cache')
+        name = os.path.basename(csv_path)
+        self.parquet_path = os.path.join(self.cache_dir, f"{name}.parquet")
+        self.manifest_path = os.path.join(self.cache_dir, f"{name}.manifest.json")
+        self._sha256 = None
+
+    @staticmethod
+    def available() -> bool:
+        return pa is not None
+
+    def _file_sha256(self) -> str:
+        if self._sha256 is None:
+            digest = hashlib.sha256()
+            with open(self.csv_path, 'rb') as f:
+                for block in iter(lambda: f.read(1024 * 1024), b''):
+                    digest.update(block)
+            self._sha256 = digest.hexdigest()
+        return self._sha256
+
+    def _read_manifest(self) -> Dict:
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_manifest(self, manifest: Dict):
+        tmp_path = self.manifest_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    def source_hash(self) -> str:
+        """SHA-256 of the CSV, reused from the manifest while size and mtime are unchanged"""
+        stat = os.stat(self.csv_path)
+        manifest = self._read_manifest()
+        if manifest.get('size') == stat.st_size and manifest.get('mtime_ns') == stat.st_mtime_ns:
+            return manifest['sha256']
+        return self._file_sha256()
+
+    def is_valid(self) -> bool:
+        if not os.path.exists(self.parquet_path):
+            return False
+
+        manifest = self._read_manifest()
+        stat = os.stat(self.csv_path)
+        if manifest.get('size') == stat.st_size and manifest.get('mtime_ns') == stat.st_mtime_ns:
+            return True
+
+        # size/mtime moved (e.g. the file was copied or touched) - fall back to the content hash
+        if manifest.get('size') == stat.st_size and manifest.get('sha256') == self._file_sha256():
+            manifest['mtime_ns'] = stat.st_mtime_ns
+            self._write_manifest(manifest)
+            return True
+
+        return False
+
+    def _convert_options(self, column_names: List[str]):
+        column_types = {name: getattr(pa, TMDB_COLUMN_TYPES.get(name, 'string'))() for name in column_names}
+        return pa_csv.ConvertOptions(column_types=column_types, null_values=NA_VALUES,
+                                     strings_can_be_null=True, quoted_strings_can_be_null=True)
+
+    def _write_in_memory(self, convert_options, tmp_path: str) -> int:
+        table = pa_csv.read_csv(self.csv_path, read_options=pa_csv.ReadOptions(use_threads=True),
+                                convert_options=convert_options)
+        pq.write_table(table, tmp_path, row_group_size=ROW_GROUP_SIZE)
+        return table.num_rows
+
+    def _write_streaming(self, convert_options, tmp_path: str) -> int:
+        reader = pa_csv.open_csv(self.csv_path, read_options=pa_csv.ReadOptions(use_threads=True),
+                                 convert_options=convert_options)
+        rows = 0
+        with pq.ParquetWriter(tmp_path, reader.schema) as writer:
+            for batch in reader:
+                writer.write_batch(batch, row_group_size=ROW_GROUP_SIZE)
+                rows += batch.num_rows
+        return rows
+
+    def build(self, streaming: bool = False):
+        """Parses the CSV with Arrow's multi-threaded reader and writes the Parquet cache.
+
+        With streaming=True the CSV is converted block by block, so memory stays flat
+        at the cost of some parallelism.
+        """
+        print(f"Building columnar cache: {self.parquet_path}")
+        os.makedirs(self.cache_dir, exist_ok=True)
+        start = time.perf_counter()
+
+        column_names = pd.read_csv(self.csv_path, nrows=0).columns.tolist()
+        write = self._write_streaming if streaming else self._write_in_memory
+        tmp_path = self.parquet_path + '.tmp'
+
+        try:
+            rows = write(self._convert_options(column_names), tmp_path)
+        except pa.ArrowInvalid as e:
+            print(f"  Typed parse failed ({str(e)[:100]}), falling back to inferred types")
+            rows = write(pa_csv.ConvertOptions(null_values=NA_VALUES, strings_can_be_null=True,
+                                               quoted_strings_can_be_null=True), tmp_path)
+
+        os.replace(tmp_path, self.parquet_path)
+
+        stat = os.stat(self.csv_path)
+        self._write_manifest({
+            'source': os.path.abspath(self.csv_path),
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'sha256': self._file_sha256(),
+            'rows': rows,
+            'built_at': time.strftime('%Y-%m-%d %H:%M:%S')
+        })
+
+        print(f"  Cached {rows:,} rows in {time.perf_counter() - start:.1f}s")
+
+    def ensure(self, streaming: bool = False):
+        if not self.is_valid():
+            self.build(streaming)
+
+    @staticmethod
+    def _to_pandas(table) -> pd.DataFrame:
+        df = table.to_pandas(use_threads=True)
+        # Arrow hands back None for missing strings where read_csv gives NaN
+        for name in df.columns[df.dtypes == object]:
+            column = df[name]
+            df[name] = column.where(column.notna(), np.nan)
+        return df
+
+    def load(self, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """Reads the dataset (optionally only the given columns) through the cache"""
+        if not self.available():
+            return pd.read_csv(self.csv_path, usecols=columns)
+
+        self.ensure()
+        return self._to_pandas(pq.read_table(self.parquet_path, columns=columns, use_threads=True))
+
+    def iter_chunks(self, chunk_size: int, columns: Optional[List[str]] = None) -> Iterator[pd.DataFrame]:
+        """Yields the dataset in chunks of chunk_size rows without materializing the whole file"""
+        if not self.available():
+            yield from pd.read_csv(self.csv_path, usecols=columns, chunksize=chunk_size)
+            return
+
+        self.ensure(streaming=True)
+        parquet_file = pq.ParquetFile(self.parquet_path)
+        for batch in parquet_file.iter_batches(batch_size=chunk_size, columns=columns, use_threads=True):
+            yield self._to_pandas(pa.Table.from_batches([batch]))
+
+
+def load_dataset(csv_path: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    return DatasetCache(csv_path).load(columns)
@@ -0,0 +1,518 @@
+"""
+Loading machinery shared by the v1 and v2 init_db.py loaders.
+
+ChunkedLoader runs the two-stage pipeline: a process pool transforms CSV chunks,
+writer threads insert or upsert them through one pooled MongoClient. Transformed
+chunks pass through a bounded queue, so a slow MongoDB blocks the transform stage
+instead of letting finished documents pile up in memory.
+
+A loader subclass supplies the schema side: how a chunk is transformed
+(_submit_chunk) and how one transformed chunk is written (_write_transformed).
+Everything else - deduplication, pool metrics, incremental upserts by content
+hash, failed-chunk accounting and the import_state record - lives here, so a fix
+reaches both loaders.
+
+Both loaders also bump the shared data generation (data_generation collection)
+around every load; the v2 query cache and columnar store key on it.
+"""
+
+import hashlib
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from queue import Queue
+from threading import Lock, Thread, local
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+from pymongo import MongoClient, ReplaceOne, ReturnDocument, monitoring
+from pymongo.errors import BulkWriteError
+
+from tmdb_cache import DatasetCache
+
+
+GENERATION_COLLECTION = 'data_generation'
+GENERATION_ID = 'data'
+
+
+def bump_generation(db) -> int:
+    """Called by a loader before and after it writes; every cached result keyed on an older generation goes dead"""
+    state = db[GENERATION_COLLECTION].find_one_and_update(
+        {'_id': GENERATION_ID},
+        {'$inc': {'generation': 1}, '$set': {'updated_at': time.strftime('%Y-%m-%d %H:%M:%S')}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    return state['generation']
+
+
+def current_generation(db) -> int:
+    state = db[GENERATION_COLLECTION].find_one({'_id': GENERATION_ID}, {'generation': 1})
+    return state['generation'] if state else 0
+
+
+class StreamingDeduplicator:
+    """Keeps the best-scoring row per TMDB id while rows stream past.
+
+    The winners live in three parallel numpy arrays sorted by id - id, score and
+    row number, 24 bytes per unique id - instead of a dict of tuples, which measured
+    about 170 bytes per id. A later row replaces the current winner only with a
+    strictly higher score, so ties go to the first row in file order - the same
+    winner the stable sort in the old _clean_duplicates picked.
+    """
+
+    def __init__(self):
+        self.ids = np.empty(0, dtype=np.int64)
+        self.scores = np.empty(0, dtype=np.float64)
+        self.rows = np.empty(0, dtype=np.int64)
+        self.missing = None         # (score, row) of the winner among rows without an id
+        self.rows_seen = 0
+
+    def update(self, ids, scores):
+        """Feeds the next block of rows; ids and scores are aligned sequences in file order"""
+        block = pd.DataFrame({'id': ids, 'score': scores})
+        block.index = pd.RangeIndex(self.rows_seen, self.rows_seen + len(block))
+        self.rows_seen += len(block)
+
+        # reduce the block to one candidate per id first, then merge candidates into the arrays
+        candidates = block.loc[block.groupby('id', sort=False, dropna=False)['score'].idxmax()]
+        missing = candidates['id'].isna().to_numpy()
+        if missing.any():                                   # all missing ids share one slot
+            score, row = float(candidates['score'].to_numpy()[missing][0]), int(candidates.index[missing][0])
+            if self.missing is None or score > self.missing[0]:
+                self.missing = (score, row)
+            candidates = candidates[~missing]
+
+        cand_ids = candidates['id'].to_numpy(dtype=np.int64)
+        cand_scores = candidates['score'].to_numpy(dtype=np.float64)
+        cand_rows = candidates.index.to_numpy(dtype=np.int64)
+
+        pos = np.searchsorted(self.ids, cand_ids)
+        found = pos < len(self.ids)
+        found[found] = self.ids[pos[found]] == cand_ids[found]
+
+        # ids already held: only a strictly higher score replaces the winner
+        hits = pos[found]
+        better = cand_scores[found] > self.scores[hits]
+        self.scores[hits[better]] = cand_scores[found][better]
+        self.rows[hits[better]] = cand_rows[found][better]
+
+        # unseen ids are inserted in place, keeping self.ids sorted for searchsorted
+        new = ~found
+        if new.any():
+            order = np.argsort(cand_ids[new], kind='stable')
+            at = pos[new][order]
+            self.ids = np.insert(self.ids, at, cand_ids[new][order])
+            self.scores = np.insert(self.scores, at, cand_scores[new][order])
+            self.rows = np.insert(self.rows, at, cand_rows[new][order])
+
+    @property
+    def unique_count(self) -> int:
+        return len(self.ids) + (self.missing is not None)
+
+    @property
+    def removed_count(self) -> int:
+        return self.rows_seen - self.unique_count
+
+    def keep_mask(self) -> np.ndarray:
+        mask = np.zeros(self.rows_seen, dtype=bool)
+        mask[self.rows] = True
+        if self.missing is not None:
+            mask[self.missing[1]] = True
+        return mask
+
+
+class PoolMetricsListener(monitoring.ConnectionPoolListener):
+    """Collects connection pool statistics (checkouts, wait time, connections opened) for a load"""
+
+    def __init__(self):
+        self.lock = Lock()
+        self.pending = local()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.connections_created = 0
+            self.connections_closed = 0
+            self.checkouts = 0
+            self.checkout_failures = 0
+            self.total_wait_ms = 0.0
+            self.max_wait_ms = 0.0
+
+    def _finish_wait(self) -> float:
+        started = getattr(self.pending, 'started', None)
+        self.pending.started = None
+        return (time.perf_counter() - started) * 1000 if started is not None else 0.0
+
+    def connection_check_out_started(self, event):
+        self.pending.started = time.perf_counter()
+
+    def connection_checked_out(self, event):
+        wait_ms = self._finish_wait()
+        with self.lock:
+            self.checkouts += 1
+            self.total_wait_ms += wait_ms
+            self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+
+    def connection_check_out_failed(self, event):
+        self._finish_wait()
+        with self.lock:
+            self.checkout_failures += 1
+
+    def connection_created(self, event):
+        with self.lock:
+            self.connections_created += 1
+
+    def connection_closed(self, event):
+        with self.lock:
+            self.connections_closed += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_checked_in(self, event):
+        pass
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def report(self):
+        avg_wait = self.total_wait_ms / self.checkouts if self.checkouts else 0.0
+        print(f"\nConnection pool:")
+        print(f"  Connections opened: {self.connections_created:,} (closed: {self.connections_closed:,})")
+        print(f"  Checkouts: {self.checkouts:,} (failed: {self.checkout_failures:,})")
+        print(f"  Checkout wait: avg {avg_wait:.2f}ms | max {self.max_wait_ms:.2f}ms | total {self.total_wait_ms:.0f}ms")
+
+
+class ChunkedLoader:
+    """Base class of the init_db.py loaders; collection_name keys the import state"""
+
+    SCORE_COLUMNS = ['id', 'imdb_id', 'release_date', 'overview', 'revenue', 'vote_count']
+    DOCUMENT_OVERHEAD = 3       # transformed documents take roughly 3x the chunk's DataFrame memory
+    IMPORT_STATE_COLLECTION = 'import_state'
+
+    def __init__(self, csv_path, connection_string='mongodb://localhost:27017/',
+                 database_name='SBP_DB', collection_name='movies',
+                 streaming=False, chunk_size=10000, max_memory_mb=None,
+                 num_workers=None, num_writers=4, queue_size=8, max_pool_size=10,
+                 incremental=False, delete_missing=False, use_cache=True):
+
+        self.csv_path = csv_path
+        self.connection_string = connection_string
+        self.database_name = database_name
+        self.collection_name = collection_name
+        self.batch_size = chunk_size
+        self.num_workers = num_workers or os.cpu_count() or 1
+        self.num_writers = num_writers
+        self.queue_size = queue_size
+        self.streaming = streaming
+        self.max_memory_mb = max_memory_mb
+        self.max_pool_size = max_pool_size
+        self.incremental = incremental
+        self.delete_missing = delete_missing
+        self.seen_ids = set()
+        self.cache = DatasetCache(csv_path) if use_cache else None
+        self.pool_metrics = PoolMetricsListener()
+
+        self.client = None
+        self.db = None
+        self.collection = None
+        self.lock = Lock()
+
+    def connect(self) -> bool:
+        try:
+            print("Connecting to MongoDB...")
+            self.client = MongoClient(self.connection_string, maxPoolSize=self.max_pool_size,
+                                      event_listeners=[self.pool_metrics])
+            self.db = self.client[self.database_name]
+            self.client.admin.command('ping')
+            print(f"Connected to database: {self.database_name}")
+            return True
+        except Exception as e:
+            print(f"Connection failed: {type(e).__name__}: {str(e)}")
+            return False
+
+    def _read_dataset(self, columns=None) -> pd.DataFrame:
+        if self.cache:
+            return self.cache.load(columns)
+        return pd.read_csv(self.csv_path, usecols=columns)
+
+    def _iter_dataset(self, columns=None):
+        if self.cache:
+            return self.cache.iter_chunks(self.batch_size, columns)
+        return pd.read_csv(self.csv_path, usecols=columns, chunksize=self.batch_size)
+
+    @staticmethod
+    def _completeness_score(df: pd.DataFrame) -> pd.Series:
+        return (
+            df['imdb_id'].notna().astype(int) * 10 +
+            df['release_date'].notna().astype(int) * 5 +
+            df['overview'].notna().astype(int) * 3 +
+            df['revenue'].fillna(0).astype(bool).astype(int) * 2 +
+            df['vote_count'].fillna(0).astype(int) / 100
+        )
+
+    def _max_inflight_chunks(self, chunk: pd.DataFrame) -> int:
+        """Number of chunks allowed in flight so that buffered data stays under max_memory_mb"""
+        limit = self.num_workers * 2
+        if not self.max_memory_mb:
+            return limit
+
+        chunk_bytes = int(chunk.memory_usage(deep=True).sum()) * self.DOCUMENT_OVERHEAD
+        budget = int(self.max_memory_mb * 1024 * 1024 // max(chunk_bytes, 1))
+        return max(1, min(limit, budget))
+
+    # --- hooks a loader overrides ---
+
+    def _submit_chunk(self, executor: ProcessPoolExecutor, chunk: pd.DataFrame):
+        """Submits the transform of one CSV chunk to the process pool, returns the future"""
+        raise NotImplementedError
+
+    def _write_transformed(self, result, write, stats: dict) -> Tuple[List[dict], int]:
+        """Writes one transformed chunk with write(collection, movies); returns (write results, transform errors)"""
+        raise NotImplementedError
+
+    def _on_transformed(self, result):
+        pass
+
+    def _skip_chunk(self, chunk_idx: int, chunk: pd.DataFrame, stats: dict) -> bool:
+        return False
+
+    def _commit_chunk(self, chunk_idx: int):
+        pass
+
+    def _new_stats(self) -> dict:
+        return {'inserted': 0, 'updated': 0, 'unchanged': 0, 'duplicates': 0, 'errors': 0, 'chunks': 0, 'failed_chunks': 0}
+
+    def _documents_done(self, stats: dict) -> int:
+        return stats['inserted'] + stats['updated'] + stats['unchanged']
+
+    def _change_tracker(self, collection):
+        """Object with projection() and track(doc) told about every changed or deleted document, or None"""
+        return None
+
+    def _import_details(self, stats: dict) -> dict:
+        """Extra fields for the import_state record"""
+        return {}
+
+    # --- writes ---
+
+    def _write_chunk(self, collection, movies) -> dict:
+        """Inserts one chunk through the shared, pooled client"""
+        try:
+            collection.insert_many(movies, ordered=False)
+            return {'inserted': len(movies)}
+        except BulkWriteError as e:
+            details = e.details
+            write_errors = details.get('writeErrors', [])
+            duplicates = sum(1 for err in write_errors if err.get('code') == 11000)
+            return {
+                'inserted': details.get('nInserted', 0),
+                'duplicates': duplicates,
+                'errors': len(write_errors) - duplicates
+            }
+
+    def _upsert_chunk(self, collection, movies) -> dict:
+        """Incremental write: upserts only documents whose content_hash is new or changed"""
+        ids = [movie['_id'] for movie in movies]
+        tracker = self._change_tracker(collection)
+        projection = {'content_hash': 1}
+        if tracker:
+            projection.update(tracker.projection())       # old key values, to refresh whatever they leave
+        stored = {doc['_id']: doc for doc in collection.find({'_id': {'$in': ids}}, projection)}
+
+        changed = [movie for movie in movies if stored.get(movie['_id'], {}).get('content_hash') != movie['content_hash']]
+        operations = [ReplaceOne({'_id': movie['_id']}, movie, upsert=True) for movie in changed]
+        result = {'unchanged': len(movies) - len(operations)}
+
+        if tracker:
+            for movie in changed:
+                tracker.track(movie)
+                if movie['_id'] in stored:
+                    tracker.track(stored[movie['_id']])
+
+        if not operations:
+            return result
+
+        try:
+            write_result = collection.bulk_write(operations, ordered=False)
+            result['inserted'] = write_result.upserted_count
+            result['updated'] = write_result.modified_count
+        except BulkWriteError as e:
+            details = e.details
+            result['inserted'] = details.get('nUpserted', 0)
+            result['updated'] = details.get('nModified', 0)
+            result['errors'] = len(details.get('writeErrors', []))
+
+        return result
+
+    def _write_batch(self, write, collection, movies) -> dict:
+        """Runs one write, turning an exception into errors for the whole batch"""
+        try:
+            return write(collection, movies)
+        except Exception as e:
+            print(f"Chunk write error ({collection.name}): {type(e).__name__}: {str(e)}")
+            return {'errors': len(movies)}
+
+    def _delete_vanished(self, collection) -> int:
+        """Removes movies whose TMDB id no longer appears in the source file"""
+        tracker = self._change_tracker(collection)
+        projection = tracker.projection() if tracker else {'_id': 1}
+        vanished = []
+
+        for doc in collection.find({}, projection):
+            if doc['_id'] not in self.seen_ids:
+                vanished.append(doc['_id'])
+                if tracker:
+                    tracker.track(doc)
+
+        deleted = 0
+        for start in range(0, len(vanished), self.batch_size):
+            result = collection.delete_many({'_id': {'$in': vanished[start:start + self.batch_size]}})
+            deleted += result.deleted_count
+
+        return deleted
+
+    # --- pipeline ---
+
+    def _writer_loop(self, write_queue: Queue, stats: dict, total_rows: int):
+        """I/O stage: takes transformed chunks off the queue and writes them"""
+        write = self._upsert_chunk if self.incremental else self._write_chunk
+
+        while True:
+            item = write_queue.get()
+            if item is None:
+                break
+
+            chunk_idx, transformed = item
+            try:
+                results, transform_errors = self._write_transformed(transformed, write, stats)
+
+                if any(result.get('errors', 0) > 0 for result in results):
+                    with self.lock:
+                        stats['failed_chunks'] += 1     # not committed or recorded, so --resume and --incremental retry it
+                else:
+                    self._commit_chunk(chunk_idx)
+
+                with self.lock:
+                    for result in results:
+                        for key, value in result.items():
+                            stats[key] += value
+                    stats['errors'] += transform_errors
+                    stats['chunks'] += 1
+
+                    if stats['chunks'] % 10 == 0:
+                        done = self._documents_done(stats)
+                        print(f"Processed {done:,}/{total_rows:,} documents ({(done/max(total_rows, 1))*100:.1f}%)")
+            except Exception as e:
+                # a dead writer would leave the producer blocked on the bounded queue
+                print(f"Chunk write error: {type(e).__name__}: {str(e)}")
+                with self.lock:
+                    stats['failed_chunks'] += 1
+
+    def _enqueue_transformed(self, done, chunk_ids: dict, write_queue: Queue, stats: dict):
+        for future in done:
+            chunk_idx = chunk_ids.pop(future)
+            try:
+                result = future.result()
+                self._on_transformed(result)
+                write_queue.put((chunk_idx, result))
+            except Exception as e:
+                print(f"Chunk processing error: {type(e).__name__}: {str(e)}")
+                with self.lock:
+                    stats['errors'] += 1
+                    stats['failed_chunks'] += 1     # never reached a writer, so it is not committed
+
+    def _insert_chunks(self, chunks, total_rows: int) -> dict:
+        """Two-stage pipeline: a process pool transforms chunks, writer threads insert them"""
+        stats = self._new_stats()
+
+        print(f"Processing with {self.num_workers} transform processes and {self.num_writers} writer threads...")
+
+        write_queue = None
+        writers = []
+
+        with ProcessPoolExecutor(max_workers=self.num_workers) as executor:
+            pending = set()
+            chunk_ids = {}
+
+            for chunk_idx, chunk in enumerate(chunks):
+                if write_queue is None:
+                    max_inflight = self._max_inflight_chunks(chunk)
+                    print(f"Max chunks in flight: {max_inflight}")
+                    write_queue = Queue(maxsize=max(1, min(self.queue_size, max_inflight)))
+                    writers = [Thread(target=self._writer_loop, args=(write_queue, stats, total_rows), daemon=True)
+                               for _ in range(self.num_writers)]
+                    for writer in writers:
+                        writer.start()
+
+                if self.delete_missing:
+                    self.seen_ids.update(chunk['id'].tolist())
+
+                if self._skip_chunk(chunk_idx, chunk, stats):
+                    continue
+
+                future = self._submit_chunk(executor, chunk)
+                chunk_ids[future] = chunk_idx
+                pending.add(future)
+
+                while len(pending) >= max_inflight:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    self._enqueue_transformed(done, chunk_ids, write_queue, stats)
+
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                self._enqueue_transformed(done, chunk_ids, write_queue, stats)
+
+        for _ in writers:
+            write_queue.put(None)
+        for writer in writers:
+            writer.join()
+
+        done = self._documents_done(stats) + stats.get('resumed_rows', 0)
+        print(f"Processed {done:,}/{total_rows:,} documents ({(done/max(total_rows, 1))*100:.1f}%)")
+
+        return stats
+
+    # --- import state ---
+
+    def _source_fingerprint(self) -> str:
+        if self.cache:
+            return self.cache.source_hash()
+
+        digest = hashlib.sha256()
+        with open(self.csv_path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def _last_import(self) -> Dict:
+        return self.db[self.IMPORT_STATE_COLLECTION].find_one({'_id': self.collection_name}) or {}
+
+    def _record_import(self, source_hash: str, stats: dict):
+        self.db[self.IMPORT_STATE_COLLECTION].replace_one(
+            {'_id': self.collection_name},
+            {
+                '_id': self.collection_name,
+                'source_path': os.path.abspath(self.csv_path),
+                'source_hash': source_hash,
+                'mode': 'incremental' if self.incremental else 'full',
+                'completed_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+                'inserted': stats['inserted'],
+                'updated': stats['updated'],
+                'unchanged': stats['unchanged'],
+                'deleted': stats.get('deleted', 0),
+                **self._import_details(stats)
+            },
+            upsert=True
+        )
@@ -1,160 +1,174 @@
+import argparse
 import pandas as pd
-from pymongo import MongoClient
-from pymongo.errors import BulkWriteError
+import numpy as np
+import bson
+import hashlib
 import traceback
 from models import MovieDocument
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from threading import Lock
+import os
+import sys
 
-class DatabaseInitializer:
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from tmdb_loader import ChunkedLoader, StreamingDeduplicator, bump_generation
+
+
+def transform_chunk(chunk: pd.DataFrame):
+    """CPU stage, runs in a worker process: turns a CSV chunk into documents"""
+    movies = []
+    errors = 0
+    
+    for row_dict in chunk.to_dict('records'):
+        try:
+            movies.append(MovieDocument.transform(row_dict))
+        except Exception:
+            errors += 1
+    
+    return movies, errors
+
+
+def fingerprint_chunk(chunk: pd.DataFrame):
+    """Transforms a chunk and stamps every document with a hash of its content"""
+    movies, errors = transform_chunk(chunk)
+    
+    for movie in movies:
+        movie['content_hash'] = hashlib.sha1(bson.encode(movie)).hexdigest()
+    
+    return movies, errors
+
+
+class DatabaseInitializer(ChunkedLoader):
     
     def __init__(self, csv_path, connection_string='mongodb://localhost:27017/', 
-                 database_name='SBP_DB', collection_name='movies'):
-        
-        self.csv_path = csv_path
-        self.connection_string = connection_string
-        self.database_name = database_name
-        self.collection_name = collection_name
-        self.batch_size = 10000
-        self.num_workers = 8
-        
-        self.client = None
-        self.db = None
-        self.collection = None
-        self.lock = Lock()
+                 database_name='SBP_DB', collection_name='movies',
+                 streaming=False, chunk_size=10000, max_memory_mb=None,
+                 num_workers=None, num_writers=4, queue_size=8, max_pool_size=10,
+                 incremental=False, delete_missing=False, use_cache=True):
         
-    def connect(self) -> bool:
-        try:
-            print("Connecting to MongoDB...")
-            self.client = MongoClient(self.connection_string)
-            self.db = self.client[self.database_name]
-            self.client.admin.command('ping')
-            print(f"Connected to database: {self.database_name}")
-            return True
-        except Exception as e:
-            print(f"Connection failed: {type(e).__name__}: {str(e)}")
-            return False
+        super().__init__(csv_path, connection_string, database_name, collection_name,
+                         streaming=streaming, chunk_size=chunk_size, max_memory_mb=max_memory_mb,
+                         num_workers=num_workers, num_writers=num_writers, queue_size=queue_size,
+                         max_pool_size=max_pool_size, incremental=incremental,
+                         delete_missing=delete_missing, use_cache=use_cache)
     
     def _clean_duplicates(self, df: pd.DataFrame) -> pd.DataFrame:
         print("\nCleaning duplicates...")
         
-        original_count = len(df)
-        
-        df['_completeness_score'] = (
-            df['imdb_id'].notna().astype(int) * 10 +
-            df['release_date'].notna().astype(int) * 5 +
-            df['overview'].notna().astype(int) * 3 +
-            df['revenue'].fillna(0).astype(bool).astype(int) * 2 +
-            df['vote_count'].fillna(0).astype(int) / 100
-        )
-        
-        df = df.sort_values(['id', '_completeness_score'], ascending=[True, False])
-        df_clean = df.drop_duplicates(subset=['id'], keep='first')
-        df_clean = df_clean.drop(columns=['_completeness_score'])
+        dedup = StreamingDeduplicator()
+        for start in range(0, len(df), self.batch_size):
+            block = df.iloc[start:start + self.batch_size]
+            dedup.update(block['id'].to_numpy(), self._completeness_score(block).to_numpy(dtype=np.float64))
         
-        removed_count = original_count - len(df_clean)
+        df_clean = df[dedup.keep_mask()]
         
-        print(f"Original rows: {original_count:,}")
-        print(f"After deduplication: {len(df_clean):,}")
-        print(f"Removed duplicates: {removed_count:,}")
+        print(f"Original rows: {dedup.rows_seen:,}")
+        print(f"After deduplication: {dedup.unique_count:,}")
+        print(f"Removed duplicates: {dedup.removed_count:,}")
         
         return df_clean
     
-    def _process_chunk(self, chunk_data):
-        chunk_idx, start_idx, end_idx, df = chunk_data
+    def _select_streaming_winners(self) -> np.ndarray:
+        """First streaming pass: reads only the scoring columns and returns a keep-mask over CSV rows"""
+        print("\nScanning CSV for duplicates (streaming)...")
         
-        chunk = df.iloc[start_idx:end_idx]
-        movies = []
-        errors = 0
+        dedup = StreamingDeduplicator()
+        missing_imdb = 0
         
-        for row_dict in chunk.to_dict('records'):
-            try:
-                movie = MovieDocument.transform(row_dict)
-                movies.append(movie)
-            except Exception:
-                errors += 1
-                continue
+        for chunk in self._iter_dataset(self.SCORE_COLUMNS):
+            dedup.update(chunk['id'].to_numpy(), self._completeness_score(chunk).to_numpy(dtype=np.float64))
+            missing_imdb += int(chunk['imdb_id'].isna().sum())
         
-        if movies:
-            client = MongoClient(self.connection_string)
-            db = client[self.database_name]
-            collection = db[self.collection_name]
-            
-            try:
-                collection.insert_many(movies, ordered=False)
-                inserted = len(movies)
-                duplicates = 0
-                other_errors = 0
-            except BulkWriteError as e:
-                details = e.details
-                write_errors = details.get('writeErrors', [])
-                duplicates = sum(1 for err in write_errors if err.get('code') == 11000)
-                other_errors = len(write_errors) - duplicates
-                inserted = details.get('nInserted', 0)
-            finally:
-                client.close()
-            
-            return inserted, duplicates, other_errors + errors
+        print(f"Loaded {dedup.rows_seen:,} rows from CSV")
+        print(f"Unique TMDB IDs: {dedup.unique_count:,}")
+        print(f"Missing IMDB IDs: {missing_imdb:,}")
+        print(f"After deduplication: {dedup.unique_count:,}")
+        print(f"Removed duplicates: {dedup.removed_count:,}")
         
-        return 0, 0, errors
+        return dedup.keep_mask()
+    
+    def _stream_clean_chunks(self, keep_mask: np.ndarray):
+        """Second streaming pass: yields fixed-size CSV chunks restricted to the winning rows"""
+        offset = 0
+        for chunk in self._iter_dataset():
+            rows = len(chunk)
+            chunk = chunk[keep_mask[offset:offset + rows]]
+            offset += rows
+            if len(chunk):
+                yield chunk
+    
+    def _submit_chunk(self, executor, chunk: pd.DataFrame):
+        return executor.submit(fingerprint_chunk, chunk)
+    
+    def _write_transformed(self, result, write, stats: dict):
+        movies, transform_errors = result
+        results = [self._write_batch(write, self.collection, movies)] if movies else []
+        return results, transform_errors
     
     def load_movies_to_db(self) -> bool:
         try:
             print(f"Reading CSV: {self.csv_path}")
-            df = pd.read_csv(self.csv_path)
-            print(f"Loaded {len(df):,} rows from CSV")
             
-            print(f"Unique TMDB IDs: {df['id'].nunique():,}")
-            print(f"TMDB ID duplicates: {df['id'].duplicated().sum():,}")
-            print(f"Missing IMDB IDs: {df['imdb_id'].isna().sum():,}")
-            
-            df = self._clean_duplicates(df)
+            self.collection = self.db[self.collection_name]
+            source_hash = self._source_fingerprint()
             
-            total_rows = len(df)
+            if self.incremental and self._last_import().get('source_hash') == source_hash:
+                print(f"Source file unchanged since the last completed import, skipping load")
+                return True
             
-            self.collection = self.db[self.collection_name]
-            self.collection.drop()
-            print(f"Collection '{self.collection_name}' prepared")
+            if self.streaming:
+                print(f"Streaming mode: chunk size {self.batch_size:,} rows"
+                      + (f", memory ceiling {self.max_memory_mb} MB" if self.max_memory_mb else ""))
+                keep_mask = self._select_streaming_winners()
+                total_rows = int(keep_mask.sum())
+                chunks = self._stream_clean_chunks(keep_mask)
+            else:
+                df = self._read_dataset()
+                print(f"Loaded {len(df):,} rows from CSV")
+                
+                print(f"Unique TMDB IDs: {df['id'].nunique():,}")
+                print(f"TMDB ID duplicates: {df['id'].duplicated().sum():,}")
+                print(f"Missing IMDB IDs: {df['imdb_id'].isna().sum():,}")
+                
+                df = self._clean_duplicates(df)
+                
+                total_rows = len(df)
+                chunks = (df.iloc[start:start + self.batch_size] for start in range(0, total_rows, self.batch_size))
             
-            processed = 0
-            duplicate_errors = 0
-            other_errors = 0
+            bump_generation(self.db)            # cached query results from before this load are dead from here on
             
-            num_chunks = (total_rows + self.batch_size - 1) // self.batch_size
+            if self.incremental:
+                print(f"Collection '{self.collection_name}' kept for incremental load")
+            else:
+                self.collection.drop()
+                print(f"Collection '{self.collection_name}' prepared")
             
-            chunk_data_list = []
-            for chunk_idx in range(num_chunks):
-                start_idx = chunk_idx * self.batch_size
-                end_idx = min(start_idx + self.batch_size, total_rows)
-                chunk_data_list.append((chunk_idx, start_idx, end_idx, df))
+            self.seen_ids = set()
+            self.pool_metrics.reset()
+            stats = self._insert_chunks(chunks, total_rows)
             
-            print(f"Processing with {self.num_workers} workers...")
+            if self.incremental and self.delete_missing:
+                stats['deleted'] = self._delete_vanished(self.collection)
             
-            with ThreadPoolExecutor(max_workers=self.num_workers) as executor:
-                futures = {executor.submit(self._process_chunk, chunk_data): chunk_data[0] 
-                          for chunk_data in chunk_data_list}
-                
-                completed = 0
-                for future in as_completed(futures):
-                    try:
-                        inserted, dups, errors = future.result()
-                        processed += inserted
-                        duplicate_errors += dups
-                        other_errors += errors
-                        completed += 1
-                        
-                        if completed % 10 == 0 or completed == num_chunks:
-                            print(f"Processed {processed:,}/{total_rows:,} documents ({(processed/total_rows)*100:.1f}%)")
-                    except Exception as e:
-                        print(f"Chunk processing error: {type(e).__name__}: {str(e)}")
-                        other_errors += 1
+            bump_generation(self.db)            # results cached while the load was running are dead too
             
             print(f"\nImport complete:")
-            print(f"  Successfully inserted: {processed:,}")
-            if duplicate_errors > 0:
-                print(f"  Duplicates skipped: {duplicate_errors:,}")
-            if other_errors > 0:
-                print(f"  Errors: {other_errors:,}")
+            print(f"  Successfully inserted: {stats['inserted']:,}")
+            if self.incremental:
+                print(f"  Updated: {stats['updated']:,}")
+                print(f"  Unchanged: {stats['unchanged']:,}")
+                if self.delete_missing:
+                    print(f"  Deleted (no longer in source): {stats['deleted']:,}")
+            if stats['duplicates'] > 0:
+                print(f"  Duplicates skipped: {stats['duplicates']:,}")
+            if stats['errors'] > 0:
+                print(f"  Errors: {stats['errors']:,}")
+            
+            self.pool_metrics.report()
+            
+            if stats['failed_chunks'] > 0:
+                print(f"\n{stats['failed_chunks']:,} chunks failed to write - the import is not recorded, "
+                      f"run again to retry them")
+            else:
+                self._record_import(source_hash, stats)
             
             return True
             
@@ -201,12 +215,46 @@ class DatabaseInitializer:
             print(f"Verification failed: {type(e).__name__}: {str(e)}")
 
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Load the TMDB CSV into MongoDB")
+    parser.add_argument('--streaming', action='store_true',
+                        help="read, deduplicate and insert the CSV in fixed-size chunks")
+    parser.add_argument('--chunk-size', type=int, default=10000,
+                        help="rows per CSV chunk / insert batch")
+    parser.add_argument('--max-memory-mb', type=int, default=None,
+                        help="upper bound for chunk data buffered in flight")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="transform processes (default: CPU count)")
+    parser.add_argument('--writers', type=int, default=4,
+                        help="threads issuing insert_many calls")
+    parser.add_argument('--max-pool-size', type=int, default=10,
+                        help="maxPoolSize of the shared MongoClient")
+    parser.add_argument('--incremental', action='store_true',
+                        help="upsert only new or changed movies instead of dropping the collection")
+    parser.add_argument('--delete-missing', action='store_true',
+                        help="with --incremental, delete movies no longer present in the CSV")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="parse the CSV directly instead of through the Parquet cache")
+    return parser.parse_args()
+
+
 def main():
+    args = parse_args()
+    
     initializer = DatabaseInitializer(
         csv_path='../../dataset/TMDB_movie_dataset_v11.csv',
         connection_string='mongodb://localhost:27017/',
         database_name='SBP_DB',
-        collection_name='movies'
+        collection_name='movies',
+        streaming=args.streaming,
+        chunk_size=args.chunk_size,
+        max_memory_mb=args.max_memory_mb,
+        num_workers=args.workers,
+        num_writers=args.writers,
+        max_pool_size=args.max_pool_size,
+        incremental=args.incremental,
+        delete_missing=args.delete_missing,
+        use_cache=not args.no_cache
     )
     
     if not initializer.connect():
@@ -222,4 +270,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
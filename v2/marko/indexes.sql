@@ -1,3 +1,7 @@
+// Isti indeksi su deklarisani u v2/scripts/index_manager.py (OPTIMIZED_INDEXES);
+// init_db.py ih gradi automatski posle učitavanja (--index-strategy after|during|none).
+// Izmene ovde treba preneti i tamo.
+
 // ============================================================================
 // Query 1: Koliki je prosečan prihod po filmu produkcijskih kuća čiji su filmovi imali budžet veći od 50 miliona dolara?
 // ============================================================================
@@ -56,6 +60,16 @@ db.movies_optimized.createIndex(
     }
 );
 
+// Query 4 (parovi žanrova): multikey indeks nad unapred izračunatim content_info.genre_pairs
+db.movies_optimized.createIndex(
+    {
+        "financial.revenue": 1,
+        "financial.budget": 1,
+        "content_info.genre_pairs": 1
+    },
+    { name: "idx_genre_pairs" }
+);
+
 
 // ============================================================================
 // Query 5: Prosečno trajanje filma po zemlji produkcije sa ocenom iznad 7.0, uzimajući u obzir samo zemlje koje su proizvele više od
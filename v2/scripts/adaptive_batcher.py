@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Adaptive Batcher - veličina insert batch-a po bajtovima
+Deli dokumente u batch-eve po BSON veličini umesto po broju redova i
+podešava ciljnu veličinu prema izmerenoj latenciji upisa
+"""
+
+from threading import Lock
+from typing import Dict, Iterator, List
+
+
+class AdaptiveBatcher:
+    """Splits documents into bulk writes of roughly target_bytes of BSON.
+
+    The target is tuned by hill climbing on documents per second: every `window`
+    batches the throughput of the last window is compared with the previous one.
+    If it improved, the target keeps moving in the same direction, otherwise the
+    direction flips. A batch slower than max_latency_ms shrinks the target at once.
+    """
+
+    def __init__(self, target_bytes: int = 4 * 1024 * 1024, min_bytes: int = 256 * 1024,
+                 max_bytes: int = 32 * 1024 * 1024, window: int = 8, step: float = 1.25,
+                 max_latency_ms: float = 2000):
+        self.target_bytes = target_bytes
+        self.min_bytes = min_bytes
+        self.max_bytes = max_bytes
+        self.window = window
+        self.step = step
+        self.max_latency_ms = max_latency_ms
+
+        self.lock = Lock()
+        self.direction = 1
+        self.last_rate = None
+        self.best = None
+        self.history = []
+        self._reset_window()
+
+    def _reset_window(self):
+        self.window_docs = 0
+        self.window_seconds = 0.0
+        self.window_batches = 0
+
+    def _move(self, direction: int):
+        self.direction = direction
+        target = int(self.target_bytes * (self.step ** direction))
+        self.target_bytes = max(self.min_bytes, min(self.max_bytes, target))
+
+    def split(self, documents: List[Dict], sizes: List[int]) -> Iterator[List[Dict]]:
+        """Yields consecutive batches whose encoded size stays under the current target"""
+        target = self.target_bytes
+        batch = []
+        batch_bytes = 0
+
+        for document, size in zip(documents, sizes):
+            if batch and batch_bytes + size > target:
+                yield batch
+                batch = []
+                batch_bytes = 0
+            batch.append(document)
+            batch_bytes += size
+
+        if batch:
+            yield batch
+
+    def record(self, docs: int, seconds: float):
+        """Feeds back one completed bulk write"""
+        with self.lock:
+            if seconds * 1000 > self.max_latency_ms:
+                self._move(-1)
+                self.last_rate = None
+                self._reset_window()
+                return
+
+            self.window_docs += docs
+            self.window_seconds += seconds
+            self.window_batches += 1
+
+            if self.window_batches < self.window or self.window_seconds <= 0:
+                return
+
+            rate = self.window_docs / self.window_seconds
+            self.history.append({'target_bytes': self.target_bytes, 'docs_per_sec': round(rate, 1)})
+            if self.best is None or rate > self.best['docs_per_sec']:
+                self.best = self.history[-1]
+
+            direction = self.direction
+            if self.last_rate is not None and rate < self.last_rate:
+                direction = -direction
+            self.last_rate = rate
+            self._move(direction)
+            self._reset_window()
+
+    def report(self):
+        print(f"\nAdaptive batching:")
+        print(f"  Final batch target: {self.target_bytes / 1024:.0f} KB")
+        if self.best:
+            print(f"  Best window: {self.best['target_bytes'] / 1024:.0f} KB at {self.best['docs_per_sec']:,.0f} docs/sec per writer")
+        print(f"  Adjustments: {len(self.history)}")
@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Transform Benchmark - per-row vs columnar
+Poredi OptimizedMovieDocument.transform (red po red) sa transform_batch (kolonski)
+Proverava da su dokumenti bajt-identični (BSON) i meri rows/sec za oba puta
+"""
+
+import argparse
+import time
+import pandas as pd
+import bson
+
+from models import OptimizedMovieDocument
+
+
+def transform_per_row(chunk: pd.DataFrame):
+    return [OptimizedMovieDocument.transform(row) for row in chunk.to_dict('records')]
+
+
+def transform_columnar(chunk: pd.DataFrame):
+    return OptimizedMovieDocument.transform_batch(chunk)
+
+
+def measure(func, chunks, repeats: int) -> float:
+    """Returns the best rows/sec over the given number of repeats"""
+    total_rows = sum(len(chunk) for chunk in chunks)
+    best = None
+
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for chunk in chunks:
+            func(chunk)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    return total_rows / best if best > 0 else 0.0
+
+
+def verify_identical(chunks) -> int:
+    """Compares the BSON encoding of both paths, returns the number of mismatching documents"""
+    mismatches = 0
+
+    for chunk in chunks:
+        expected = transform_per_row(chunk)
+        actual = transform_columnar(chunk)
+
+        if len(expected) != len(actual):
+            print(f"  Length mismatch: {len(expected)} vs {len(actual)}")
+            return max(len(expected), len(actual))
+
+        for row_doc, batch_doc in zip(expected, actual):
+            if bson.encode(row_doc) != bson.encode(batch_doc):
+                if mismatches == 0:
+                    print(f"  First mismatch (_id={row_doc.get('_id')}):")
+                    print(f"    per-row:  {row_doc}")
+                    print(f"    columnar: {batch_doc}")
+                mismatches += 1
+
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark per-row vs columnar document transform")
+    parser.add_argument('--csv', default='../../dataset/TMDB_movie_dataset_v11.csv')
+    parser.add_argument('--rows', type=int, default=200000, help="rows read from the CSV")
+    parser.add_argument('--chunk-size', type=int, default=10000)
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"Reading {args.rows:,} rows from {args.csv}")
+    df = pd.read_csv(args.csv, nrows=args.rows)
+    chunks = [df.iloc[start:start + args.chunk_size] for start in range(0, len(df), args.chunk_size)]
+
+    print("\nVerifying documents are byte-identical...")
+    mismatches = verify_identical(chunks)
+    if mismatches:
+        print(f"  {mismatches:,} documents differ")
+    else:
+        print(f"  All {len(df):,} documents identical")
+
+    print(f"\nMeasuring ({args.repeats} repeats, chunk size {args.chunk_size:,})...")
+    row_rate = measure(transform_per_row, chunks, args.repeats)
+    batch_rate = measure(transform_columnar, chunks, args.repeats)
+
+    print(f"  Per-row transform:  {row_rate:,.0f} rows/sec")
+    print(f"  Columnar transform: {batch_rate:,.0f} rows/sec")
+    if row_rate > 0:
+        print(f"  Speedup: {batch_rate / row_rate:.2f}x")
+
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,374 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Columnar Engine - lokalni kolonski engine za Q1-Q5
+movies_optimized se jednom učita u NumPy kolone (stringovi i nizovi rečnički
+kodirani, višestruke vrednosti kao offset nizovi), sačuva kao memory-mapped
+.npy fajlovi i odgovara na Q1-Q5 bez MongoDB round trip-a i BSON dekodiranja
+"""
+
+import argparse
+import json
+import os
+import shutil
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+from pymongo import MongoClient
+
+from queries.categories import BUDGET_CATEGORIES, QUALITY_TIERS, categories_above
+from queries.query_1 import MIN_BUDGET as Q1_MIN_BUDGET
+from queries.query_3 import MIN_BUDGET as Q3_MIN_BUDGET
+from queries.query_5 import MIN_MOVIES, MIN_RATING
+from query_cache import current_generation
+
+
+# kolona -> putanja u dokumentu
+NUMERIC_FIELDS = {
+    'revenue': 'financial.revenue',
+    'budget': 'financial.budget',
+    'profit': 'financial.profit',
+    'roi': 'financial.roi',
+    'vote_average': 'ratings.vote_average',
+    'runtime': 'content_info.runtime',
+    'decade': 'release_info.decade',
+    'month': 'release_info.month'
+}
+
+# jedna vrednost po filmu, rečnički kodirana (sorted_genres se kodira kao cela kombinacija)
+CATEGORY_FIELDS = {
+    'budget_category': 'financial.budget_category',
+    'quality_tier': 'ratings.quality_tier',
+    'sorted_genres': 'content_info.sorted_genres'
+}
+
+# više vrednosti po filmu: kodovi + offset niz
+MULTI_FIELDS = {
+    'genres': 'content_info.genres',
+    'companies': 'production.companies',
+    'countries': 'production.countries'
+}
+
+
+def _get(document: Dict, path: str):
+    value = document
+    for part in path.split('.'):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+def _number(value) -> float:
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return np.nan
+    return float(value)
+
+
+class ColumnarEngine:
+    """Q1-Q5 over memory-mapped column arrays.
+
+    Every query returns the same documents as its V2 pipeline in queries/,
+    in the same shape (_id plus the $group fields).
+    """
+
+    MANIFEST = 'manifest.json'
+    QUERIES = ['query_1', 'query_2', 'query_3', 'query_4', 'query_5']
+
+    def __init__(self, path: str, columns: Dict[str, np.ndarray], manifest: Dict):
+        self.path = path
+        self.columns = columns
+        self.manifest = manifest
+        self.dictionaries = manifest['dictionaries']
+        self.rows = manifest['rows']
+
+    @classmethod
+    def build(cls, collection, path: str, generation: Optional[int] = None) -> 'ColumnarEngine':
+        """Reads the collection once and writes one .npy file per column"""
+        print(f"Building columnar store from '{collection.name}': {path}")
+        start = time.perf_counter()
+
+        projection = {field: 1 for field in list(NUMERIC_FIELDS.values()) + list(CATEGORY_FIELDS.values()) + list(MULTI_FIELDS.values())}
+        numeric = {name: [] for name in NUMERIC_FIELDS}
+        categories = {name: [] for name in CATEGORY_FIELDS}
+        category_codes = {name: {} for name in CATEGORY_FIELDS}
+        multi_values = {name: [] for name in MULTI_FIELDS}
+        multi_offsets = {name: [0] for name in MULTI_FIELDS}
+        multi_codes = {name: {} for name in MULTI_FIELDS}
+
+        for document in collection.find({}, projection, batch_size=10000):
+            for name, field in NUMERIC_FIELDS.items():
+                numeric[name].append(_number(_get(document, field)))
+
+            for name, field in CATEGORY_FIELDS.items():
+                value = _get(document, field)
+                if isinstance(value, list):
+                    value = tuple(value) if value else None
+                codes = category_codes[name]
+                categories[name].append(-1 if value is None else codes.setdefault(value, len(codes)))
+
+            for name, field in MULTI_FIELDS.items():
+                values = _get(document, field)
+                codes = multi_codes[name]
+                if isinstance(values, list):
+                    multi_values[name].extend(codes.setdefault(value, len(codes)) for value in values)
+                multi_offsets[name].append(len(multi_values[name]))
+
+        rows = len(numeric['revenue'])
+        columns = {name: np.array(values, dtype=np.float64) for name, values in numeric.items()}
+        columns.update({name: np.array(values, dtype=np.int32) for name, values in categories.items()})
+        for name in MULTI_FIELDS:
+            columns[f"{name}.values"] = np.array(multi_values[name], dtype=np.int32)
+            columns[f"{name}.offsets"] = np.array(multi_offsets[name], dtype=np.int64)
+
+        dictionaries = {name: [list(value) if isinstance(value, tuple) else value for value in codes]
+                        for name, codes in list(category_codes.items()) + list(multi_codes.items())}
+        manifest = {
+            'collection': collection.name,
+            'rows': rows,
+            'generation': generation,
+            'built_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'columns': sorted(columns),
+            'dictionaries': dictionaries
+        }
+
+        tmp_path = path.rstrip('/\\') + '.tmp'
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        for name, array in columns.items():
+            np.save(os.path.join(tmp_path, f"{name}.npy"), array)
+        with open(os.path.join(tmp_path, cls.MANIFEST), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False)
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp_path, path)
+
+        print(f"  {rows:,} movies in {time.perf_counter() - start:.1f}s")
+        return cls.open(path)
+
+    @classmethod
+    def open(cls, path: str) -> 'ColumnarEngine':
+        """Memory-maps an existing store; pages are read lazily by the OS"""
+        with open(os.path.join(path, cls.MANIFEST), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        columns = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r') for name in manifest['columns']}
+        return cls(path, columns, manifest)
+
+    @classmethod
+    def open_or_build(cls, collection, path: str, rebuild: bool = False) -> 'ColumnarEngine':
+        """Reuses the store while no load has bumped the data generation since it was built.
+
+        The generation (not the source hash) is the key, so reloading the same CSV
+        after a transform() change also rebuilds the columns.
+        """
+        generation = current_generation(collection.database)      # read before the scan, so a concurrent load invalidates the build
+
+        if not rebuild and os.path.exists(os.path.join(path, cls.MANIFEST)):
+            engine = cls.open(path)
+            if (generation > 0 and engine.manifest.get('generation') == generation
+                    and engine.rows == collection.estimated_document_count()):
+                return engine
+            print(f"Columnar store is stale, rebuilding" if generation > 0
+                  else f"No load has recorded a data generation yet, rebuilding columnar store")
+
+        return cls.build(collection, path, generation)
+
+    def _code(self, dictionary: str, value) -> int:
+        try:
+            return self.dictionaries[dictionary].index(value)
+        except ValueError:
+            return -2           # matches nothing, -1 is reserved for missing
+
+    def _explode(self, field: str, rows: np.ndarray):
+        """Row index and value code for every element of a multi-valued field ($unwind)"""
+        offsets = self.columns[f"{field}.offsets"]
+        starts = offsets[rows]
+        lengths = offsets[rows + 1] - starts
+        total = int(lengths.sum())
+
+        row_index = np.repeat(rows, lengths)
+        positions = np.arange(total) - np.repeat(np.cumsum(lengths) - lengths, lengths) + np.repeat(starts, lengths)
+        return row_index, self.columns[f"{field}.values"][positions]
+
+    def _category_mask(self, column: str, source: str, categories, threshold) -> np.ndarray:
+        """category_match on the columns: the categories above threshold, plus the strict range unless it is a boundary"""
+        names, boundary = categories_above(categories, threshold)
+        mask = np.isin(self.columns[column], [self._code(column, name) for name in names])
+        if not boundary:
+            mask &= self.columns[source] > threshold
+        return mask
+
+    @staticmethod
+    def _sum(groups: np.ndarray, weights: np.ndarray, size: int) -> np.ndarray:
+        return np.bincount(groups, weights=weights, minlength=size)
+
+    def query_1(self, min_budget: float = Q1_MIN_BUDGET) -> List[Dict]:
+        revenue = self.columns['revenue']
+        mask = self._category_mask('budget_category', 'budget', BUDGET_CATEGORIES, min_budget) & (revenue > 0)
+
+        row_index, companies = self._explode('companies', np.flatnonzero(mask))
+        size = len(self.dictionaries['companies'])
+        total_revenue = self._sum(companies, revenue[row_index], size)
+        total_movies = np.bincount(companies, minlength=size)
+
+        present = np.flatnonzero(total_movies)
+        avg_revenue = total_revenue[present] / total_movies[present]
+        top = present[np.argsort(-avg_revenue, kind='stable')[:20]]
+
+        return [{
+            '_id': self.dictionaries['companies'][code],
+            'avg_revenue': float(total_revenue[code] / total_movies[code]),
+            'total_movies': int(total_movies[code]),
+            'total_revenue': int(total_revenue[code])
+        } for code in top]
+
+    def query_2(self) -> List[Dict]:
+        decade = self.columns['decade']
+        vote_average = self.columns['vote_average']
+        mask = ~np.isnan(decade) & (vote_average > 0)
+
+        row_index, genres = self._explode('genres', np.flatnonzero(mask))
+        decades, decade_index = np.unique(decade[row_index], return_inverse=True)
+        groups = genres.astype(np.int64) * len(decades) + decade_index
+        size = len(self.dictionaries['genres']) * len(decades)
+        rating_sum = self._sum(groups, vote_average[row_index], size)
+        movie_count = np.bincount(groups, minlength=size)
+
+        names = self.dictionaries['genres']
+        present = sorted(np.flatnonzero(movie_count).tolist(),
+                         key=lambda group: (names[group // len(decades)], decades[group % len(decades)]))
+
+        return [{
+            '_id': {'genre': names[group // len(decades)], 'decade': int(decades[group % len(decades)])},
+            'avg_rating': float(rating_sum[group] / movie_count[group]),
+            'movie_count': int(movie_count[group])
+        } for group in present]
+
+    def query_3(self, min_budget: float = Q3_MIN_BUDGET) -> List[Dict]:
+        month = self.columns['month']
+        mask = self._category_mask('budget_category', 'budget', BUDGET_CATEGORIES, min_budget) & ~np.isnan(month)
+
+        months, groups = np.unique(month[mask], return_inverse=True)
+        count = np.bincount(groups, minlength=len(months))
+        budget_sum = self._sum(groups, self.columns['budget'][mask], len(months))
+        total_revenue = self._sum(groups, self.columns['revenue'][mask], len(months))
+
+        return [{
+            '_id': int(months[group]),
+            'blockbuster_count': int(count[group]),
+            'avg_budget': float(budget_sum[group] / count[group]),
+            'total_revenue': int(total_revenue[group])
+        } for group in np.argsort(-count, kind='stable')]
+
+    def query_4(self) -> List[Dict]:
+        combination = self.columns['sorted_genres']
+        mask = (self.columns['revenue'] > 0) & (self.columns['budget'] > 0) & (combination >= 0)
+
+        groups = combination[mask]
+        size = len(self.dictionaries['sorted_genres'])
+        movie_count = np.bincount(groups, minlength=size)
+        total_profit = self._sum(groups, self.columns['profit'][mask], size)
+        roi_sum = self._sum(groups, self.columns['roi'][mask], size)
+
+        present = np.flatnonzero(movie_count >= 10)
+        avg_profit = total_profit[present] / movie_count[present]
+        top = present[np.argsort(-avg_profit, kind='stable')[:20]]
+
+        return [{
+            '_id': self.dictionaries['sorted_genres'][code],
+            'avg_profit': float(total_profit[code] / movie_count[code]),
+            'avg_roi': float(roi_sum[code] / movie_count[code]),
+            'total_profit': int(total_profit[code]),
+            'movie_count': int(movie_count[code])
+        } for code in top]
+
+    def query_5(self, min_rating: float = MIN_RATING, min_movies: int = MIN_MOVIES) -> List[Dict]:
+        runtime = self.columns['runtime']
+        mask = self._category_mask('quality_tier', 'vote_average', QUALITY_TIERS, min_rating) & (runtime > 0)
+
+        row_index, countries = self._explode('countries', np.flatnonzero(mask))
+        size = len(self.dictionaries['countries'])
+        movie_count = np.bincount(countries, minlength=size)
+        runtime_sum = self._sum(countries, runtime[row_index], size)
+        rating_sum = self._sum(countries, self.columns['vote_average'][row_index], size)
+
+        present = np.flatnonzero(movie_count >= min_movies)
+        avg_runtime = runtime_sum[present] / movie_count[present]
+        top = present[np.argsort(-avg_runtime, kind='stable')[:20]]
+
+        return [{
+            '_id': self.dictionaries['countries'][code],
+            'avg_runtime': float(runtime_sum[code] / movie_count[code]),
+            'movie_count': int(movie_count[code]),
+            'avg_rating': float(rating_sum[code] / movie_count[code])
+        } for code in top]
+
+    def run(self, query_name: str, **params) -> List[Dict]:
+        return getattr(self, query_name)(**params)
+
+
+def _normalize(rows: List[Dict]) -> List[str]:
+    """Order-insensitive, float-tolerant form of a result set ($sort ties have no fixed order)"""
+    def rounded(value):
+        if isinstance(value, float):
+            return round(value, 6)
+        if isinstance(value, dict):
+            return {key: rounded(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [rounded(item) for item in value]
+        return value
+    return sorted(json.dumps(rounded(row), sort_keys=True, default=str) for row in rows)
+
+
+def verify(engine: ColumnarEngine, collection) -> int:
+    """Runs every query on both sides, returns the number of queries whose results differ"""
+    from queries.query_1 import QUERY_1_V2
+    from queries.query_2 import QUERY_2_V2
+    from queries.query_3 import QUERY_3_V2
+    from queries.query_4 import QUERY_4_V2
+    from queries.query_5 import QUERY_5_V2
+
+    pipelines = {'query_1': QUERY_1_V2, 'query_2': QUERY_2_V2, 'query_3': QUERY_3_V2, 'query_4': QUERY_4_V2, 'query_5': QUERY_5_V2}
+    mismatches = 0
+
+    for query_name, pipeline in pipelines.items():
+        expected = list(collection.aggregate(pipeline, allowDiskUse=True))
+        actual = engine.run(query_name)
+        same = _normalize(expected) == _normalize(actual)
+        print(f"  {query_name}: {len(actual)} rows, {'identical' if same else 'DIFFERENT'}")
+        if not same:
+            mismatches += 1
+
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Columnar in-process engine for Q1-Q5")
+    parser.add_argument('--path', default='output/columnar', help="directory of the memory-mapped store")
+    parser.add_argument('--rebuild', action='store_true', help="rebuild the store even if it is current")
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+
+    client = MongoClient('mongodb://localhost:27017/')
+    collection = client['SBP_DB']['movies_optimized']
+
+    engine = ColumnarEngine.open_or_build(collection, args.path, args.rebuild)
+
+    print("\nVerifying results against the V2 pipelines...")
+    mismatches = verify(engine, collection)
+
+    print(f"\nTiming ({args.repeats} repeats, best):")
+    for query_name in ColumnarEngine.QUERIES:
+        best = None
+        for _ in range(args.repeats):
+            start = time.perf_counter()
+            engine.run(query_name)
+            elapsed = (time.perf_counter() - start) * 1000
+            best = elapsed if best is None else min(best, elapsed)
+        print(f"  {query_name}: {best:.2f}ms")
+
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,438 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Index Advisor - predlog indeksa po ESR pravilu
+Iz pipeline-a u queries/ (i opciono iz oblika query-ja u system.profile)
+izdvaja predikate jednakosti, sortiranja i opsega, predlaže ESR kompozitne
+i parcijalne indekse, meri ih na kopiji kolekcije preko explain-a i pravi
+rangirani plan indeksa spreman za primenu
+"""
+
+import argparse
+import json
+import os
+import statistics
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import bson
+from pymongo import MongoClient, ASCENDING
+from pymongo.errors import OperationFailure
+
+from index_manager import IndexManager, OPTIMIZED_INDEXES
+from queries import registered_queries, V2_COLLECTION
+
+
+RANGE_OPERATORS = {'$gt', '$gte', '$lt', '$lte'}
+PARTIAL_OPERATORS = RANGE_OPERATORS | {'$eq'}                       # predicates a partialFilterExpression can hold
+
+
+def extract_predicates(pipeline: List[Dict]) -> Dict:
+    """Equality, sort and range predicates of the leading $match/$sort stages.
+
+    Only those stages reach the query layer and can use an index; anything
+    after the first $unwind/$group/$addFields/... runs on the pipeline's output.
+    """
+    equality, ranges, sort = {}, {}, []
+
+    for stage in pipeline:
+        if '$match' in stage:
+            for field, condition in stage['$match'].items():
+                if field.startswith('$'):           # $and/$or/$expr are not analysed
+                    continue
+                operators = set(condition) if isinstance(condition, dict) and all(key.startswith('$') for key in condition) else {'$eq'}
+                if operators <= {'$eq', '$in'}:
+                    equality[field] = condition
+                else:
+                    ranges[field] = {'condition': condition, 'weak': not (operators & RANGE_OPERATORS)}
+        elif '$sort' in stage:
+            sort = [(field, direction) for field, direction in stage['$sort'].items() if field not in equality]
+            break
+        else:
+            break
+
+    return {'equality': equality, 'ranges': ranges, 'sort': sort}
+
+
+def referenced_fields(pipeline: List[Dict]) -> List[str]:
+    """Document fields read by the pipeline up to and including its first $group"""
+    fields = []
+    computed = set()            # fields created by $addFields/$set are not in the documents
+
+    def walk(value):
+        if isinstance(value, str) and value.startswith('$') and not value.startswith('$$'):
+            if value[1:] not in fields and value[1:].split('.')[0] not in computed:
+                fields.append(value[1:])
+        elif isinstance(value, dict):
+            for item in value.values():
+                walk(item)
+        elif isinstance(value, list):
+            for item in value:
+                walk(item)
+
+    for stage in pipeline:
+        if '$match' in stage:
+            for field in stage['$match']:
+                if not field.startswith('$') and field not in fields:
+                    fields.append(field)
+        else:
+            walk(stage)
+        for operator in ('$addFields', '$set'):
+            computed.update(stage.get(operator, {}))
+        if '$group' in stage:
+            break
+
+    return fields
+
+
+def _shape(value: Any) -> Any:
+    """Query shape: operators and field names kept, literal values replaced by their type"""
+    if isinstance(value, dict):
+        return {key: _shape(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_shape(item) for item in value]
+    return type(value).__name__
+
+
+def profiled_pipelines(db, collection_name: str, limit: int = 1000) -> List[Dict]:
+    """Distinct aggregate/find shapes recorded in system.profile for the collection"""
+    shapes = {}
+
+    for entry in db['system.profile'].find({'ns': f"{db.name}.{collection_name}"}).sort('ts', -1).limit(limit):
+        command = entry.get('command', {})
+        if 'pipeline' in command:
+            pipeline = command['pipeline']
+            if any('$merge' in stage or '$out' in stage for stage in pipeline):
+                continue
+        elif 'filter' in command:
+            pipeline = [{'$match': command['filter']}] + ([{'$sort': command['sort']}] if command.get('sort') else [])
+        else:
+            continue
+
+        key = bson.encode({'shape': _shape(pipeline)})
+        shape = shapes.setdefault(key, {'query': f"profile_{len(shapes) + 1}", 'pipeline': pipeline, 'seen': 0})
+        shape['seen'] += 1
+
+    return sorted(shapes.values(), key=lambda shape: -shape['seen'])
+
+
+def execution_stats(explain: Dict) -> Dict:
+    """executionStats of an aggregate explain, which is top-level or under the first $cursor stage"""
+    stats = explain.get('executionStats')
+    planner = explain.get('queryPlanner', {})
+    for stage in explain.get('stages', []):
+        if stats is None and '$cursor' in stage:
+            stats = stage['$cursor'].get('executionStats')
+            planner = stage['$cursor'].get('queryPlanner', {})
+
+    indexes = []
+
+    def walk(node):
+        if isinstance(node, dict):
+            if 'indexName' in node and node['indexName'] not in indexes:
+                indexes.append(node['indexName'])
+            for item in node.values():
+                walk(item)
+        elif isinstance(node, list):
+            for item in node:
+                walk(item)
+
+    walk(planner.get('winningPlan', {}))
+    stats = stats or {}
+    return {
+        'docs_examined': stats.get('totalDocsExamined', 0),
+        'keys_examined': stats.get('totalKeysExamined', 0),
+        'indexes_used': indexes
+    }
+
+
+class IndexAdvisor:
+    """Proposes ESR-ordered indexes per pipeline and verifies them on a scratch copy.
+
+    Candidates per pipeline:
+      esr      - Equality fields, then Sort fields, then Range fields; ranges
+                 ordered most selective first, unbounded ones ($ne/$exists) last
+      covering - esr plus the fields the pipeline reads up to its $group, so the
+                 scan can be covered (only without array fields)
+      partial  - esr without the scalar equality fields, which move into a
+                 partialFilterExpression
+      current  - the declared index for the query (OPTIMIZED_INDEXES), as reference
+    """
+
+    def __init__(self, source, scratch_name: Optional[str] = None, sample: Optional[int] = None, repeats: int = 3):
+        self.source = source
+        self.db = source.database
+        self.scratch = self.db[scratch_name or f"{source.name}_index_advisor"]
+        self.sample = sample
+        self.repeats = repeats
+        self.selectivity_cache = {}
+        self.array_cache = {}
+        self.total = 0
+
+    def prepare_scratch(self):
+        self.scratch.drop()
+        stages = [{'$sample': {'size': self.sample}}] if self.sample else [{'$match': {}}]
+        self.source.aggregate(stages + [{'$out': self.scratch.name}], allowDiskUse=True)
+        self.total = self.scratch.count_documents({})
+        print(f"Scratch copy '{self.scratch.name}': {self.total:,} documents")
+
+    def drop_scratch(self):
+        self.scratch.drop()
+
+    def _selectivity(self, field: str, condition: Any) -> float:
+        key = bson.encode({'field': field, 'condition': condition})
+        if key not in self.selectivity_cache:
+            matched = self.scratch.count_documents({field: condition})
+            self.selectivity_cache[key] = matched / self.total if self.total else 1.0
+        return self.selectivity_cache[key]
+
+    def _is_array(self, field: str) -> bool:
+        if field not in self.array_cache:
+            self.array_cache[field] = self.scratch.count_documents({field: {'$type': 'array'}}, limit=1) > 0
+        return self.array_cache[field]
+
+    def _limit_arrays(self, keys: List[Tuple[str, int]]) -> List[Tuple[str, int]]:
+        """A compound index may contain at most one array (multikey) field"""
+        limited, has_array = [], False
+        for field, direction in keys:
+            if self._is_array(field):
+                if has_array:
+                    continue
+                has_array = True
+            limited.append((field, direction))
+        return limited
+
+    def esr_keys(self, predicates: Dict) -> List[Tuple[str, int]]:
+        equality = sorted(predicates['equality'], key=lambda field: self._selectivity(field, predicates['equality'][field]))
+        ranges = sorted(predicates['ranges'], key=lambda field: (predicates['ranges'][field]['weak'],
+                                                                 self._selectivity(field, predicates['ranges'][field]['condition'])))
+        keys = [(field, ASCENDING) for field in equality]
+        keys += [(field, direction) for field, direction in predicates['sort'] if field not in predicates['ranges']]
+        keys += [(field, ASCENDING) for field in ranges]
+        return self._limit_arrays(keys)
+
+    def candidates(self, query_name: str, pipeline: List[Dict]) -> List[Dict]:
+        predicates = extract_predicates(pipeline)
+        esr = self.esr_keys(predicates)
+        if not esr:
+            return []
+
+        candidates = [{'kind': 'esr', 'keys': esr, 'options': {}}]
+
+        extra = [field for field in referenced_fields(pipeline) if field not in dict(esr)]
+        if extra and not any(self._is_array(field) for field in list(dict(esr)) + extra):
+            candidates.append({'kind': 'covering', 'keys': esr + [(field, ASCENDING) for field in extra], 'options': {}})
+
+        partial_filter = {}
+        for field, condition in list(predicates['equality'].items()) + [(f, r['condition']) for f, r in predicates['ranges'].items()]:
+            operators = set(condition) if isinstance(condition, dict) else {'$eq'}
+            if operators <= PARTIAL_OPERATORS:
+                partial_filter[field] = condition
+        partial_keys = [(field, direction) for field, direction in esr if field not in partial_filter]
+        if partial_filter and partial_keys:
+            candidates.append({'kind': 'partial', 'keys': partial_keys, 'options': {'partialFilterExpression': partial_filter}})
+
+        for spec in OPTIMIZED_INDEXES:
+            if spec['query'] == query_name and self.source.name == V2_COLLECTION:
+                candidates.append({'kind': 'current', 'keys': list(spec['keys']), 'options': spec.get('options', {}),
+                                   'declared_name': IndexManager.index_name(spec)})
+
+        unique = {}
+        for candidate in candidates:
+            signature = bson.encode({'keys': candidate['keys'], 'options': candidate['options']})
+            kept = unique.setdefault(signature, candidate)
+            if kept is not candidate and candidate.get('declared_name'):
+                kept['declared_name'] = candidate['declared_name']         # the declared index already is this candidate
+
+        result = list(unique.values())
+        for candidate in result:
+            candidate['name'] = f"adv_{query_name}_{candidate['kind']}"
+            candidate['predicates'] = {
+                'equality': list(predicates['equality']),
+                'sort': [field for field, _ in predicates['sort']],
+                'range': list(predicates['ranges'])
+            }
+        return result
+
+    def _measure(self, pipeline: List[Dict], hint: Optional[str] = None) -> Dict:
+        options = {'hint': hint} if hint else {}
+        times = []
+        for _ in range(self.repeats):
+            start = time.perf_counter_ns()
+            list(self.scratch.aggregate(pipeline, allowDiskUse=True, **options))
+            times.append((time.perf_counter_ns() - start) / 1e6)
+
+        stats = self._explain(pipeline, 'executionStats', hint)
+        stats['median_ms'] = round(statistics.median(times), 3)
+        return stats
+
+    def _explain(self, pipeline: List[Dict], verbosity: str, hint: Optional[str] = None) -> Dict:
+        command = {'aggregate': self.scratch.name, 'pipeline': pipeline, 'cursor': {}, 'allowDiskUse': True}
+        if hint:
+            command['hint'] = hint
+        try:
+            return execution_stats(self.db.command('explain', command, verbosity=verbosity))
+        except Exception as e:
+            print(f"    Explain failed: {type(e).__name__}: {str(e)}")
+            return {'docs_examined': None, 'keys_examined': None, 'indexes_used': []}
+
+    def _clear_indexes(self):
+        for name in self.scratch.index_information():
+            if name != '_id_':
+                self.scratch.drop_index(name)
+
+    def evaluate(self, query_name: str, pipeline: List[Dict]) -> List[Dict]:
+        """Times the pipeline without secondary indexes and with each candidate alone"""
+        candidates = self.candidates(query_name, pipeline)
+        if not candidates:
+            print(f"\n{query_name}: no leading $match/$sort predicates, nothing an index can serve")
+            return []
+
+        self._clear_indexes()
+        baseline = self._measure(pipeline)
+        print(f"\n{query_name}: collection scan {baseline['median_ms']:.2f}ms, {baseline['docs_examined']} docs examined")
+
+        records = []
+        for candidate in candidates:
+            self._clear_indexes()
+            try:
+                self.scratch.create_index(candidate['keys'], name=candidate['name'], **candidate['options'])
+            except OperationFailure as e:
+                print(f"  {candidate['name']}: could not be built: {type(e).__name__}: {str(e)}")
+                continue
+
+            hinted = self._measure(pipeline, candidate['name'])
+            chosen = self._explain(pipeline, 'queryPlanner')['indexes_used']
+            size = IndexManager(self.scratch, []).index_sizes().get(candidate['name'], 0)
+
+            record = dict(candidate, **{
+                'query': query_name,
+                'keys': [[field, direction] for field, direction in candidate['keys']],
+                'baseline_ms': baseline['median_ms'],
+                'baseline_docs_examined': baseline['docs_examined'],
+                'median_ms': hinted['median_ms'],
+                'docs_examined': hinted['docs_examined'],
+                'keys_examined': hinted['keys_examined'],
+                'speedup': round(baseline['median_ms'] / hinted['median_ms'], 2) if hinted['median_ms'] > 0 else 0,
+                'chosen_by_planner': candidate['name'] in chosen,
+                'size_bytes': size
+            })
+            records.append(record)
+            print(f"  {record['kind']:<9} {record['median_ms']:>9.2f}ms  {record['speedup']:>6.2f}x  "
+                  f"docs {record['docs_examined']}, keys {record['keys_examined']}, "
+                  f"{'chosen' if record['chosen_by_planner'] else 'not chosen'} by the planner  "
+                  f"{', '.join(f'{field}:{direction}' for field, direction in record['keys'])}")
+
+        self._clear_indexes()
+        return records
+
+    @staticmethod
+    def plan(records: List[Dict], min_gain: float = 1.2) -> List[Dict]:
+        """Best verified candidate per query, ranked by speedup; ties go to the smaller index.
+
+        action: keep    - the declared index is already the best candidate
+                replace - drop the declared index of the query and create this one
+                create  - the query has no declared index
+        """
+        best = {}
+        for record in records:
+            if record['speedup'] < min_gain:
+                continue
+            current = best.get(record['query'])
+            if current is None or (record['speedup'], -record['size_bytes']) > (current['speedup'], -current['size_bytes']):
+                best[record['query']] = record
+
+        plan = sorted(best.values(), key=lambda record: -record['speedup'])
+        for rank, record in enumerate(plan, 1):
+            record['rank'] = rank
+            reference = next((r for r in records if r['query'] == record['query'] and r.get('declared_name')), None)
+            if reference is record:
+                record['action'] = 'keep'
+            elif reference:
+                record['action'] = 'replace'
+                record['replaces'] = reference['declared_name']
+                record['gain_vs_current'] = round(reference['median_ms'] / record['median_ms'], 2) if record['median_ms'] > 0 else 0
+            else:
+                record['action'] = 'create'
+        return plan
+
+    @staticmethod
+    def print_plan(plan: List[Dict]):
+        print(f"\nIndex plan ({len(plan)} indexes):")
+        for record in plan:
+            versus = f", {record['gain_vs_current']}x vs {record['replaces']}" if record.get('replaces') else ""
+            print(f"  {record['rank']}. {record['query']} [{record['kind']}, {record['action']}] {record['speedup']}x vs collection scan{versus}, "
+                  f"{record['size_bytes'] / (1024 * 1024):.1f} MB")
+            print(f"     {', '.join(f'{field}:{direction}' for field, direction in record['keys'])}"
+                  + (f"  partial {json.dumps(record['options']['partialFilterExpression'])}" if record['options'].get('partialFilterExpression') else ""))
+
+    def export(self, plan: List[Dict], records: List[Dict], filepath: str):
+        os.makedirs(os.path.dirname(filepath) if os.path.dirname(filepath) else '.', exist_ok=True)
+        output = {
+            'timestamp': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'collection': self.source.name,
+            'scratch_documents': self.total,
+            'plan': plan,
+            'candidates': records
+        }
+        with open(filepath, 'w', encoding='utf-8') as f:
+            json.dump(output, f, indent=2, ensure_ascii=False, default=str)
+
+        script_path = os.path.splitext(filepath)[0] + '.js'
+        with open(script_path, 'w', encoding='utf-8') as f:
+            f.write(f"// Plan indeksa za {self.source.name} (index_advisor.py, {output['timestamp']})\n")
+            for record in plan:
+                f.write(f"\n// {record['rank']}. {record['query']}: {record['speedup']}x vs collection scan\n")
+                if record['action'] == 'keep':
+                    f.write(f"// keep {record['declared_name']}, it already is the best candidate\n")
+                    continue
+                if record['action'] == 'replace':
+                    f.write(f"db.{self.source.name}.dropIndex(\"{record['replaces']}\");\n")
+                keys = ',\n'.join(f'        "{field}": {direction}' for field, direction in record['keys'])
+                options = dict({'name': record['name'].replace('adv_', 'idx_', 1)}, **record['options'])
+                f.write(f"db.{self.source.name}.createIndex(\n    {{\n{keys}\n    }},\n    {json.dumps(options)}\n);\n")
+
+        print(f"\nIndex plan exported to: {filepath} and {script_path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Propose and verify ESR-ordered indexes for the query pipelines")
+    parser.add_argument('--collection', default=V2_COLLECTION)
+    parser.add_argument('--versions', nargs='+', default=['v2'], choices=['v1', 'v2'])
+    parser.add_argument('--profile-shapes', action='store_true',
+                        help="also analyse query shapes recorded in system.profile for the collection")
+    parser.add_argument('--sample', type=int, help="copy only this many random documents to the scratch collection")
+    parser.add_argument('--repeats', type=int, default=3, help="timed runs per candidate")
+    parser.add_argument('--min-gain', type=float, default=1.2, help="minimum speedup over a collection scan to enter the plan")
+    parser.add_argument('--keep-scratch', action='store_true')
+    parser.add_argument('--output', default='output/index_plan.json')
+    args = parser.parse_args()
+
+    client = MongoClient('mongodb://localhost:27017/')
+    db = client['SBP_DB']
+    source = db[args.collection]
+
+    entries = [(entry['query'], entry['pipeline']) for entry in registered_queries(args.versions)
+               if entry['collection'] == args.collection]
+    if args.profile_shapes:
+        entries += [(shape['query'], shape['pipeline']) for shape in profiled_pipelines(db, args.collection)]
+
+    advisor = IndexAdvisor(source, sample=args.sample, repeats=args.repeats)
+    advisor.prepare_scratch()
+    try:
+        records = []
+        for query_name, pipeline in entries:
+            records += advisor.evaluate(query_name, pipeline)
+    finally:
+        if not args.keep_scratch:
+            advisor.drop_scratch()
+
+    plan = advisor.plan(records, args.min_gain)
+    advisor.print_plan(plan)
+    advisor.export(plan, records, args.output)
+
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,164 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Index Manager - indeksi za movies_optimized
+Indeksi iz v2/marko/indexes.sql deklarisani kao podaci, sa merenjem
+vremena izgradnje i veličine svakog indeksa
+"""
+
+import time
+from typing import Dict, List, Optional
+from pymongo import ASCENDING
+from pymongo.errors import OperationFailure
+
+
+# Isti indeksi kao u v2/marko/indexes.sql
+OPTIMIZED_INDEXES = [
+    {
+        'query': 'query_1',
+        'name': 'idx_budget_companies',
+        'keys': [
+            ('financial.budget_category', ASCENDING),
+            ('financial.revenue', ASCENDING),
+            ('production.companies', ASCENDING)
+        ]
+    },
+    {
+        'query': 'query_2',
+        'name': 'idx_genre_decade_rating',
+        'keys': [
+            ('release_info.decade', ASCENDING),
+            ('ratings.vote_average', ASCENDING),
+            ('content_info.genres', ASCENDING)
+        ]
+    },
+    {
+        'query': 'query_3',
+        'name': 'idx_blockbuster_month',
+        'keys': [
+            ('financial.budget_category', ASCENDING),
+            ('release_info.month', ASCENDING)
+        ]
+    },
+    {
+        'query': 'query_4',
+        'name': None,               # unnamed in indexes.sql, MongoDB generates the name
+        'keys': [
+            ('financial.revenue', ASCENDING),
+            ('financial.budget', ASCENDING),
+            ('content_info.sorted_genres', ASCENDING),
+            ('financial.profit', ASCENDING),
+            ('financial.roi', ASCENDING)
+        ]
+    },
+    {
+        'query': 'query_4_pairs',
+        'name': 'idx_genre_pairs',
+        'keys': [
+            ('financial.revenue', ASCENDING),
+            ('financial.budget', ASCENDING),
+            ('content_info.genre_pairs', ASCENDING)        # multikey: one entry per genre pair
+        ]
+    },
+    {
+        'query': 'query_5',
+        'name': 'idx_ESR_countries_runtime_quality',
+        'keys': [
+            ('production.countries', ASCENDING),
+            ('content_info.runtime', ASCENDING),
+            ('ratings.quality_tier', ASCENDING)
+        ]
+    }
+]
+
+
+class IndexManager:
+    """Drops and rebuilds the declared indexes around a bulk load.
+
+    Strategies:
+      after  - drop the indexes before loading, build them once the data is in
+      during - create the indexes on the empty collection, inserts maintain them
+      none   - leave indexes alone
+
+    An incremental load never drops indexes: with after/during it only builds
+    the missing ones up front (build_indexes(missing_only=True)).
+    """
+
+    STRATEGIES = ('after', 'during', 'none')
+
+    def __init__(self, collection, specs: Optional[List[Dict]] = None):
+        self.collection = collection
+        self.specs = specs if specs is not None else OPTIMIZED_INDEXES
+
+    @staticmethod
+    def index_name(spec: Dict) -> str:
+        """Explicit name, or the name MongoDB generates for an unnamed index"""
+        return spec.get('name') or '_'.join(f"{field}_{direction}" for field, direction in spec['keys'])
+
+    def existing_indexes(self) -> List[str]:
+        return [name for name in self.collection.index_information() if name != '_id_']
+
+    def drop_indexes(self) -> List[str]:
+        """Drops the declared indexes that currently exist"""
+        existing = set(self.existing_indexes())
+        dropped = []
+
+        for spec in self.specs:
+            name = self.index_name(spec)
+            if name in existing:
+                self.collection.drop_index(name)
+                dropped.append(name)
+
+        if dropped:
+            print(f"Dropped {len(dropped)} indexes before load: {', '.join(dropped)}")
+        return dropped
+
+    def index_sizes(self) -> Dict[str, int]:
+        try:
+            stats = next(self.collection.aggregate([{'$collStats': {'storageStats': {}}}]), {})
+            return stats.get('storageStats', {}).get('indexSizes', {})
+        except OperationFailure:
+            return {}
+
+    def build_indexes(self, missing_only: bool = False) -> List[Dict]:
+        """Builds the declared indexes one by one, timing each build"""
+        records = []
+        existing = set(self.existing_indexes()) if missing_only else set()
+
+        for spec in self.specs:
+            name = self.index_name(spec)
+            if name in existing:
+                continue
+            options = {'name': spec['name']} if spec.get('name') else {}
+            if spec.get('options'):
+                options.update(spec['options'])
+
+            start = time.perf_counter()
+            self.collection.create_index(spec['keys'], **options)
+            build_ms = (time.perf_counter() - start) * 1000
+
+            records.append({
+                'name': name,
+                'query': spec.get('query'),
+                'keys': [field for field, _ in spec['keys']],
+                'build_time_ms': round(build_ms, 2)
+            })
+
+        sizes = self.index_sizes()
+        for record in records:
+            record['size_bytes'] = sizes.get(record['name'], 0)
+
+        return records
+
+    @staticmethod
+    def print_report(records: List[Dict]):
+        if not records:
+            return
+
+        print(f"\nIndexes:")
+        for record in records:
+            print(f"  {record['name']}: {record['build_time_ms']:.0f}ms, {record['size_bytes'] / (1024 * 1024):.1f} MB")
+
+        total_ms = sum(record['build_time_ms'] for record in records)
+        total_bytes = sum(record['size_bytes'] for record in records)
+        print(f"  Total: {total_ms:.0f}ms, {total_bytes / (1024 * 1024):.1f} MB")
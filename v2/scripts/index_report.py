@@ -0,0 +1,205 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Index Report - korišćenje i cena indeksa za movies_optimized
+Spaja broj pristupa iz $indexStats, veličinu iz collStats i izmereni
+trošak upisa svakog indeksa, i označava nekorišćene indekse i indekse
+koji su prefiks nekog drugog indeksa
+"""
+
+import argparse
+import json
+import os
+import time
+from typing import Dict, List
+
+from pymongo import MongoClient
+
+from index_manager import IndexManager, OPTIMIZED_INDEXES
+
+
+class IndexReport:
+    """Usage, size and write cost of every secondary index of a collection.
+
+    Access counts come from $indexStats and start at zero whenever mongod
+    restarts or the index is rebuilt - run the dashboard queries or the
+    benchmark first. Write overhead is measured by inserting the same sample of
+    documents into a scratch collection without secondary indexes and then with
+    each index alone, the way the loader writes (unordered insert_many batches).
+    """
+
+    def __init__(self, collection, write_sample: int = 5000, batch_size: int = 1000):
+        self.collection = collection
+        self.db = collection.database
+        self.write_sample = write_sample
+        self.batch_size = batch_size
+        self.scratch = self.db[f"{collection.name}_index_report"]
+
+    def indexes(self) -> Dict[str, Dict]:
+        declared = {IndexManager.index_name(spec): spec.get('query') for spec in OPTIMIZED_INDEXES}
+        indexes = {}
+        for name, info in self.collection.index_information().items():
+            if name == '_id_':
+                continue
+            indexes[name] = {
+                'name': name,
+                'keys': [[field, direction] for field, direction in info['key']],
+                'partial': info.get('partialFilterExpression'),
+                'unique': info.get('unique', False),
+                'query': declared.get(name)
+            }
+        return indexes
+
+    def access_counts(self) -> Dict[str, Dict]:
+        try:
+            return {
+                stats['name']: {'ops': stats['accesses']['ops'], 'since': stats['accesses']['since']}
+                for stats in self.collection.aggregate([{'$indexStats': {}}])
+            }
+        except Exception as e:
+            print(f"$indexStats unavailable: {type(e).__name__}: {str(e)}")
+            return {}
+
+    def _insert_sample(self, documents: List[Dict]) -> float:
+        self.scratch.delete_many({})
+        start = time.perf_counter()
+        for offset in range(0, len(documents), self.batch_size):
+            self.scratch.insert_many(documents[offset:offset + self.batch_size], ordered=False)
+        return time.perf_counter() - start
+
+    def write_overhead(self, indexes: Dict[str, Dict]) -> Dict[str, Dict]:
+        """Extra insert time per index relative to inserting without secondary indexes"""
+        if not self.write_sample:
+            return {}
+
+        documents = list(self.collection.aggregate([{'$sample': {'size': self.write_sample}}]))
+        if not documents:
+            return {}
+
+        self.scratch.drop()
+        try:
+            self._insert_sample(documents)          # warm-up, creates the collection
+            baseline = self._insert_sample(documents)
+
+            overhead = {}
+            for name, index in indexes.items():
+                options = {'name': name}
+                if index['partial']:
+                    options['partialFilterExpression'] = index['partial']
+                self.scratch.create_index([tuple(key) for key in index['keys']], **options)
+                seconds = self._insert_sample(documents)
+                self.scratch.drop_index(name)
+
+                overhead[name] = {
+                    'insert_seconds': round(seconds, 3),
+                    'baseline_seconds': round(baseline, 3),
+                    'overhead_percent': round((seconds - baseline) / baseline * 100, 1) if baseline > 0 else 0,
+                    'us_per_document': round((seconds - baseline) / len(documents) * 1e6, 2)
+                }
+            return overhead
+        finally:
+            self.scratch.drop()
+
+    def build_times(self) -> Dict[str, float]:
+        """Index build times recorded by the last completed import (init_db.py import_state)"""
+        states = [state for state in self.db['import_state'].find({}, {'indexes': 1, 'completed_at': 1})
+                  if self.collection.name in state['_id'].split('+')]      # keyed by the '+'-joined target names
+        latest = max(states, key=lambda state: state.get('completed_at') or '', default={})
+        return {record['name']: record['build_time_ms'] for record in latest.get('indexes', [])}
+
+    @staticmethod
+    def redundant_prefixes(indexes: Dict[str, Dict]) -> Dict[str, str]:
+        """Indexes whose key pattern is a leading prefix of another index; the longer one can serve their queries.
+
+        Partial and unique indexes are left out - they do more than speed up reads.
+        """
+        redundant = {}
+        for name, index in indexes.items():
+            if index['partial'] or index['unique']:
+                continue
+            for other_name, other in indexes.items():
+                if other_name == name or other['partial']:
+                    continue
+                if len(other['keys']) > len(index['keys']) and other['keys'][:len(index['keys'])] == index['keys']:
+                    redundant[name] = other_name
+                    break
+        return redundant
+
+    def build(self) -> List[Dict]:
+        indexes = self.indexes()
+        accesses = self.access_counts()
+        sizes = IndexManager(self.collection, []).index_sizes()
+        overhead = self.write_overhead(indexes)
+        redundant = self.redundant_prefixes(indexes)
+        build_times = self.build_times()
+
+        records = []
+        for name, index in indexes.items():
+            record = dict(index)
+            record['ops'] = accesses.get(name, {}).get('ops')
+            record['since'] = accesses.get(name, {}).get('since')
+            record['size_bytes'] = sizes.get(name, 0)
+            record['write'] = overhead.get(name)
+            record['build_time_ms'] = build_times.get(name)
+            record['flags'] = []
+            if record['ops'] == 0:
+                record['flags'].append('unused')
+            if name in redundant:
+                record['flags'].append(f"prefix of {redundant[name]}")
+            records.append(record)
+
+        return sorted(records, key=lambda record: (not record['flags'], -record['size_bytes']))
+
+    @staticmethod
+    def print_report(records: List[Dict]):
+        print(f"\nIndex report ({len(records)} secondary indexes):")
+        print(f"  {'index':<42} {'query':<14} {'ops':>8} {'size MB':>9} {'write +%':>9} {'us/doc':>8} {'build ms':>9}  flags")
+        for record in records:
+            write = record['write'] or {}
+            ops = f"{record['ops']:,}" if record['ops'] is not None else '-'
+            build = f"{record['build_time_ms']:.0f}" if record['build_time_ms'] is not None else '-'
+            print(f"  {record['name'][:42]:<42} {record['query'] or '-':<14} {ops:>8} "
+                  f"{record['size_bytes'] / (1024 * 1024):>9.1f} {write.get('overhead_percent', 0):>9.1f} "
+                  f"{write.get('us_per_document', 0):>8.1f} {build:>9}  {', '.join(record['flags'])}")
+
+        flagged = [record for record in records if record['flags']]
+        total_bytes = sum(record['size_bytes'] for record in flagged)
+        if flagged:
+            print(f"\n  {len(flagged)} flagged indexes hold {total_bytes / (1024 * 1024):.1f} MB")
+
+    def export(self, records: List[Dict], filepath: str):
+        os.makedirs(os.path.dirname(filepath) if os.path.dirname(filepath) else '.', exist_ok=True)
+        output = {
+            'timestamp': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'collection': self.collection.name,
+            'write_sample': self.write_sample,
+            'indexes': records
+        }
+
+        with open(filepath, 'w', encoding='utf-8') as f:
+            json.dump(output, f, indent=2, ensure_ascii=False, default=str)
+
+        print(f"\nIndex report exported to: {filepath}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Index usage, size and write overhead for movies_optimized")
+    parser.add_argument('--collection', default='movies_optimized')
+    parser.add_argument('--write-sample', type=int, default=5000,
+                        help="documents inserted per index to measure write overhead, 0 to skip")
+    parser.add_argument('--output', default='output/index_report.json')
+    args = parser.parse_args()
+
+    client = MongoClient('mongodb://localhost:27017/')
+    collection = client['SBP_DB'][args.collection]
+
+    report = IndexReport(collection, args.write_sample)
+    records = report.build()
+    report.print_report(records)
+    report.export(records, args.output)
+
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,178 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Ingestion Profiler - merenje po fazama učitavanja
+Za svaku fazu (čitanje CSV-a, deduplikacija, transformacija, BSON, upis)
+beleži vreme, rows/sec i vršnu memoriju (RSS i opciono tracemalloc)
+"""
+
+import json
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager
+from threading import Event, Lock, Thread
+from typing import Dict, Optional
+
+import psutil
+
+
+STAGES = ['csv_read', 'dedup', 'transform', 'bson_encode', 'insert', 'index_build', 'rollups']
+
+
+def process_rss() -> int:
+    """Resident set size of the calling process, used by worker processes to report their memory"""
+    return psutil.Process().memory_info().rss
+
+
+class IngestionProfiler:
+    """Accumulates busy time, rows and peak memory per ingestion stage.
+
+    Stages overlap in the pipelined loader, so a stage's time is the sum of the
+    time spent in it across threads and worker processes, not a slice of wall time.
+    RSS is sampled in the background and charged to every stage active at that
+    moment; worker processes report their own RSS with each chunk. tracemalloc
+    peaks (optional, slows the load down) are exact only for stages that do not
+    overlap with others.
+    """
+
+    def __init__(self, trace_memory: bool = False, sample_interval: float = 0.1):
+        self.trace_memory = trace_memory
+        self.sample_interval = sample_interval
+        self.process = psutil.Process()
+        self.lock = Lock()
+        self.stages = {name: self._empty_stage() for name in STAGES}
+        self.active = {}
+        self.peak_rss = 0
+        self.started = None
+        self.wall_seconds = 0.0
+        self._stop = Event()
+        self._sampler = None
+
+    @staticmethod
+    def _empty_stage() -> Dict:
+        return {'seconds': 0.0, 'rows': 0, 'calls': 0, 'peak_rss': 0, 'peak_traced': 0}
+
+    def start(self):
+        self.started = time.perf_counter()
+        if self.trace_memory:
+            tracemalloc.start()
+        self._stop.clear()
+        self._sampler = Thread(target=self._sample_rss, daemon=True)
+        self._sampler.start()
+
+    def stop(self):
+        self.wall_seconds = time.perf_counter() - self.started
+        self._stop.set()
+        if self._sampler:
+            self._sampler.join()
+        if self.trace_memory:
+            tracemalloc.stop()
+
+    def _current_rss(self) -> int:
+        rss = self.process.memory_info().rss
+        for child in self.process.children(recursive=True):
+            try:
+                rss += child.memory_info().rss
+            except psutil.Error:
+                pass
+        return rss
+
+    def _sample_rss(self):
+        while not self._stop.wait(self.sample_interval):
+            try:
+                rss = self._current_rss()
+            except psutil.Error:
+                continue
+            with self.lock:
+                self.peak_rss = max(self.peak_rss, rss)
+                for name, count in self.active.items():
+                    if count > 0:
+                        self.stages[name]['peak_rss'] = max(self.stages[name]['peak_rss'], rss)
+
+    @contextmanager
+    def stage(self, name: str, rows: int = 0):
+        """Times a block of work in the calling process; rows can also be set later with add_rows"""
+        with self.lock:
+            if self.trace_memory and not any(self.active.values()):
+                tracemalloc.reset_peak()
+            self.active[name] = self.active.get(name, 0) + 1
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            traced = tracemalloc.get_traced_memory()[1] if self.trace_memory else 0
+            rss = self.process.memory_info().rss        # short stages can finish between two samples
+            with self.lock:
+                self.active[name] -= 1
+                stage = self.stages.setdefault(name, self._empty_stage())
+                stage['seconds'] += elapsed
+                stage['rows'] += rows
+                stage['calls'] += 1
+                stage['peak_rss'] = max(stage['peak_rss'], rss)
+                stage['peak_traced'] = max(stage['peak_traced'], traced)
+
+    def add(self, name: str, seconds: float, rows: int = 0, peak_rss: Optional[int] = None):
+        """Records work measured elsewhere, e.g. inside a worker process"""
+        with self.lock:
+            stage = self.stages.setdefault(name, self._empty_stage())
+            stage['seconds'] += seconds
+            stage['rows'] += rows
+            stage['calls'] += 1
+            if peak_rss:
+                stage['peak_rss'] = max(stage['peak_rss'], peak_rss)
+
+    def add_rows(self, name: str, rows: int):
+        with self.lock:
+            self.stages.setdefault(name, self._empty_stage())['rows'] += rows
+
+    def timed_iter(self, iterable, name: str):
+        """Wraps a chunk iterator so the time spent producing each chunk is charged to a stage"""
+        iterator = iter(iterable)
+        while True:
+            with self.stage(name):
+                try:
+                    chunk = next(iterator)
+                except StopIteration:
+                    return
+            self.add_rows(name, len(chunk))
+            yield chunk
+
+    def summary(self) -> Dict:
+        stages = {}
+        for name, stage in self.stages.items():
+            if stage['calls'] == 0:
+                continue
+            stages[name] = {
+                'seconds': round(stage['seconds'], 3),
+                'rows': stage['rows'],
+                'rows_per_sec': round(stage['rows'] / stage['seconds'], 1) if stage['seconds'] > 0 else 0,
+                'calls': stage['calls'],
+                'peak_rss_mb': round(stage['peak_rss'] / (1024 * 1024), 1),
+                'peak_traced_mb': round(stage['peak_traced'] / (1024 * 1024), 1) if self.trace_memory else None
+            }
+        return {
+            'wall_seconds': round(self.wall_seconds, 3),
+            'peak_rss_mb': round(self.peak_rss / (1024 * 1024), 1),
+            'stages': stages
+        }
+
+    def print_report(self):
+        summary = self.summary()
+        print(f"\nIngestion stages (wall time {summary['wall_seconds']:.1f}s, peak RSS {summary['peak_rss_mb']:.0f} MB):")
+        print(f"  {'stage':<12} {'time (s)':>10} {'rows':>12} {'rows/sec':>12} {'peak RSS MB':>12}")
+        for name, stage in summary['stages'].items():
+            print(f"  {name:<12} {stage['seconds']:>10.2f} {stage['rows']:>12,} {stage['rows_per_sec']:>12,.0f} {stage['peak_rss_mb']:>12.0f}")
+
+    def export(self, filepath: str, extra: Optional[Dict] = None):
+        os.makedirs(os.path.dirname(filepath) if os.path.dirname(filepath) else '.', exist_ok=True)
+        output = {'timestamp': time.strftime('%Y-%m-%d %H:%M:%S')}
+        output.update(extra or {})
+        output.update(self.summary())
+
+        with open(filepath, 'w', encoding='utf-8') as f:
+            json.dump(output, f, indent=2, ensure_ascii=False)
+
+        print(f"\nIngestion report exported to: {filepath}")
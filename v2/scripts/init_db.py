@@ -1,161 +1,469 @@
+import argparse
 import pandas as pd
-from pymongo import MongoClient
-from pymongo.errors import BulkWriteError
+import numpy as np
+import bson
+import hashlib
+import importlib.util
 import traceback
 from models import OptimizedMovieDocument
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from threading import Lock
+from index_manager import IndexManager, OPTIMIZED_INDEXES
+from adaptive_batcher import AdaptiveBatcher
+from ingestion_profiler import IngestionProfiler, process_rss
+from rollups import RollupManager, ROLLUPS, RELEASE_MONTH_BUCKETS
+import os
+import sys
+import time
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from tmdb_loader import ChunkedLoader, StreamingDeduplicator, bump_generation
 
-class DatabaseInitializer:
+
+V1_MODELS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'v1', 'scripts', 'models.py')
+
+
+class SchemaTarget:
+    """A schema transformer and the collection its documents go to.
     
-    def __init__(self, csv_path, connection_string='mongodb://localhost:27017/', 
-                 database_name='SBP_DB', collection_name='movies_optimized'):
-        
-        self.csv_path = csv_path
-        self.connection_string = connection_string
-        self.database_name = database_name
+    The document class is resolved by file path inside the worker processes,
+    because v1 and v2 both call their schema module models.py.
+    """
+    
+    def __init__(self, collection_name, models_path=None, document_class='OptimizedMovieDocument', indexes=None):
         self.collection_name = collection_name
-        self.batch_size = 10000
-        self.num_workers = 8
+        self.models_path = os.path.abspath(models_path) if models_path else None
+        self.document_class = document_class
+        self.indexes = indexes if indexes is not None else OPTIMIZED_INDEXES
+
+
+V1_TARGET = SchemaTarget('movies', V1_MODELS_PATH, 'MovieDocument', indexes=[])      # v1 stays the unindexed baseline
+
+_document_classes = {}
+
+
+def load_document_class(target: SchemaTarget):
+    if target.models_path is None:
+        return OptimizedMovieDocument
+    
+    key = (target.models_path, target.document_class)
+    if key not in _document_classes:
+        module_name = f"schema_{hashlib.md5(target.models_path.encode()).hexdigest()[:8]}"
+        spec = importlib.util.spec_from_file_location(module_name, target.models_path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        _document_classes[key] = getattr(module, target.document_class)
+    
+    return _document_classes[key]
+
+
+def transform_chunk(chunk: pd.DataFrame, document=OptimizedMovieDocument):
+    """CPU stage, runs in a worker process: turns a CSV chunk into documents"""
+    if hasattr(document, 'transform_batch'):
+        try:
+            return document.transform_batch(chunk), 0
+        except Exception:
+            pass        # fall back to per-row transform to isolate the bad rows
+    
+    movies = []
+    errors = 0
+    
+    for row_dict in chunk.to_dict('records'):
+        try:
+            movies.append(document.transform(row_dict))
+        except Exception:
+            errors += 1
+    
+    return movies, errors
+
+
+def fingerprint_chunk(chunk: pd.DataFrame, targets):
+    """Transforms a chunk once per target and stamps every document with a hash of its content.
+    
+    Returns documents and their encoded BSON sizes (used for byte-based batching)
+    keyed by target collection, plus the time spent in each stage, since the worker
+    process cannot report it directly.
+    """
+    movies = {}
+    sizes = {}
+    errors = 0
+    timings = {'rows': len(chunk) * len(targets), 'transform': 0.0, 'bson_encode': 0.0}
+    
+    for target in targets:
+        start = time.perf_counter()
+        documents, target_errors = transform_chunk(chunk, load_document_class(target))
+        transformed = time.perf_counter()
+        target_sizes = []
         
-        self.client = None
-        self.db = None
-        self.collection = None
-        self.lock = Lock()
+        for movie in documents:
+            encoded = bson.encode(movie)
+            movie['content_hash'] = hashlib.sha1(encoded).hexdigest()
+            target_sizes.append(len(encoded))
         
-    def connect(self) -> bool:
-        try:
-            print("Connecting to MongoDB...")
-            self.client = MongoClient(self.connection_string)
-            self.db = self.client[self.database_name]
-            self.client.admin.command('ping')
-            print(f"Connected to database: {self.database_name}")
-            return True
-        except Exception as e:
-            print(f"Connection failed: {type(e).__name__}: {str(e)}")
-            return False
+        timings['transform'] += transformed - start
+        timings['bson_encode'] += time.perf_counter() - transformed
+        movies[target.collection_name] = documents
+        sizes[target.collection_name] = target_sizes
+        errors += target_errors
+    
+    timings['rss'] = process_rss()
+    return movies, sizes, errors, timings
+
+
+class DatabaseInitializer(ChunkedLoader):
+    
+    JOURNAL_COLLECTION = 'import_journal'
+    
+    def __init__(self, csv_path, connection_string='mongodb://localhost:27017/', 
+                 database_name='SBP_DB', collection_name='movies_optimized',
+                 streaming=False, chunk_size=10000, max_memory_mb=None,
+                 num_workers=None, num_writers=4, queue_size=8, max_pool_size=10,
+                 incremental=False, delete_missing=False, use_cache=True, index_strategy='after',
+                 adaptive_batches=True, batch_bytes=4 * 1024 * 1024, resume=False,
+                 trace_memory=False, report_path='output/ingestion_report.json', targets=None,
+                 rollups=True, buckets=False):
+        
+        self.targets = targets or [SchemaTarget(collection_name)]
+        super().__init__(csv_path, connection_string, database_name,
+                         '+'.join(target.collection_name for target in self.targets),     # key for journal and import state
+                         streaming=streaming, chunk_size=chunk_size, max_memory_mb=max_memory_mb,
+                         num_workers=num_workers, num_writers=num_writers, queue_size=queue_size,
+                         max_pool_size=max_pool_size, incremental=incremental,
+                         delete_missing=delete_missing, use_cache=use_cache)
+        self.index_strategy = index_strategy
+        self.adaptive_batches = adaptive_batches
+        self.batch_bytes = batch_bytes
+        self.batcher = None
+        self.resume = resume
+        self.committed_chunks = set()
+        self.trace_memory = trace_memory
+        self.report_path = report_path
+        self.profiler = IngestionProfiler(trace_memory)
+        self.build_rollups = rollups
+        self.build_buckets = buckets
+        self.rollup_manager = None
     
     def _clean_duplicates(self, df: pd.DataFrame) -> pd.DataFrame:
         print("\nCleaning duplicates...")
         
-        original_count = len(df)
+        with self.profiler.stage('dedup', rows=len(df)):
+            dedup = StreamingDeduplicator()
+            for start in range(0, len(df), self.batch_size):
+                block = df.iloc[start:start + self.batch_size]
+                dedup.update(block['id'].to_numpy(), self._completeness_score(block).to_numpy(dtype=np.float64))
+            
+            df_clean = df[dedup.keep_mask()]
         
-        df['_completeness_score'] = (
-            df['imdb_id'].notna().astype(int) * 10 +
-            df['release_date'].notna().astype(int) * 5 +
-            df['overview'].notna().astype(int) * 3 +
-            df['revenue'].fillna(0).astype(bool).astype(int) * 2 +
-            df['vote_count'].fillna(0).astype(int) / 100
-        )
+        print(f"Original rows: {dedup.rows_seen:,}")
+        print(f"After deduplication: {dedup.unique_count:,}")
+        print(f"Removed duplicates: {dedup.removed_count:,}")
+        
+        return df_clean
+    
+    def _select_streaming_winners(self) -> np.ndarray:
+        """First streaming pass: reads only the scoring columns and returns a keep-mask over CSV rows"""
+        print("\nScanning CSV for duplicates (streaming)...")
         
-        df = df.sort_values(['id', '_completeness_score'], ascending=[True, False])
-        df_clean = df.drop_duplicates(subset=['id'], keep='first')
-        df_clean = df_clean.drop(columns=['_completeness_score'])
+        dedup = StreamingDeduplicator()
+        missing_imdb = 0
         
-        removed_count = original_count - len(df_clean)
+        for chunk in self.profiler.timed_iter(self._iter_dataset(self.SCORE_COLUMNS), 'csv_read'):
+            with self.profiler.stage('dedup', rows=len(chunk)):
+                dedup.update(chunk['id'].to_numpy(), self._completeness_score(chunk).to_numpy(dtype=np.float64))
+            missing_imdb += int(chunk['imdb_id'].isna().sum())
         
-        print(f"Original rows: {original_count:,}")
-        print(f"After deduplication: {len(df_clean):,}")
-        print(f"Removed duplicates: {removed_count:,}")
+        print(f"Loaded {dedup.rows_seen:,} rows from CSV")
+        print(f"Unique TMDB IDs: {dedup.unique_count:,}")
+        print(f"Missing IMDB IDs: {missing_imdb:,}")
+        print(f"After deduplication: {dedup.unique_count:,}")
+        print(f"Removed duplicates: {dedup.removed_count:,}")
         
-        return df_clean
+        return dedup.keep_mask()
+    
+    def _stream_clean_chunks(self, keep_mask: np.ndarray):
+        """Second streaming pass: yields fixed-size CSV chunks restricted to the winning rows"""
+        offset = 0
+        for chunk in self.profiler.timed_iter(self._iter_dataset(), 'csv_read'):
+            rows = len(chunk)
+            with self.profiler.stage('dedup'):
+                chunk = chunk[keep_mask[offset:offset + rows]]
+            offset += rows
+            if len(chunk):
+                yield chunk
+    
+    def _submit_chunk(self, executor, chunk: pd.DataFrame):
+        return executor.submit(fingerprint_chunk, chunk, self.targets)
     
-    def _process_chunk(self, chunk_data):
-        chunk_idx, start_idx, end_idx, df = chunk_data
-        
-        chunk = df.iloc[start_idx:end_idx]
-        movies = []
-        errors = 0
-        
-        for row_dict in chunk.to_dict('records'):
-            try:
-                movie = OptimizedMovieDocument.transform(row_dict)
-                movies.append(movie)
-            except Exception:
-                errors += 1
-                continue
-        
-        if movies:
-            client = MongoClient(self.connection_string)
-            db = client[self.database_name]
-            collection = db[self.collection_name]
-            
-            try:
-                collection.insert_many(movies, ordered=False)
-                inserted = len(movies)
-                duplicates = 0
-                other_errors = 0
-            except BulkWriteError as e:
-                details = e.details
-                write_errors = details.get('writeErrors', [])
-                duplicates = sum(1 for err in write_errors if err.get('code') == 11000)
-                other_errors = len(write_errors) - duplicates
-                inserted = details.get('nInserted', 0)
-            finally:
-                client.close()
-            
-            return inserted, duplicates, other_errors + errors
-        
-        return 0, 0, errors
+    def _on_transformed(self, result):
+        timings = result[3]
+        self.profiler.add('transform', timings['transform'], timings['rows'], timings['rss'])
+        self.profiler.add('bson_encode', timings['bson_encode'], timings['rows'], timings['rss'])
+    
+    def _write_transformed(self, result, write, stats: dict):
+        movies, sizes, transform_errors, _ = result
+        results = []
+        
+        def timed_write(collection, batch):
+            start = time.perf_counter()
+            with self.profiler.stage('insert', rows=len(batch)):
+                result = write(collection, batch)
+            if self.batcher:
+                self.batcher.record(len(batch), time.perf_counter() - start)
+            return result
+        
+        for target in self.targets:
+            name = target.collection_name
+            collection = self.db[name]
+            documents = movies[name]
+            batches = self.batcher.split(documents, sizes[name]) if self.batcher else ([documents] if documents else [])
+            
+            for batch in batches:
+                result = self._write_batch(timed_write, collection, batch)
+                results.append(result)
+                with self.lock:
+                    stats['per_target'][name] += result.get('inserted', 0)
+        
+        return results, transform_errors
+    
+    def _skip_chunk(self, chunk_idx: int, chunk: pd.DataFrame, stats: dict) -> bool:
+        if chunk_idx not in self.committed_chunks:
+            return False
+        stats['resumed_chunks'] += 1
+        stats['resumed_rows'] += len(chunk)
+        return True
+    
+    def _new_stats(self) -> dict:
+        stats = super()._new_stats()
+        stats.update({'resumed_chunks': 0, 'resumed_rows': 0,
+                      'per_target': {target.collection_name: 0 for target in self.targets}})
+        return stats
+    
+    def _documents_done(self, stats: dict) -> int:
+        return super()._documents_done(stats) // len(self.targets)
+    
+    def _change_tracker(self, collection):
+        if self.rollup_manager is not None and collection.name == self.collection.name:
+            return self.rollup_manager
+        return None
+    
+    def _insert_chunks(self, chunks, total_rows):
+        if len(self.targets) > 1:
+            print(f"Fanning out to {len(self.targets)} collections: {', '.join(t.collection_name for t in self.targets)}")
+        return super()._insert_chunks(chunks, total_rows)
+    
+    def _journal_layout(self, source_hash: str) -> dict:
+        """Everything that determines how the source is cut into chunks"""
+        return {
+            'source_hash': source_hash,
+            'chunk_size': self.batch_size,
+            'streaming': self.streaming,
+            'cached': self.cache is not None,
+            'incremental': self.incremental,
+            'targets': [target.collection_name for target in self.targets]
+        }
+    
+    def _open_journal(self, source_hash: str) -> bool:
+        """Starts a checkpoint journal, or picks up the committed chunks of an interrupted one.
+        
+        Returns True when an interrupted import is being resumed.
+        """
+        journal = self.db[self.JOURNAL_COLLECTION]
+        layout = self._journal_layout(source_hash)
+        self.committed_chunks = set()
+        
+        if self.resume:
+            previous = journal.find_one({'_id': self.collection_name})
+            if previous and previous.get('status') == 'running' and previous.get('layout') == layout:
+                self.committed_chunks = set(previous.get('committed', []))
+                print(f"Resuming import: {len(self.committed_chunks):,} chunks already committed")
+                return True
+            print(f"No interrupted import with the same source and chunk layout, starting from scratch")
+        
+        journal.replace_one(
+            {'_id': self.collection_name},
+            {
+                '_id': self.collection_name,
+                'layout': layout,
+                'status': 'running',
+                'started_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+                'committed': []
+            },
+            upsert=True
+        )
+        return False
+    
+    def _commit_chunk(self, chunk_idx: int):
+        self.db[self.JOURNAL_COLLECTION].update_one(
+            {'_id': self.collection_name},
+            {'$addToSet': {'committed': chunk_idx}}
+        )
+    
+    def _close_journal(self):
+        self.db[self.JOURNAL_COLLECTION].update_one(
+            {'_id': self.collection_name},
+            {'$set': {'status': 'completed', 'completed_at': time.strftime('%Y-%m-%d %H:%M:%S')}}
+        )
+    
+    def _import_details(self, stats: dict) -> dict:
+        return {
+            'index_strategy': self.index_strategy,
+            'load_seconds': stats.get('load_seconds'),
+            'index_seconds': stats.get('index_seconds'),
+            'indexes': stats.get('indexes', []),
+            'rollups': stats.get('rollups', []),
+            'generation': stats.get('generation')
+        }
+    
+    def _export_ingestion_report(self, stats: dict, total_rows: int):
+        if not self.report_path:
+            return
+        
+        self.profiler.export(self.report_path, {
+            'collection': self.collection_name,
+            'streaming': self.streaming,
+            'cached': self.cache is not None,
+            'incremental': self.incremental,
+            'chunk_size': self.batch_size,
+            'workers': self.num_workers,
+            'writers': self.num_writers,
+            'index_strategy': self.index_strategy,
+            'total_rows': total_rows,
+            'inserted': stats['inserted'],
+            'errors': stats['errors'],
+            'load_seconds': stats['load_seconds'],
+            'index_seconds': stats['index_seconds']
+        })
     
     def load_movies_to_db(self) -> bool:
         try:
             print(f"Reading CSV: {self.csv_path}")
-            df = pd.read_csv(self.csv_path)
-            print(f"Loaded {len(df):,} rows from CSV")
             
-            print(f"Unique TMDB IDs: {df['id'].nunique():,}")
-            print(f"TMDB ID duplicates: {df['id'].duplicated().sum():,}")
-            print(f"Missing IMDB IDs: {df['imdb_id'].isna().sum():,}")
+            self.collection = self.db[self.targets[0].collection_name]
+            self.rollup_manager = None
+            rollup_specs = (ROLLUPS if self.build_rollups else []) + ([RELEASE_MONTH_BUCKETS] if self.build_buckets else [])
+            if rollup_specs and self.targets[0].models_path is None:              # rollups read the v2 schema
+                self.rollup_manager = RollupManager(self.db, self.collection, rollup_specs)
+            source_hash = self._source_fingerprint()
             
-            df = self._clean_duplicates(df)
+            if self.incremental and self._last_import().get('source_hash') == source_hash:
+                print(f"Source file unchanged since the last completed import, skipping load")
+                return True
             
-            total_rows = len(df)
+            self.profiler = IngestionProfiler(self.trace_memory)
+            self.profiler.start()
             
-            self.collection = self.db[self.collection_name]
-            self.collection.drop()
-            print(f"Collection '{self.collection_name}' prepared")
+            if self.streaming:
+                print(f"Streaming mode: chunk size {self.batch_size:,} rows"
+                      + (f", memory ceiling {self.max_memory_mb} MB" if self.max_memory_mb else ""))
+                keep_mask = self._select_streaming_winners()
+                total_rows = int(keep_mask.sum())
+                chunks = self._stream_clean_chunks(keep_mask)
+            else:
+                with self.profiler.stage('csv_read'):
+                    df = self._read_dataset()
+                self.profiler.add_rows('csv_read', len(df))
+                print(f"Loaded {len(df):,} rows from CSV")
+                
+                print(f"Unique TMDB IDs: {df['id'].nunique():,}")
+                print(f"TMDB ID duplicates: {df['id'].duplicated().sum():,}")
+                print(f"Missing IMDB IDs: {df['imdb_id'].isna().sum():,}")
+                
+                df = self._clean_duplicates(df)
+                
+                total_rows = len(df)
+                chunks = (df.iloc[start:start + self.batch_size] for start in range(0, total_rows, self.batch_size))
             
-            processed = 0
-            duplicate_errors = 0
-            other_errors = 0
+            resuming = self._open_journal(source_hash)
+            bump_generation(self.db)            # cached query results from before this load are dead from here on
             
-            num_chunks = (total_rows + self.batch_size - 1) // self.batch_size
+            index_managers = []
+            index_records = []
             
-            chunk_data_list = []
-            for chunk_idx in range(num_chunks):
-                start_idx = chunk_idx * self.batch_size
-                end_idx = min(start_idx + self.batch_size, total_rows)
-                chunk_data_list.append((chunk_idx, start_idx, end_idx, df))
+            for target in self.targets:
+                collection = self.db[target.collection_name]
+                if self.incremental:
+                    print(f"Collection '{target.collection_name}' kept for incremental load")
+                elif resuming:
+                    print(f"Collection '{target.collection_name}' kept, resuming after the last committed chunk")
+                else:
+                    collection.drop()
+                    print(f"Collection '{target.collection_name}' prepared")
+                
+                index_manager = IndexManager(collection, target.indexes)
+                index_managers.append(index_manager)
+                
+                if self.incremental:
+                    if self.index_strategy != 'none':
+                        index_records += index_manager.build_indexes(missing_only=True)  # live collection stays indexed
+                elif self.index_strategy == 'after':
+                    index_manager.drop_indexes()
+                elif self.index_strategy == 'during':
+                    index_records += index_manager.build_indexes()
             
-            print(f"Processing with {self.num_workers} workers...")
+            self.seen_ids = set()
+            self.batcher = AdaptiveBatcher(target_bytes=self.batch_bytes) if self.adaptive_batches else None
+            self.pool_metrics.reset()
+            load_start = time.perf_counter()
+            stats = self._insert_chunks(chunks, total_rows)
             
-            with ThreadPoolExecutor(max_workers=self.num_workers) as executor:
-                futures = {executor.submit(self._process_chunk, chunk_data): chunk_data[0] 
-                          for chunk_data in chunk_data_list}
-                
-                completed = 0
-                for future in as_completed(futures):
-                    try:
-                        inserted, dups, errors = future.result()
-                        processed += inserted
-                        duplicate_errors += dups
-                        other_errors += errors
-                        completed += 1
-                        
-                        if completed % 10 == 0 or completed == num_chunks:
-                            print(f"Processed {processed:,}/{total_rows:,} documents ({(processed/total_rows)*100:.1f}%)")
-                    except Exception as e:
-                        print(f"Chunk processing error: {type(e).__name__}: {str(e)}")
-                        other_errors += 1
+            if self.incremental and self.delete_missing:
+                stats['deleted'] = sum(self._delete_vanished(self.db[target.collection_name]) for target in self.targets)
+            
+            stats['load_seconds'] = round(time.perf_counter() - load_start, 2)
+            
+            if self.index_strategy == 'after' and not self.incremental:
+                print(f"\nBuilding {sum(len(manager.specs) for manager in index_managers)} indexes...")
+                with self.profiler.stage('index_build'):
+                    for index_manager in index_managers:
+                        index_records += index_manager.build_indexes()
+            
+            stats['indexes'] = index_records
+            
+            rollup_records = []
+            if self.rollup_manager:
+                with self.profiler.stage('rollups'):
+                    if self.incremental and self.rollup_manager.exists():
+                        print(f"\nRefreshing {self.rollup_manager.pending_keys():,} rollup keys...")
+                        rollup_records = self.rollup_manager.refresh()
+                    else:
+                        print(f"\nBuilding {len(self.rollup_manager.specs)} rollups...")
+                        rollup_records = self.rollup_manager.build()
+            stats['rollups'] = rollup_records
+            stats['generation'] = bump_generation(self.db)          # results cached while the load was running are dead too
+            stats['index_seconds'] = round(sum(record['build_time_ms'] for record in index_records) / 1000, 2)
+            self.profiler.stop()
             
             print(f"\nImport complete:")
-            print(f"  Successfully inserted: {processed:,}")
-            if duplicate_errors > 0:
-                print(f"  Duplicates skipped: {duplicate_errors:,}")
-            if other_errors > 0:
-                print(f"  Errors: {other_errors:,}")
+            print(f"  Successfully inserted: {stats['inserted']:,}")
+            if len(self.targets) > 1:
+                for name, inserted in stats['per_target'].items():
+                    print(f"    {name}: {inserted:,}")
+            if stats['resumed_chunks'] > 0:
+                print(f"  Skipped (committed before restart): {stats['resumed_rows']:,} rows in {stats['resumed_chunks']:,} chunks")
+            if self.incremental:
+                print(f"  Updated: {stats['updated']:,}")
+                print(f"  Unchanged: {stats['unchanged']:,}")
+                if self.delete_missing:
+                    print(f"  Deleted (no longer in source): {stats['deleted']:,}")
+            if stats['duplicates'] > 0:
+                print(f"  Duplicates skipped: {stats['duplicates']:,}")
+            if stats['errors'] > 0:
+                print(f"  Errors: {stats['errors']:,}")
+            
+            self.pool_metrics.report()
+            if self.batcher:
+                self.batcher.report()
+            IndexManager.print_report(index_records)
+            RollupManager.print_report(rollup_records)
+            self.profiler.print_report()
+            self._export_ingestion_report(stats, total_rows)
+            
+            print(f"\nReady to query after {stats['load_seconds'] + stats['index_seconds']:.1f}s "
+                  f"(load {stats['load_seconds']:.1f}s + indexes {stats['index_seconds']:.1f}s, strategy '{self.index_strategy}')")
+            
+            if stats['failed_chunks'] > 0:
+                print(f"\n{stats['failed_chunks']:,} chunks failed to write - run again with --resume to retry them")
+            else:
+                self._record_import(source_hash, stats)
+                self._close_journal()
             
             return True
             
@@ -170,6 +478,8 @@ class DatabaseInitializer:
         try:
             count = self.collection.count_documents({})
             print(f"Total documents: {count:,}")
+            for target in self.targets[1:]:
+                print(f"Total documents in '{target.collection_name}': {self.db[target.collection_name].count_documents({}):,}")
             
             with_imdb = self.collection.count_documents({"media.imdb_id": {"$ne": ""}})
             print(f"Documents with IMDB ID: {with_imdb:,} ({(with_imdb/count)*100:.1f}%)")
@@ -204,12 +514,77 @@ class DatabaseInitializer:
             print(f"Verification failed: {type(e).__name__}: {str(e)}")
 
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Load the TMDB CSV into MongoDB")
+    parser.add_argument('--streaming', action='store_true',
+                        help="read, deduplicate and insert the CSV in fixed-size chunks")
+    parser.add_argument('--chunk-size', type=int, default=10000,
+                        help="rows per CSV chunk / insert batch")
+    parser.add_argument('--max-memory-mb', type=int, default=None,
+                        help="upper bound for chunk data buffered in flight")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="transform processes (default: CPU count)")
+    parser.add_argument('--writers', type=int, default=4,
+                        help="threads issuing insert_many calls")
+    parser.add_argument('--max-pool-size', type=int, default=10,
+                        help="maxPoolSize of the shared MongoClient")
+    parser.add_argument('--incremental', action='store_true',
+                        help="upsert only new or changed movies instead of dropping the collection")
+    parser.add_argument('--delete-missing', action='store_true',
+                        help="with --incremental, delete movies no longer present in the CSV")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="parse the CSV directly instead of through the Parquet cache")
+    parser.add_argument('--batch-mb', type=float, default=4,
+                        help="initial BSON size of one insert batch, tuned during the load")
+    parser.add_argument('--fixed-batches', action='store_true',
+                        help="insert each CSV chunk as one batch instead of adaptive byte-sized batches")
+    parser.add_argument('--resume', action='store_true',
+                        help="continue an interrupted import, skipping chunks already committed")
+    parser.add_argument('--index-strategy', choices=IndexManager.STRATEGIES, default='after',
+                        help="build indexes after the load, keep them during the load, or skip them; "
+                             "--incremental keeps existing indexes and only builds missing ones")
+    parser.add_argument('--with-v1', action='store_true',
+                        help="also load the v1 schema into 'movies' from the same CSV pass")
+    parser.add_argument('--no-rollups', action='store_true',
+                        help="skip building/refreshing the rollup collections after the load")
+    parser.add_argument('--buckets', action='store_true',
+                        help="also maintain release_month_buckets, one bucket document per release year/month")
+    parser.add_argument('--trace-memory', action='store_true',
+                        help="also record tracemalloc peaks per ingestion stage (slower)")
+    parser.add_argument('--ingestion-report', default='output/ingestion_report.json',
+                        help="where to write the per-stage ingestion report")
+    return parser.parse_args()
+
+
 def main():
+    args = parse_args()
+    targets = [SchemaTarget('movies_optimized')]
+    if args.with_v1:
+        targets.append(V1_TARGET)
+    
     initializer = DatabaseInitializer(
         csv_path='../../dataset/TMDB_movie_dataset_v11.csv',
         connection_string='mongodb://localhost:27017/',
         database_name='SBP_DB',
-        collection_name='movies_optimized'
+        collection_name='movies_optimized',
+        streaming=args.streaming,
+        chunk_size=args.chunk_size,
+        max_memory_mb=args.max_memory_mb,
+        num_workers=args.workers,
+        num_writers=args.writers,
+        max_pool_size=args.max_pool_size,
+        incremental=args.incremental,
+        delete_missing=args.delete_missing,
+        use_cache=not args.no_cache,
+        index_strategy=args.index_strategy,
+        adaptive_batches=not args.fixed_batches,
+        batch_bytes=int(args.batch_mb * 1024 * 1024),
+        resume=args.resume,
+        trace_memory=args.trace_memory,
+        report_path=args.ingestion_report,
+        targets=targets,
+        rollups=not args.no_rollups,
+        buckets=args.buckets
     )
     
     if not initializer.connect():
@@ -0,0 +1,240 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Load Generator - opterećenje MongoDB-a registrovanim query-jima
+N konkurentnih klijenata izvršava mešavinu V1/V2 query-ja zadato vreme,
+u zatvorenoj (closed-loop) ili otvorenoj (open-loop) petlji, i meri
+QPS i p50/p95/p99/max latenciju po query-ju i verziji
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+import matplotlib.pyplot as plt
+import matplotlib
+matplotlib.use('Agg')
+from pymongo import AsyncMongoClient
+
+from queries import registered_queries
+
+
+# gornje granice histograma u ms, poslednji bucket je sve preko 10s
+HISTOGRAM_BOUNDS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000]
+
+
+class LoadGenerator:
+    """Drives the registered query mix from many concurrent clients for a fixed duration.
+
+    closed - each of the clients sends its next query as soon as the previous one
+             returns (plus optional think time); throughput adapts to the server
+    open   - queries arrive as a Poisson process at a fixed rate no matter how fast
+             the server answers; at most `clients` are in flight, and latency is
+             counted from the scheduled arrival so queueing delay is not hidden
+    """
+
+    def __init__(self, entries: List[Dict], uri: str = 'mongodb://localhost:27017/', database_name: str = 'SBP_DB',
+                 clients: int = 8, duration: float = 30.0, mode: str = 'closed', rate: Optional[float] = None,
+                 think_time: float = 0.0, seed: Optional[int] = None):
+        if mode == 'open' and not rate:
+            raise ValueError("open-loop mode needs a target rate (queries per second)")
+        if not entries:
+            raise ValueError("the query mix is empty - no registered query matches the selected versions/queries")
+        self.entries = entries
+        self.uri = uri
+        self.database_name = database_name
+        self.clients = clients
+        self.duration = duration
+        self.mode = mode
+        self.rate = rate
+        self.think_time = think_time
+        self.random = random.Random(seed)
+        self.samples = []
+        self.elapsed = 0.0
+
+    async def _execute(self, db, entry: Dict, scheduled: float):
+        error = None
+        try:
+            cursor = await db[entry['collection']].aggregate(entry['pipeline'], allowDiskUse=True)
+            await cursor.to_list()
+        except Exception as e:
+            error = f"{type(e).__name__}: {str(e)}"
+        self.samples.append({
+            'query': entry['query'],
+            'version': entry['version'],
+            'latency_ms': (time.perf_counter() - scheduled) * 1000,
+            'error': error
+        })
+
+    async def _closed_client(self, db, deadline: float):
+        while time.perf_counter() < deadline:
+            await self._execute(db, self.random.choice(self.entries), time.perf_counter())
+            if self.think_time:
+                await asyncio.sleep(self.think_time)
+
+    async def _open_loop(self, db, deadline: float):
+        slots = asyncio.Semaphore(self.clients)
+        tasks = []
+
+        async def arrival(entry, scheduled):
+            async with slots:
+                await self._execute(db, entry, scheduled)
+
+        next_arrival = time.perf_counter()
+        while next_arrival < deadline:
+            delay = next_arrival - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(arrival(self.random.choice(self.entries), next_arrival)))
+            next_arrival += self.random.expovariate(self.rate)
+
+        await asyncio.gather(*tasks)
+
+    async def run_async(self):
+        client = AsyncMongoClient(self.uri, maxPoolSize=self.clients)
+        try:
+            db = client[self.database_name]
+            self.samples = []
+            start = time.perf_counter()
+            deadline = start + self.duration
+            if self.mode == 'closed':
+                await asyncio.gather(*(self._closed_client(db, deadline) for _ in range(self.clients)))
+            else:
+                await self._open_loop(db, deadline)
+            self.elapsed = time.perf_counter() - start
+        finally:
+            await client.close()
+
+    def run(self):
+        asyncio.run(self.run_async())
+
+    @staticmethod
+    def _latency_stats(latencies: List[float], elapsed: float) -> Dict:
+        values = np.array(latencies)
+        p50, p95, p99 = np.percentile(values, [50, 95, 99]) if len(values) else (0, 0, 0)
+        return {
+            'count': len(values),
+            'qps': round(len(values) / elapsed, 2) if elapsed > 0 else 0,
+            'p50_ms': round(float(p50), 2),
+            'p95_ms': round(float(p95), 2),
+            'p99_ms': round(float(p99), 2),
+            'max_ms': round(float(values.max()), 2) if len(values) else 0
+        }
+
+    @staticmethod
+    def histogram(latencies: List[float]) -> Dict[str, int]:
+        counts = np.bincount(np.searchsorted(HISTOGRAM_BOUNDS_MS, latencies, side='left'),
+                             minlength=len(HISTOGRAM_BOUNDS_MS) + 1)
+        labels = [f"<={bound}ms" for bound in HISTOGRAM_BOUNDS_MS] + [f">{HISTOGRAM_BOUNDS_MS[-1]}ms"]
+        return dict(zip(labels, counts.tolist()))
+
+    def summary(self) -> Dict:
+        ok = [sample for sample in self.samples if sample['error'] is None]
+        per_query = {}
+        for sample in ok:
+            per_query.setdefault(f"{sample['query']}_{sample['version']}", []).append(sample['latency_ms'])
+
+        versions = {}
+        for sample in ok:
+            versions.setdefault(sample['version'], []).append(sample['latency_ms'])
+
+        return {
+            'mode': self.mode,
+            'clients': self.clients,
+            'duration_s': round(self.elapsed, 2),
+            'target_rate': self.rate,
+            'total': self._latency_stats([sample['latency_ms'] for sample in ok], self.elapsed),
+            'errors': len(self.samples) - len(ok),
+            'per_query': {key: self._latency_stats(latencies, self.elapsed) for key, latencies in sorted(per_query.items())},
+            'per_version': {version: self._latency_stats(latencies, self.elapsed) for version, latencies in sorted(versions.items())},
+            'histogram': {version: self.histogram(latencies) for version, latencies in sorted(versions.items())}
+        }
+
+    def print_report(self):
+        summary = self.summary()
+        rate = f", target {self.rate} q/s" if self.mode == 'open' else ""
+        print(f"\nLoad test: {summary['mode']}-loop, {self.clients} clients{rate}, {summary['duration_s']}s")
+        print(f"  Achieved: {summary['total']['qps']} q/s over {summary['total']['count']:,} queries, {summary['errors']:,} errors")
+
+        print(f"\n  {'query':<14} {'count':>8} {'qps':>8} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'max ms':>10}")
+        for key, stats in list(summary['per_query'].items()) + list(summary['per_version'].items()):
+            print(f"  {key:<14} {stats['count']:>8,} {stats['qps']:>8.2f} {stats['p50_ms']:>10.2f} "
+                  f"{stats['p95_ms']:>10.2f} {stats['p99_ms']:>10.2f} {stats['max_ms']:>10.2f}")
+
+        for version, buckets in summary['histogram'].items():
+            total = sum(buckets.values())
+            print(f"\n  Latency histogram {version.upper()}:")
+            for label, count in buckets.items():
+                if count:
+                    print(f"    {label:>10} {count:>8,} {'#' * max(1, round(40 * count / total))}")
+
+    def plot_histogram(self, output_dir: str = 'output/graphs'):
+        os.makedirs(output_dir, exist_ok=True)
+        fig, ax = plt.subplots(figsize=(12, 6))
+        colors = {'v1': '#FF6B6B', 'v2': '#4ECDC4'}
+
+        for version in sorted({sample['version'] for sample in self.samples}):
+            latencies = [sample['latency_ms'] for sample in self.samples if sample['version'] == version and sample['error'] is None]
+            if latencies:
+                bins = np.logspace(np.log10(max(min(latencies), 0.1)), np.log10(max(latencies) * 1.01), 40)
+                ax.hist(latencies, bins=bins, alpha=0.6, label=f"{version.upper()} (p99 {np.percentile(latencies, 99):.1f}ms)",
+                        color=colors.get(version))
+
+        ax.set_xscale('log')
+        ax.set_xlabel('Latency (ms)', fontsize=12, fontweight='bold')
+        ax.set_ylabel('Queries', fontsize=12, fontweight='bold')
+        ax.set_title(f"Latency Distribution: {self.mode}-loop, {self.clients} clients", fontsize=14, fontweight='bold')
+        ax.legend(fontsize=11)
+        ax.grid(axis='y', alpha=0.3)
+
+        plt.tight_layout()
+        plt.savefig(f'{output_dir}/load_latency_histogram.png', dpi=300, bbox_inches='tight')
+        print(f"Graph saved: {output_dir}/load_latency_histogram.png")
+        plt.close()
+
+    def export(self, filepath: str):
+        os.makedirs(os.path.dirname(filepath) if os.path.dirname(filepath) else '.', exist_ok=True)
+        output = {'timestamp': time.strftime('%Y-%m-%d %H:%M:%S')}
+        output.update(self.summary())
+
+        with open(filepath, 'w', encoding='utf-8') as f:
+            json.dump(output, f, indent=2, ensure_ascii=False)
+
+        print(f"\nResults exported to: {filepath}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive the registered V1/V2 query mix from concurrent clients")
+    parser.add_argument('--uri', default='mongodb://localhost:27017/')
+    parser.add_argument('--database', default='SBP_DB')
+    parser.add_argument('--clients', type=int, default=8, help="concurrent clients (max in-flight queries in open-loop mode)")
+    parser.add_argument('--duration', type=float, default=30.0, help="seconds to generate load for")
+    parser.add_argument('--mode', choices=['closed', 'open'], default='closed')
+    parser.add_argument('--rate', type=float, help="open-loop arrival rate in queries per second")
+    parser.add_argument('--think-time', type=float, default=0.0, help="closed-loop pause between a client's queries, seconds")
+    parser.add_argument('--versions', nargs='+', default=['v1', 'v2'], choices=['v1', 'v2'])
+    parser.add_argument('--queries', nargs='+', help="limit the mix to these query names, e.g. query_1 query_4")
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--export', default='output/load_test.json')
+    args = parser.parse_args()
+
+    generator = LoadGenerator(registered_queries(args.versions, args.queries), args.uri, args.database,
+                              clients=args.clients, duration=args.duration, mode=args.mode, rate=args.rate,
+                              think_time=args.think_time, seed=args.seed)
+
+    print(f"Generating load for {args.duration:.0f}s...")
+    generator.run()
+    generator.print_report()
+    generator.plot_histogram()
+    generator.export(args.export)
+
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
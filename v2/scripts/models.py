@@ -1,4 +1,7 @@
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Callable, Tuple
+
+import numpy as np
+import pandas as pd
 
 
 class OptimizedMovieDocument:
@@ -136,7 +139,8 @@ class OptimizedMovieDocument:
                 "adult": doc.get('adult', False),
                 "runtime": runtime,
                 "genres": genres,
-                "sorted_genres": sorted_genres                      #added
+                "sorted_genres": sorted_genres,                     #added
+                "genre_pairs": cls.generate_genre_pairs(genres)     #added
             },
             
             "financial": {
@@ -164,3 +168,151 @@ class OptimizedMovieDocument:
             
             "keywords": cls.parse_array_field(doc.get('keywords', '')),        
         }
+    
+    @staticmethod
+    def _column(chunk: pd.DataFrame, name: str, default: Any) -> pd.Series:
+        if name in chunk.columns:
+            return chunk[name]
+        return pd.Series([default] * len(chunk), index=chunk.index)
+    
+    @staticmethod
+    def _map_unique(values: pd.Series, func: Callable[[Any], Any]) -> List[Any]:
+        """Applies func once per distinct value instead of once per row"""
+        codes, uniques = pd.factorize(values)
+        mapped = [func(value) for value in uniques]
+        return [mapped[code] if code >= 0 else func(value)          # missing values go through func as-is
+                for code, value in zip(codes.tolist(), values.tolist())]
+    
+    @classmethod
+    def _parse_genres(cls, value: Any) -> Tuple[List[str], List[str], List[str]]:
+        genres = cls.parse_array_field(value)
+        return genres, sorted(genres), cls.generate_genre_pairs(genres)
+    
+    @classmethod
+    def transform_batch(cls, chunk: pd.DataFrame) -> List[Dict[str, Any]]:
+        """Columnar equivalent of transform() for a whole chunk.
+        
+        Derived fields are computed over entire columns with NumPy/pandas, date and
+        array parsing runs once per distinct value, and the nested documents are only
+        assembled at the end. The output is identical to calling transform() per row.
+        """
+        n = len(chunk)
+        
+        budget_col = cls._column(chunk, 'budget', 0)
+        revenue_col = cls._column(chunk, 'revenue', 0)
+        vote_avg_col = cls._column(chunk, 'vote_average', 0)
+        
+        profit_col = revenue_col - budget_col
+        budget_arr = budget_col.to_numpy()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            raw_roi = ((revenue_col.to_numpy() - budget_arr) / budget_arr * 100).tolist()
+        has_budget = (budget_col > 0).tolist()
+        roi = [round(value, 2) if positive else 0.0 for value, positive in zip(raw_roi, has_budget)]
+        
+        budget_category = np.select(
+            [budget_col >= 100_000_000, budget_col >= 50_000_000, budget_col >= 10_000_000],
+            ['blockbuster', 'high', 'medium'],
+            default='low'
+        ).tolist()
+        quality_tier = np.select(
+            [vote_avg_col >= 7.0, vote_avg_col >= 6.0, vote_avg_col >= 5.0],
+            ['excellent', 'good', 'average'],
+            default='poor'
+        ).tolist()
+        is_profitable = (profit_col > 0).tolist()
+        
+        release_dates = cls._map_unique(cls._column(chunk, 'release_date', None), cls.parse_date)
+        genres = cls._map_unique(cls._column(chunk, 'genres', ''), cls._parse_genres)
+        companies = cls._map_unique(cls._column(chunk, 'production_companies', ''), cls.parse_array_field)
+        countries = cls._map_unique(cls._column(chunk, 'production_countries', ''), cls.parse_array_field)
+        spoken_languages = cls._map_unique(cls._column(chunk, 'spoken_languages', ''), cls.parse_array_field)
+        keywords = cls._map_unique(cls._column(chunk, 'keywords', ''), cls.parse_array_field)
+        
+        ids = cls._column(chunk, 'id', None).tolist()
+        titles = cls._column(chunk, 'title', '').tolist()
+        original_titles = cls._column(chunk, 'original_title', '').tolist()
+        overviews = cls._column(chunk, 'overview', '').tolist()
+        taglines = cls._column(chunk, 'tagline', '').tolist()
+        vote_avgs = vote_avg_col.tolist()
+        vote_counts = cls._column(chunk, 'vote_count', 0).tolist()
+        popularities = cls._column(chunk, 'popularity', 0).tolist()
+        statuses = cls._column(chunk, 'status', '').tolist()
+        languages = cls._column(chunk, 'original_language', '').tolist()
+        adults = cls._column(chunk, 'adult', False).tolist()
+        runtimes = cls._column(chunk, 'runtime', 0).tolist()
+        budgets = budget_col.tolist()
+        revenues = revenue_col.tolist()
+        profits = profit_col.tolist()
+        poster_paths = cls._column(chunk, 'poster_path', '').tolist()
+        backdrop_paths = cls._column(chunk, 'backdrop_path', '').tolist()
+        homepages = cls._column(chunk, 'homepage', '').tolist()
+        imdb_ids = cls._column(chunk, 'imdb_id', '').tolist()
+        
+        documents = []
+        for i in range(n):
+            release_date = release_dates[i]
+            row_genres, row_sorted_genres, row_genre_pairs = genres[i]
+            row_companies = companies[i]
+            row_countries = countries[i]
+            
+            documents.append({
+                "_id": ids[i],
+                "title": titles[i],
+                "original_title": original_titles[i],
+                "overview": overviews[i],
+                "tagline": taglines[i],
+                
+                "ratings": {
+                    "vote_average": vote_avgs[i],
+                    "vote_count": vote_counts[i],
+                    "popularity": popularities[i],
+                    "quality_tier": quality_tier[i]
+                },
+                
+                "release_info": {
+                    "status": statuses[i],
+                    "year": release_date.get('year'),
+                    "month": release_date.get('month'),
+                    "day": release_date.get('day'),
+                    "decade": release_date.get('decade'),
+                    "full_date": release_date.get('full_date'),
+                    
+                    "original_language": languages[i],
+                    "spoken_languages": list(spoken_languages[i])
+                },
+                
+                "content_info": {
+                    "adult": adults[i],
+                    "runtime": runtimes[i],
+                    "genres": list(row_genres),
+                    "sorted_genres": list(row_sorted_genres),
+                    "genre_pairs": list(row_genre_pairs)
+                },
+                
+                "financial": {
+                    "budget": budgets[i],
+                    "revenue": revenues[i],
+                    "profit": profits[i],
+                    "roi": roi[i],
+                    "is_profitable": is_profitable[i],
+                    "budget_category": budget_category[i]
+                },
+                
+                "production": {
+                    "companies": list(row_companies),
+                    "countries": list(row_countries),
+                    "company_count": len(row_companies),
+                    "country_count": len(row_countries)
+                },
+                
+                "media": {
+                    "poster_path": poster_paths[i],
+                    "backdrop_path": backdrop_paths[i],
+                    "homepage": homepages[i],
+                    "imdb_id": imdb_ids[i]
+                },
+                
+                "keywords": list(keywords[i]),
+            })
+        
+        return documents
@@ -6,29 +6,59 @@ Koristi query-je iz odvojenih fajlova
 Generiše grafove za poređenje performansi
 """
 
+import argparse
 import time
 import json
 import os
 import statistics
+from contextlib import nullcontext
+from functools import partial
 from pymongo import MongoClient
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 import matplotlib.pyplot as plt
 import matplotlib
 matplotlib.use('Agg')
 
-from queries.query_1 import QUERY_1_V1, QUERY_1_V2, QUERY_NAME as Q1_NAME
-from queries.query_2 import QUERY_2_V1, QUERY_2_V2, QUERY_NAME as Q2_NAME
-from queries.query_3 import QUERY_3_V1, QUERY_3_V2, QUERY_NAME as Q3_NAME
-from queries.query_4 import QUERY_4_V1, QUERY_4_V2, QUERY_NAME as Q4_NAME
-from queries.query_5 import QUERY_5_V1, QUERY_5_V2, QUERY_NAME as Q5_NAME
+from queries.query_1 import QUERY_1_V1, QUERY_1_V2, QUERY_1_ROLLUP, QUERY_NAME as Q1_NAME, query_1_v1, query_1_v2
+from queries.query_2 import QUERY_2_V1, QUERY_2_V2, QUERY_2_ROLLUP, QUERY_NAME as Q2_NAME
+from queries.query_3 import QUERY_3_V1, QUERY_3_V2, QUERY_3_ROLLUP, QUERY_3_BUCKETS, QUERY_NAME as Q3_NAME, query_3_v1, query_3_v2
+from queries.query_4 import QUERY_4_V1, QUERY_4_V2, QUERY_4_V2_PAIRS, QUERY_4_PAIRS_ROLLUP, QUERY_NAME as Q4_NAME
+from queries.query_5 import QUERY_5_V1, QUERY_5_V2, QUERY_5_ROLLUP, QUERY_NAME as Q5_NAME, query_5_v1, query_5_v2
+from rollups import ROLLUP_COLLECTIONS
+from columnar_engine import ColumnarEngine
+from query_cache import QueryCache, MemoryBackend, MongoBackend
+from query_profiler import QueryProfiler
+
+
+# Selectivity sweep: parametrizovani query-ji, vrednosti praga i filter kojim se broji udeo dokumenata koji prolaze
+# Vrednosti zaobilaze granice kategorija (10M/50M/100M, ocene 5.0/6.0/7.0): na granici V2 filtrira samo po
+# kategoriji (>=), a V1 po strogom >, pa bi tačka poredila različite skupove rezultata
+BUDGET_SWEEP = [1_000_000, 5_000_000, 15_000_000, 25_000_000, 35_000_000, 60_000_000, 75_000_000, 125_000_000, 150_000_000, 200_000_000]
+RATING_SWEEP = [3.0, 4.0, 4.5, 5.5, 6.5, 6.8, 7.2, 7.5, 8.0, 8.5]
+SWEEPS = {
+    'query_1': {'parameter': 'min_budget', 'values': BUDGET_SWEEP, 'v1': query_1_v1, 'v2': query_1_v2,
+                'filter': lambda value: {'financial.budget': {'$gt': value}, 'financial.revenue': {'$gt': 0}}},
+    'query_3': {'parameter': 'min_budget', 'values': BUDGET_SWEEP, 'v1': query_3_v1, 'v2': query_3_v2,
+                'filter': lambda value: {'financial.budget': {'$gt': value}, 'release_info.release_date.month': {'$exists': True}}},
+    'query_5': {'parameter': 'min_rating', 'values': RATING_SWEEP, 'v1': query_5_v1, 'v2': query_5_v2,
+                'filter': lambda value: {'ratings.vote_average': {'$gt': value}, 'content_info.runtime': {'$gt': 0}}}
+}
 
 
 class PerformanceComparator:
     
-    def __init__(self, v1_collection, v2_collection, iterations=3):
+    def __init__(self, v1_collection, v2_collection, iterations=3, columnar_engine=None, query_cache=None,
+                 warmup=1, measure_mode='single', profiler=None):
         self.v1_collection = v1_collection
         self.v2_collection = v2_collection
         self.iterations = iterations
+        self.warmup = warmup
+        self.measure_mode = measure_mode
+        self.profiler = profiler
+        self.profiles = {}          # query -> version -> per-execution server metrics from system.profile
+        self.sweeps = {}            # query -> selectivity sweep points (run_sweep)
+        self.columnar_engine = columnar_engine
+        self.query_cache = query_cache
         self.results = {
             'query_1': {'v1': {'times': [], 'docs': [], 'keys': []}, 'v2': {'times': [], 'docs': [], 'keys': []}},
             'query_2': {'v1': {'times': [], 'docs': [], 'keys': []}, 'v2': {'times': [], 'docs': [], 'keys': []}},
@@ -36,103 +66,183 @@ class PerformanceComparator:
             'query_4': {'v1': {'times': [], 'docs': [], 'keys': []}, 'v2': {'times': [], 'docs': [], 'keys': []}},
             'query_5': {'v1': {'times': [], 'docs': [], 'keys': []}, 'v2': {'times': [], 'docs': [], 'keys': []}}
         }
+        
+        # Additional contenders measured next to V1 and V2: (key, pipeline, label, collection)
+        # collection None means the V2 collection, rollup variants read their rollup collection;
+        # a callable instead of a pipeline runs in-process (columnar engine)
+        self.variants = {
+            'query_1': [('rollup', QUERY_1_ROLLUP, 'Rollup ($merge summary collection)', ROLLUP_COLLECTIONS['query_1'])],
+            'query_2': [('rollup', QUERY_2_ROLLUP, 'Rollup ($merge summary collection)', ROLLUP_COLLECTIONS['query_2'])],
+            'query_3': [('rollup', QUERY_3_ROLLUP, 'Rollup ($merge summary collection)', ROLLUP_COLLECTIONS['query_3']),
+                        ('buckets', QUERY_3_BUCKETS, 'Buckets (release month bucket pattern)', ROLLUP_COLLECTIONS['query_3_buckets'])],
+            'query_4': [('v2_pairs', QUERY_4_V2_PAIRS, 'V2 Pairs (genre_pairs + multikey index)', None),
+                        ('rollup', QUERY_4_PAIRS_ROLLUP, 'Rollup of genre pairs ($merge summary collection)', ROLLUP_COLLECTIONS['query_4_pairs'])],
+            'query_5': [('rollup', QUERY_5_ROLLUP, 'Rollup ($merge summary collection)', ROLLUP_COLLECTIONS['query_5'])]
+        }
+        if columnar_engine is not None:
+            for query_name in ColumnarEngine.QUERIES:
+                self.variants[query_name].append(
+                    ('columnar', partial(columnar_engine.run, query_name), 'Columnar engine (in-process NumPy, mmap)', None))
+        if query_cache is not None:
+            # the first run is a miss that runs the V2 pipeline (a warm-up run unless --warmup 0), the rest are cache hits
+            v2_pipelines = {'query_1': QUERY_1_V2, 'query_2': QUERY_2_V2, 'query_3': QUERY_3_V2, 'query_4': QUERY_4_V2, 'query_5': QUERY_5_V2}
+            for query_name, pipeline in v2_pipelines.items():
+                self.variants[query_name].append(
+                    ('cached', partial(query_cache.aggregate, v2_collection, pipeline), 'V2 through the query result cache', None))
+        for query_name, variants in self.variants.items():
+            for key, _, _, _ in variants:
+                self.results[query_name][key] = {'times': [], 'docs': [], 'keys': []}
+    
+    def measure_query(self, collection, query_pipeline, query_name: str, version: str, hint=None) -> Tuple[List, List, List]:
+        """Measures query execution time and collects metrics.
+
+        single       - warm-up runs, then timed runs that only execute the pipeline;
+                       docs/keys examined come from one explain after the timed runs
+        explain-each - every timed run is followed by its own explain (older behaviour)
+
+        hint forces a plan, e.g. {'$natural': 1} for a collection scan.
+        """
+        times = []
+        docs_examined = []
+        keys_examined = []
+        hint_options = {'hint': hint} if hint else {}
+        
+        for i in range(self.warmup):
+            try:
+                list(collection.aggregate(query_pipeline, allowDiskUse=True, **hint_options))
+            except Exception as e:
+                print(f"  Error in warm-up run {i+1}: {str(e)}")
+        
+        for i in range(self.iterations):
+            try:
+                options = dict(hint_options)
+                if self.profiler:
+                    options['comment'] = self.profiler.comment(query_name, version.lower(), i)
+                start = time.perf_counter_ns()
+                cursor = collection.aggregate(query_pipeline, allowDiskUse=True, **options)
+                result = list(cursor)
+                exec_time = (time.perf_counter_ns() - start) / 1e6
+                times.append(exec_time)
+                
+                if self.measure_mode == 'explain-each':
+                    total_docs, total_keys = self._explain_stats(collection, query_pipeline, hint)
+                    docs_examined.append(total_docs)
+                    keys_examined.append(total_keys)
+                    print(f"  Iteration {i+1}: {exec_time:.2f}ms, Docs: {total_docs}, Keys: {total_keys}")
+                else:
+                    print(f"  Iteration {i+1}: {exec_time:.2f}ms")
+                
+            except Exception as e:
+                print(f"  Error in iteration {i+1}: {str(e)}")
+                times.append(None)
+                if self.measure_mode == 'explain-each':
+                    docs_examined.append(None)
+                    keys_examined.append(None)
+        
+        if self.measure_mode == 'single' and any(t is not None for t in times):
+            total_docs, total_keys = self._explain_stats(collection, query_pipeline, hint)
+            docs_examined.append(total_docs)
+            keys_examined.append(total_keys)
+            print(f"  Explain: Docs: {total_docs}, Keys: {total_keys}")
+        
+        if self.profiler:
+            executions = self.profiler.collect(query_name, version.lower())
+            self.profiles.setdefault(query_name, {})[version.lower()] = executions
+            for execution in executions:
+                print(f"  Server (profiler) {execution['iteration']+1}: {execution['millis']}ms, Docs: {execution['docs_examined']}, "
+                      f"Keys: {execution['keys_examined']}, Returned: {execution['nreturned']}, Plan: {execution['plan_summary']}"
+                      + (", used disk" if execution['used_disk'] else ""))
+        
+        return times, docs_examined, keys_examined
     
-    def measure_query(self, collection, query_pipeline, query_name: str, version: str) -> Tuple[List, List, List]:
-            """Measures query execution time and collects metrics"""
-            times = []
-            docs_examined = []
-            keys_examined = []
+    def _explain_stats(self, collection, query_pipeline, hint=None) -> Tuple[Optional[int], Optional[int]]:
+        """Runs the pipeline once through explain (executionStats) and returns docs/keys examined, None when explain fails"""
+        try:
+            command = {
+                'aggregate': collection.name,
+                'pipeline': query_pipeline,
+                'cursor': {},
+                'allowDiskUse': True
+            }
+            if hint:
+                command['hint'] = hint
+            explain_result = collection.database.command(
+                'explain',
+                command,
+                verbosity='executionStats'
+            )
+            
+            total_docs = 0
+            total_keys = 0
             
-            for i in range(self.iterations):
-                try:
-                    start = time.time()
-                    cursor = collection.aggregate(query_pipeline, allowDiskUse=True)
-                    result = list(cursor)
-                    end = time.time()
-                    
-                    exec_time = (end - start) * 1000
-                    times.append(exec_time)
-                    
-                    try:
-                        explain_result = collection.database.command(
-                            'explain',
-                            {
-                                'aggregate': collection.name,
-                                'pipeline': query_pipeline,
-                                'cursor': {},
-                                'allowDiskUse': True
-                            },
-                            verbosity='executionStats'
-                        )
-                        
-                        total_docs = 0
-                        total_keys = 0
-                        
-                        if 'executionStats' in explain_result:
-                            exec_stats = explain_result['executionStats']
-                            total_docs = exec_stats.get('totalDocsExamined', 0)
-                            total_keys = exec_stats.get('totalKeysExamined', 0)
+            if 'executionStats' in explain_result:
+                exec_stats = explain_result['executionStats']
+                total_docs = exec_stats.get('totalDocsExamined', 0)
+                total_keys = exec_stats.get('totalKeysExamined', 0)
+                
+                if total_docs == 0 and 'executionStages' in exec_stats:
+                    docs_list = []
+                    keys_list = []
+                    self._extract_stats_from_stages(exec_stats['executionStages'], docs_list, keys_list)
+                    total_docs = sum(docs_list)
+                    total_keys = sum(keys_list)
+            
+            if total_docs == 0 and 'stages' in explain_result:
+                for stage in explain_result['stages']:
+                    if '$cursor' in stage:
+                        cursor_info = stage['$cursor']
+                        if 'executionStats' in cursor_info:
+                            exec_stats = cursor_info['executionStats']
+                            total_docs += exec_stats.get('totalDocsExamined', 0)
+                            total_keys += exec_stats.get('totalKeysExamined', 0)
                             
                             if total_docs == 0 and 'executionStages' in exec_stats:
                                 docs_list = []
                                 keys_list = []
                                 self._extract_stats_from_stages(exec_stats['executionStages'], docs_list, keys_list)
-                                total_docs = sum(docs_list)
-                                total_keys = sum(keys_list)
-                        
-                        if total_docs == 0 and 'stages' in explain_result:
-                            for stage in explain_result['stages']:
-                                if '$cursor' in stage:
-                                    cursor_info = stage['$cursor']
-                                    if 'executionStats' in cursor_info:
-                                        exec_stats = cursor_info['executionStats']
-                                        total_docs += exec_stats.get('totalDocsExamined', 0)
-                                        total_keys += exec_stats.get('totalKeysExamined', 0)
-                                        
-                                        if total_docs == 0 and 'executionStages' in exec_stats:
-                                            docs_list = []
-                                            keys_list = []
-                                            self._extract_stats_from_stages(exec_stats['executionStages'], docs_list, keys_list)
-                                            total_docs += sum(docs_list)
-                                            total_keys += sum(keys_list)
-                        
-                        if total_docs == 0 and 'queryPlanner' in explain_result:
-                            planner = explain_result['queryPlanner']
-                            if 'winningPlan' in planner:
-                                pass
-                            
-                    except Exception as e:
-                        try:
-                            explain_result = collection.database.command(
-                                'aggregate',
-                                collection.name,
-                                pipeline=query_pipeline,
-                                explain=True
-                            )
-                            
-                            if i == 0:
-                                print(f"    [Debug] Explain keys: {list(explain_result.keys())}")
-                            
-                            total_docs = 0
-                            total_keys = 0
-                            
-                        except Exception as e2:
-                            print(f"    Could not get explain stats: {str(e2)}")
-                            total_docs = 0
-                            total_keys = 0
-                    
-                    docs_examined.append(total_docs)
-                    keys_examined.append(total_keys)
-                    
-                    print(f"  Iteration {i+1}: {exec_time:.2f}ms, Docs: {total_docs}, Keys: {total_keys}")
-                    
-                except Exception as e:
-                    print(f"  Error in iteration {i+1}: {str(e)}")
-                    times.append(None)
-                    docs_examined.append(None)
-                    keys_examined.append(None)
+                                total_docs += sum(docs_list)
+                                total_keys += sum(keys_list)
             
-            return times, docs_examined, keys_examined
+            return total_docs, total_keys
+            
+        except Exception as e:
+            print(f"    Could not get explain stats: {type(e).__name__}: {str(e)}")
+            return None, None
+    
+    def measure_callable(self, func) -> Tuple[List, List, List]:
+        """Measures an in-process contender; it examines no MongoDB documents or keys"""
+        times = []
+        
+        for i in range(self.warmup):
+            try:
+                func()
+            except Exception as e:
+                print(f"  Error in warm-up run {i+1}: {str(e)}")
+        
+        for i in range(self.iterations):
+            try:
+                start = time.perf_counter_ns()
+                func()
+                exec_time = (time.perf_counter_ns() - start) / 1e6
+                times.append(exec_time)
+                print(f"  Iteration {i+1}: {exec_time:.2f}ms")
+            except Exception as e:
+                print(f"  Error in iteration {i+1}: {str(e)}")
+                times.append(None)
+        
+        return times, [0] * len(times), [0] * len(times)
+    
+    @staticmethod
+    def time_stats(times: List[float]) -> Dict:
+        """Mean, median, sample stddev and p95 of the timed runs"""
+        if not times:
+            return {'mean': 0, 'median': 0, 'stddev': 0, 'p95': 0}
+        return {
+            'mean': statistics.mean(times),
+            'median': statistics.median(times),
+            'stddev': statistics.stdev(times) if len(times) > 1 else 0,
+            'p95': statistics.quantiles(times, n=20, method='inclusive')[-1] if len(times) > 1 else times[0]
+        }
         
     def _extract_stats_from_stages(self, stage, docs_list, keys_list):
         """Recursively extracts statistics from executionStages"""
@@ -186,6 +296,22 @@ class PerformanceComparator:
             self.results[query_name]['v2']['docs'] = [d for d in v2_docs if d is not None]
             self.results[query_name]['v2']['keys'] = [k for k in v2_keys if k is not None]
             
+            for key, pipeline, label, collection_name in self.variants.get(query_name, []):
+                if collection_name and collection_name not in self.v2_collection.database.list_collection_names():
+                    print(f"\n{label}: skipped, collection '{collection_name}' does not exist")
+                    continue
+                print(f"\n{label}:")
+                if callable(pipeline):
+                    # cache hits read the data generation once for the whole variant, not once per run
+                    with self.query_cache.pinned_generation() if key == 'cached' else nullcontext():
+                        times, docs, keys = self.measure_callable(pipeline)
+                else:
+                    collection = self.v2_collection.database[collection_name] if collection_name else self.v2_collection
+                    times, docs, keys = self.measure_query(collection, pipeline, query_name, key.upper())
+                self.results[query_name][key]['times'] = [t for t in times if t is not None]
+                self.results[query_name][key]['docs'] = [d for d in docs if d is not None]
+                self.results[query_name][key]['keys'] = [k for k in keys if k is not None]
+            
             self._print_query_stats(query_name, description)
     
     def _print_query_stats(self, query_name: str, description: str):
@@ -211,16 +337,124 @@ class PerformanceComparator:
             
             speedup = v1_avg / v2_avg if v2_avg > 0 else 0
             
+            v1_stats = self.time_stats(v1_times)
+            v2_stats = self.time_stats(v2_times)
+            
             print(f"\n  RESULTS:")
             print(f"  Execution Time:")
             print(f"     V1: {v1_avg:.2f}ms | V2: {v2_avg:.2f}ms | Improvement: {time_improvement:.1f}% | Speedup: {speedup:.2f}x")
+            print(f"     V1 median {v1_stats['median']:.2f}ms ± {v1_stats['stddev']:.2f}, p95 {v1_stats['p95']:.2f}ms | "
+                  f"V2 median {v2_stats['median']:.2f}ms ± {v2_stats['stddev']:.2f}, p95 {v2_stats['p95']:.2f}ms")
             print(f"  Docs Examined:")
             print(f"     V1: {v1_docs_avg:.0f} | V2: {v2_docs_avg:.0f} | Improvement: {docs_improvement:.1f}%")
             print(f"  Keys Examined:")
             print(f"     V1: {v1_keys_avg:.0f} | V2: {v2_keys_avg:.0f} | Improvement: {keys_improvement:.1f}%")
+            
+            for key, _, label, _ in self.variants.get(query_name, []):
+                variant = self.results[query_name][key]
+                if not variant['times']:
+                    continue
+                variant_avg = statistics.mean(variant['times'])
+                variant_stats = self.time_stats(variant['times'])
+                print(f"  {label}:")
+                print(f"     Time: {variant_avg:.2f}ms (median {variant_stats['median']:.2f}ms ± {variant_stats['stddev']:.2f}, "
+                      f"p95 {variant_stats['p95']:.2f}ms) | Speedup vs V1: {v1_avg / variant_avg if variant_avg > 0 else 0:.2f}x | "
+                      f"vs V2: {v2_avg / variant_avg if variant_avg > 0 else 0:.2f}x")
+                print(f"     Docs: {statistics.mean(variant['docs']) if variant['docs'] else 0:.0f} | "
+                      f"Keys: {statistics.mean(variant['keys']) if variant['keys'] else 0:.0f}")
         else:
             print("  Error: Could not measure times")
     
+    def run_sweep(self, query_names: List[str]):
+        """Runs V1, V2 and V2 forced to a collection scan (and the columnar engine, if
+        enabled) at every predicate value of SWEEPS.
+
+        The x axis of a sweep is the fraction of documents matching the query's
+        filter, counted on the V1 collection; the crossover is the first fraction
+        where the V2 plan is no longer faster than scanning the collection.
+        """
+        print("\n" + "="*70)
+        print("SELECTIVITY SWEEP: V1 vs V2 vs V2 COLLSCAN")
+        print("="*70)
+        
+        total = self.v1_collection.count_documents({})
+        
+        for query_name in query_names:
+            sweep = SWEEPS[query_name]
+            points = []
+            
+            for value in sweep['values']:
+                matching = self.v1_collection.count_documents(sweep['filter'](value))
+                fraction = matching / total if total else 0
+                print(f"\n{query_name} {sweep['parameter']}={value}: {matching:,} matching documents ({fraction:.1%})")
+                
+                point = {'value': value, 'matching': matching, 'fraction': round(fraction, 4)}
+                label = f"{query_name}@{value}"
+                contenders = [
+                    ('v1', self.v1_collection, sweep['v1'](value), None),
+                    ('v2', self.v2_collection, sweep['v2'](value), None),
+                    ('v2_collscan', self.v2_collection, sweep['v2'](value), {'$natural': 1})
+                ]
+                if self.columnar_engine is not None:
+                    contenders.append(('columnar', None, partial(self.columnar_engine.run, query_name, **{sweep['parameter']: value}), None))
+                for version, collection, pipeline, hint in contenders:
+                    print(f"  {version.upper()}:")
+                    if callable(pipeline):
+                        times, docs, keys = self.measure_callable(pipeline)
+                    else:
+                        times, docs, keys = self.measure_query(collection, pipeline, label, version, hint)
+                    times = [t for t in times if t is not None]
+                    docs = [d for d in docs if d is not None]
+                    keys = [k for k in keys if k is not None]
+                    stats = self.time_stats(times)
+                    point[version] = {
+                        'median_time_ms': round(stats['median'], 2) if times else None,   # None: every run failed
+                        'p95_time_ms': round(stats['p95'], 2) if times else None,
+                        'docs': statistics.median(docs) if docs else None,        # None: explain failed
+                        'keys': statistics.median(keys) if keys else None
+                    }
+                    if self.profiler:
+                        point[version]['profile'] = QueryProfiler.summarize(self.profiles.get(label, {}).get(version, []))
+                points.append(point)
+            
+            self.sweeps[query_name] = {
+                'parameter': sweep['parameter'],
+                'total_documents': total,
+                'points': points,
+                'crossover': self.crossover(points)
+            }
+            self._print_sweep(query_name)
+    
+    @staticmethod
+    def crossover(points: List[Dict]) -> Dict:
+        """First point, by increasing match fraction, where V2 is not faster than its forced collection scan"""
+        for point in sorted(points, key=lambda point: point['fraction']):
+            v2_time, scan_time = point['v2']['median_time_ms'], point['v2_collscan']['median_time_ms']
+            if v2_time is None or scan_time is None:
+                continue                # no successful run to compare
+            if v2_time >= scan_time:
+                return {'value': point['value'], 'fraction': point['fraction']}
+        return None
+    
+    def _print_sweep(self, query_name: str):
+        sweep = self.sweeps[query_name]
+        print(f"\n  SWEEP {query_name} ({sweep['parameter']}):")
+        columnar = self.columnar_engine is not None
+        print(f"  {'value':>12} {'match %':>8} {'V1 ms':>10} {'V2 ms':>10} {'SCAN ms':>10} "
+              + (f"{'COL ms':>10} " if columnar else "") + f"{'V1 docs':>10} {'V2 docs':>10} {'V2 keys':>10}")
+        count = lambda value: f"{value:,.0f}" if value is not None else '-'
+        ms = lambda value: f"{value:.2f}" if value is not None else '-'
+        for point in sweep['points']:
+            print(f"  {point['value']:>12,} {point['fraction'] * 100:>8.1f} {ms(point['v1']['median_time_ms']):>10} "
+                  f"{ms(point['v2']['median_time_ms']):>10} {ms(point['v2_collscan']['median_time_ms']):>10} "
+                  + (f"{ms(point['columnar']['median_time_ms']):>10} " if columnar else "")
+                  + f"{count(point['v1']['docs']):>10} {count(point['v2']['docs']):>10} {count(point['v2']['keys']):>10}")
+        if sweep['crossover']:
+            print(f"  V2 stops beating a collection scan at {sweep['parameter']}={sweep['crossover']['value']} "
+                  f"({sweep['crossover']['fraction']:.1%} of documents)")
+        else:
+            print(f"  V2 beats a collection scan at every swept value")
+    
     def get_summary(self) -> Dict:
         """Generates summary statistics"""
         summary = {}
@@ -253,6 +487,35 @@ class PerformanceComparator:
                     'keys_improvement_percent': round(((v1_avg_keys - v2_avg_keys) / v1_avg_keys) * 100, 1) if v1_avg_keys > 0 else 0,
                     'speedup_factor': round(v1_avg_time / v2_avg_time, 2)
                 }
+                
+                for prefix, times in [('v1', v1_times), ('v2', v2_times)]:
+                    stats = self.time_stats(times)
+                    summary[query_name][f'{prefix}_median_time_ms'] = round(stats['median'], 2)
+                    summary[query_name][f'{prefix}_stddev_time_ms'] = round(stats['stddev'], 2)
+                    summary[query_name][f'{prefix}_p95_time_ms'] = round(stats['p95'], 2)
+                v2_median_time = summary[query_name]['v2_median_time_ms']
+                summary[query_name]['median_speedup_factor'] = round(summary[query_name]['v1_median_time_ms'] / v2_median_time, 2) if v2_median_time > 0 else 0
+                
+                for key, _, _, _ in self.variants.get(query_name, []):
+                    variant = data[key]
+                    if not variant['times']:
+                        continue
+                    variant_avg_time = statistics.mean(variant['times'])
+                    variant_stats = self.time_stats(variant['times'])
+                    summary[query_name][f'{key}_avg_time_ms'] = round(variant_avg_time, 2)
+                    summary[query_name][f'{key}_median_time_ms'] = round(variant_stats['median'], 2)
+                    summary[query_name][f'{key}_stddev_time_ms'] = round(variant_stats['stddev'], 2)
+                    summary[query_name][f'{key}_p95_time_ms'] = round(variant_stats['p95'], 2)
+                    summary[query_name][f'{key}_avg_docs'] = round(statistics.mean(variant['docs']), 0) if variant['docs'] else 0
+                    summary[query_name][f'{key}_avg_keys'] = round(statistics.mean(variant['keys']), 0) if variant['keys'] else 0
+                    summary[query_name][f'{key}_speedup_vs_v1'] = round(v1_avg_time / variant_avg_time, 2) if variant_avg_time > 0 else 0
+                    summary[query_name][f'{key}_speedup_vs_v2'] = round(v2_avg_time / variant_avg_time, 2) if variant_avg_time > 0 else 0
+                
+                if query_name in self.profiles:
+                    summary[query_name]['profile'] = {
+                        version: {'summary': QueryProfiler.summarize(executions), 'executions': executions}
+                        for version, executions in self.profiles[query_name].items()
+                    }
         
         return summary
     
@@ -278,20 +541,25 @@ class PerformanceComparator:
         v2_times = [summary[q]['v2_avg_time_ms'] for q in queries]
         
         x = range(len(queries))
-        width = 0.35
+        series = [('V1 (Original)', v1_times, '#FF6B6B'), ('V2 (Optimized)', v2_times, '#4ECDC4')]
+        if all('columnar_avg_time_ms' in summary[q] for q in queries):
+            series.append(('Columnar engine', [summary[q]['columnar_avg_time_ms'] for q in queries], '#6A4C93'))
+        width = 0.7 / len(series)
         
-        bars1 = ax.bar([i - width/2 for i in x], v1_times, width, label='V1 (Original)', color='#FF6B6B', alpha=0.8)
-        bars2 = ax.bar([i + width/2 for i in x], v2_times, width, label='V2 (Optimized)', color='#4ECDC4', alpha=0.8)
+        all_bars = []
+        for index, (label, values, color) in enumerate(series):
+            offset = (index - (len(series) - 1) / 2) * width
+            all_bars.append(ax.bar([i + offset for i in x], values, width, label=label, color=color, alpha=0.8))
         
         ax.set_xlabel('Queries', fontsize=12, fontweight='bold')
         ax.set_ylabel('Execution Time (ms)', fontsize=12, fontweight='bold')
-        ax.set_title('Performance Comparison: V1 vs V2 - Execution Time', fontsize=14, fontweight='bold')
+        ax.set_title(f"Performance Comparison: {' vs '.join(label.split(' (')[0] for label, _, _ in series)} - Execution Time", fontsize=14, fontweight='bold')
         ax.set_xticks(x)
         ax.set_xticklabels(query_labels, rotation=15, ha='right')
         ax.legend(fontsize=11)
         ax.grid(axis='y', alpha=0.3)
         
-        for bars in [bars1, bars2]:
+        for bars in all_bars:
             for bar in bars:
                 height = bar.get_height()
                 ax.text(bar.get_x() + bar.get_width()/2., height,
@@ -320,18 +588,32 @@ class PerformanceComparator:
         v1_keys_avg = statistics.mean(data['v1']['keys']) if data['v1']['keys'] else 0
         v2_keys_avg = statistics.mean(data['v2']['keys']) if data['v2']['keys'] else 0
         
+        labels = ['V1', 'V2']
+        times_avg = [v1_times_avg, v2_times_avg]
+        docs_avg = [v1_docs_avg, v2_docs_avg]
+        keys_avg = [v1_keys_avg, v2_keys_avg]
+        
+        for key, _, _, _ in self.variants.get(query_name, []):
+            variant = data[key]
+            if not variant['times']:
+                continue
+            labels.append(key.replace('_', ' ').upper())
+            times_avg.append(statistics.mean(variant['times']))
+            docs_avg.append(statistics.mean(variant['docs']) if variant['docs'] else 0)
+            keys_avg.append(statistics.mean(variant['keys']) if variant['keys'] else 0)
+        
         fig, axes = plt.subplots(1, 3, figsize=(15, 5))
-        fig.suptitle(f'{query_label} - Performance Metrics (V1 vs V2)', fontsize=14, fontweight='bold')
+        fig.suptitle(f'{query_label} - Performance Metrics ({" vs ".join(labels)})', fontsize=14, fontweight='bold')
         
         metrics = [
-            ('Execution Time (ms)', [v1_times_avg, v2_times_avg], axes[0]),
-            ('Total Docs Examined', [v1_docs_avg, v2_docs_avg], axes[1]),
-            ('Total Keys Examined', [v1_keys_avg, v2_keys_avg], axes[2])
+            ('Execution Time (ms)', times_avg, axes[0]),
+            ('Total Docs Examined', docs_avg, axes[1]),
+            ('Total Keys Examined', keys_avg, axes[2])
         ]
         
         for metric_name, values, ax in metrics:
-            colors = ['#FF6B6B', '#4ECDC4']
-            bars = ax.bar(['V1', 'V2'], values, color=colors, alpha=0.8)
+            colors = ['#FF6B6B', '#4ECDC4', '#FFD93D', '#6A4C93'][:len(values)]
+            bars = ax.bar(labels, values, color=colors, alpha=0.8)
             
             ax.set_ylabel(metric_name, fontsize=11, fontweight='bold')
             ax.set_title(metric_name, fontsize=12, fontweight='bold')
@@ -355,6 +637,58 @@ class PerformanceComparator:
         print(f"Graph saved: {filename}")
         plt.close()
     
+    def generate_sweep_graphs(self, output_dir: str = 'output/graphs'):
+        """Latency and docs examined against the fraction of matching documents, one graph per swept query"""
+        os.makedirs(output_dir, exist_ok=True)
+        series = [('v1', 'V1 (Original)', '#FF6B6B'), ('v2', 'V2 (Optimized)', '#4ECDC4'),
+                  ('v2_collscan', 'V2 forced COLLSCAN', '#FFD93D'), ('columnar', 'Columnar engine', '#6A4C93')]
+        
+        for query_name, sweep in self.sweeps.items():
+            points = sorted(sweep['points'], key=lambda point: point['fraction'])
+            fractions = [point['fraction'] * 100 for point in points]
+            
+            fig, axes = plt.subplots(1, 2, figsize=(15, 5))
+            fig.suptitle(f"{query_name} - Selectivity Sweep ({sweep['parameter']})", fontsize=14, fontweight='bold')
+            
+            for metric, metric_name, ax in [('median_time_ms', 'Median Execution Time (ms)', axes[0]),
+                                            ('docs', 'Docs Examined', axes[1])]:
+                for key, label, color in series:
+                    if key not in points[0]:
+                        continue
+                    values = [point[key][metric] if point[key][metric] is not None else float('nan') for point in points]
+                    ax.plot(fractions, values, marker='o', label=label, color=color)
+                if sweep['crossover']:
+                    ax.axvline(sweep['crossover']['fraction'] * 100, color='gray', linestyle='--',
+                               label=f"crossover ({sweep['parameter']}={sweep['crossover']['value']})")
+                ax.set_xlabel('Matching Documents (%)', fontsize=11, fontweight='bold')
+                ax.set_ylabel(metric_name, fontsize=11, fontweight='bold')
+                ax.set_title(metric_name, fontsize=12, fontweight='bold')
+                ax.grid(alpha=0.3)
+                ax.legend(fontsize=9)
+            
+            plt.tight_layout()
+            filename = f'{output_dir}/{query_name}_sweep.png'
+            plt.savefig(filename, dpi=300, bbox_inches='tight')
+            print(f"Graph saved: {filename}")
+            plt.close()
+    
+    def export_sweep(self, filepath: str):
+        """Exports selectivity sweep results to JSON"""
+        os.makedirs(os.path.dirname(filepath) if os.path.dirname(filepath) else '.', exist_ok=True)
+        output = {
+            'timestamp': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'iterations': self.iterations,
+            'warmup': self.warmup,
+            'measure_mode': self.measure_mode,
+            'profile_run_id': self.profiler.run_id if self.profiler else None,
+            'sweeps': self.sweeps
+        }
+        
+        with open(filepath, 'w', encoding='utf-8') as f:
+            json.dump(output, f, indent=2, ensure_ascii=False, default=str)
+        
+        print(f"\nSweep results exported to: {filepath}")
+    
     def export_results(self, filepath: str):
         """Exports results to JSON"""
         os.makedirs(os.path.dirname(filepath) if os.path.dirname(filepath) else '.', exist_ok=True)
@@ -370,6 +704,9 @@ class PerformanceComparator:
         output = {
             'timestamp': time.strftime('%Y-%m-%d %H:%M:%S'),
             'iterations': self.iterations,
+            'warmup': self.warmup,
+            'measure_mode': self.measure_mode,
+            'profile_run_id': self.profiler.run_id if self.profiler else None,
             'queries': summary,
             'totals': {
                 'total_v1_time_ms': round(total_v1_time, 2),
@@ -392,6 +729,27 @@ class PerformanceComparator:
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare V1 and V2 query performance")
+    parser.add_argument('--columnar', action='store_true',
+                        help="also run Q1-Q5 on the in-process columnar engine")
+    parser.add_argument('--columnar-path', default='output/columnar',
+                        help="memory-mapped columnar store, rebuilt when movies_optimized changed")
+    parser.add_argument('--iterations', type=int, default=3, help="timed runs per pipeline")
+    parser.add_argument('--warmup', type=int, default=1, help="untimed runs per pipeline before the timed ones")
+    parser.add_argument('--measure', choices=['single', 'explain-each'], default='single',
+                        help="single: timed runs execute only the pipeline, one explain afterwards; "
+                             "explain-each: explain after every timed run")
+    parser.add_argument('--profile', action='store_true',
+                        help="turn on the database profiler and attach server-side metrics from system.profile")
+    parser.add_argument('--cache', choices=['memory', 'mongo'],
+                        help="also run the V2 pipelines through the query result cache with this backend")
+    parser.add_argument('--sweep', nargs='*', metavar='QUERY',
+                        help=f"selectivity sweep instead of the comparison: V1, V2 and V2 as a collection scan across "
+                             f"predicate values ({', '.join(SWEEPS)}, default all)")
+    args = parser.parse_args()
+    if args.sweep and set(args.sweep) - set(SWEEPS):
+        parser.error(f"--sweep supports {', '.join(SWEEPS)}")
+    
     client = MongoClient('mongodb://localhost:27017/')
     db = client['SBP_DB']
     
@@ -405,8 +763,32 @@ if __name__ == "__main__":
     print(f"V1 (movies): {v1_count:,} documents")
     print(f"V2 (movies_optimized): {v2_count:,} documents")
     
-    comparator = PerformanceComparator(v1_collection, v2_collection, iterations=3)
-    comparator.run_comparison()
+    columnar_engine = ColumnarEngine.open_or_build(v2_collection, args.columnar_path) if args.columnar else None
+    
+    query_cache = None
+    if args.cache:
+        query_cache = QueryCache(db, MemoryBackend() if args.cache == 'memory' else MongoBackend(db['query_cache']))
+    
+    comparator = PerformanceComparator(v1_collection, v2_collection, iterations=args.iterations,
+                                       columnar_engine=columnar_engine, query_cache=query_cache,
+                                       warmup=args.warmup, measure_mode=args.measure,
+                                       profiler=QueryProfiler(db) if args.profile else None)
+    if comparator.profiler:
+        comparator.profiler.start()
+    try:
+        if args.sweep is not None:
+            comparator.run_sweep(args.sweep or list(SWEEPS))
+        else:
+            comparator.run_comparison()
+    finally:
+        if comparator.profiler:
+            comparator.profiler.stop()
+    if args.sweep is not None:
+        comparator.export_sweep('output/sweep_results.json')
+        comparator.generate_sweep_graphs()
+        exit(0)
+    if query_cache:
+        query_cache.report()
     
     summary = comparator.get_summary()
     print("\n" + "="*70)
@@ -423,9 +805,14 @@ if __name__ == "__main__":
     for query, metrics in summary.items():
         print(f"\n{query}:")
         print(f"  V1: {metrics['v1_avg_time_ms']}ms | V2: {metrics['v2_avg_time_ms']}ms")
+        print(f"  V1 median: {metrics['v1_median_time_ms']}ms ± {metrics['v1_stddev_time_ms']} (p95 {metrics['v1_p95_time_ms']}ms) | "
+              f"V2 median: {metrics['v2_median_time_ms']}ms ± {metrics['v2_stddev_time_ms']} (p95 {metrics['v2_p95_time_ms']}ms)")
         print(f"  V1 Docs: {metrics['v1_avg_docs']:.0f} | V2 Docs: {metrics['v2_avg_docs']:.0f}")
         print(f"  V1 Keys: {metrics['v1_avg_keys']:.0f} | V2 Keys: {metrics['v2_avg_keys']:.0f}")
         print(f"  Time Improvement: {metrics['time_improvement_percent']}% | Speedup: {metrics['speedup_factor']}x")
+        for key, _, label, _ in comparator.variants.get(query, []):
+            if f'{key}_avg_time_ms' in metrics:
+                print(f"  {label}: {metrics[f'{key}_avg_time_ms']}ms | Speedup vs V1: {metrics[f'{key}_speedup_vs_v1']}x")
         
         total_v1_time += metrics['v1_avg_time_ms']
         total_v2_time += metrics['v2_avg_time_ms']
@@ -0,0 +1,462 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Pipeline Optimizer - automatsko prevođenje V1 pipeline-a u V2
+Pravila iz ručno pisanih V2 query-ja (preimenovana polja, unapred izračunata
+polja umesto $addFields, $match pre $unwind, budžetska kategorija i nivo
+kvaliteta umesto opsega) primenjena na bilo koji V1 pipeline, uz proveru
+da su rezultati nad stvarnim podacima isti
+"""
+
+import argparse
+import copy
+import json
+import math
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import MongoClient
+
+from queries import registered_queries, QUERY_REGISTRY, V1_COLLECTION, V2_COLLECTION
+
+
+# Opis OptimizedMovieDocument-a u odnosu na MovieDocument (v1)
+V2_SCHEMA = {
+    # v1 putanja -> v2 putanja; missing_as_null: v2 čuva null tamo gde v1 polje ne postoji
+    'renames': {
+        'release_info.release_date.year': {'to': 'release_info.year', 'missing_as_null': True},
+        'release_info.release_date.month': {'to': 'release_info.month', 'missing_as_null': True},
+        'release_info.release_date.day': {'to': 'release_info.day', 'missing_as_null': True},
+        'release_info.release_date.full_date': {'to': 'release_info.full_date', 'missing_as_null': True}
+    },
+    # izraz (nad v2 putanjama) -> sačuvano polje; exact False: sačuvana vrednost je zaokružena
+    'computed': [
+        {'field': 'financial.roi', 'exact': False,
+         'expression': {'$multiply': [{'$divide': [{'$subtract': ['$financial.revenue', '$financial.budget']}, '$financial.budget']}, 100]}},
+        {'field': 'financial.profit', 'exact': True,
+         'expression': {'$subtract': ['$financial.revenue', '$financial.budget']}},
+        {'field': 'release_info.decade', 'exact': True,
+         'expression': {'$multiply': [{'$floor': {'$divide': ['$release_info.year', 10]}}, 10]}},
+        {'field': 'content_info.sorted_genres', 'exact': True,
+         'expression': {'$sortArray': {'input': '$content_info.genres', 'sortBy': 1}}},
+        {'field': 'production.company_count', 'exact': True,
+         'expression': {'$size': '$production.companies'}},
+        {'field': 'production.country_count', 'exact': True,
+         'expression': {'$size': '$production.countries'}}
+    ],
+    # opseg nad izvornim poljem -> sačuvana kategorija; granice [od, do) kao u models.py
+    'categories': [
+        {'field': 'financial.budget_category', 'source': 'financial.budget',
+         'bounds': [('low', None, 10_000_000), ('medium', 10_000_000, 50_000_000),
+                    ('high', 50_000_000, 100_000_000), ('blockbuster', 100_000_000, None)]},
+        {'field': 'ratings.quality_tier', 'source': 'ratings.vote_average',
+         'bounds': [('poor', None, 5.0), ('average', 5.0, 6.0), ('good', 6.0, 7.0), ('excellent', 7.0, None)]}
+    ]
+}
+
+# stages after which field names refer to the stage's output, not to stored documents
+RESHAPING_STAGES = {'$group', '$project', '$replaceRoot', '$replaceWith', '$bucket', '$bucketAuto',
+                     '$facet', '$count', '$sortByCount', '$unset'}
+
+
+def _operator(stage: Dict) -> str:
+    return next(iter(stage))
+
+
+def _reshape_index(pipeline: List[Dict]) -> int:
+    """Index of the first reshaping stage, or len(pipeline)"""
+    return next((i for i, stage in enumerate(pipeline) if _operator(stage) in RESHAPING_STAGES), len(pipeline))
+
+
+def _map_refs(node: Any, func) -> Any:
+    """Applies func to every '$field.path' reference in an expression ('$$variables' are left alone)"""
+    if isinstance(node, str) and node.startswith('$') and not node.startswith('$$'):
+        return '$' + func(node[1:])
+    if isinstance(node, dict):
+        return {key: _map_refs(value, func) for key, value in node.items()}
+    if isinstance(node, list):
+        return [_map_refs(item, func) for item in node]
+    return node
+
+
+def _replace_path(path: str, old: str, new: str) -> str:
+    if path == old or path.startswith(old + '.'):
+        return new + path[len(old):]
+    return path
+
+
+class PipelineOptimizer:
+    """Rewrites a V1 pipeline for the V2 schema with a fixed sequence of rules.
+
+    rename_fields      - v1 paths to their flattened v2 paths
+    stored_computations - expressions that equal a precomputed field become a
+                          field reference; $addFields that only alias a stored
+                          field are removed and their uses point at the field
+    match_before_unwind - $match predicates that do not touch the unwound array
+                          move in front of the $unwind
+    category_predicates - a range on budget/vote_average also gets the stored
+                          category; the range is dropped only when its bounds
+                          fall exactly on category boundaries
+
+    Every rule records a note; rules marked exact=False can change numeric
+    results slightly (stored ROI is rounded to two decimals).
+    """
+
+    def __init__(self, schema: Optional[Dict] = None):
+        self.schema = schema or V2_SCHEMA
+
+    def optimize(self, pipeline: List[Dict]) -> Tuple[List[Dict], List[Dict]]:
+        pipeline = copy.deepcopy(pipeline)
+        notes = []
+        for rule in (self.rename_fields, self.stored_computations, self.match_before_unwind, self.category_predicates):
+            pipeline = rule(pipeline, notes)
+        return pipeline, notes
+
+    # rename_fields
+
+    def _rename(self, path: str) -> str:
+        for old, spec in self.schema['renames'].items():
+            renamed = _replace_path(path, old, spec['to'])
+            if renamed != path:
+                return renamed
+        return path
+
+    def _rename_condition(self, old_path: str, condition: Any, notes: List[Dict]) -> Any:
+        spec = self.schema['renames'].get(old_path)
+        if not (spec and spec['missing_as_null'] and isinstance(condition, dict) and '$exists' in condition):
+            return condition
+
+        condition = dict(condition)
+        exists = condition.pop('$exists')
+        if exists:
+            if '$ne' in condition and condition['$ne'] is not None:
+                condition['$nin'] = [None, condition.pop('$ne')]
+            elif '$ne' not in condition:
+                condition['$ne'] = None
+        elif not condition:
+            condition = None
+        else:
+            condition['$exists'] = False
+            notes.append({'rule': 'rename_fields', 'exact': False,
+                          'detail': f"{old_path}: $exists false combined with other operators kept as is"})
+            return condition
+
+        notes.append({'rule': 'rename_fields', 'exact': True,
+                      'detail': f"{old_path}: $exists {str(exists).lower()} -> null check, v2 stores null for a missing date"})
+        return condition
+
+    def _rename_match(self, match: Dict, notes: List[Dict]) -> Dict:
+        renamed = {}
+        for key, condition in match.items():
+            if key in ('$and', '$or', '$nor'):
+                renamed[key] = [self._rename_match(clause, notes) for clause in condition]
+            elif key == '$expr':
+                renamed[key] = _map_refs(condition, self._rename)
+            else:
+                renamed[self._rename(key)] = self._rename_condition(key, condition, notes)
+        return renamed
+
+    def rename_fields(self, pipeline: List[Dict], notes: List[Dict]) -> List[Dict]:
+        reshape = _reshape_index(pipeline)
+        result = []
+
+        for i, stage in enumerate(pipeline):
+            operator, body = _operator(stage), stage[_operator(stage)]
+            if i > reshape:
+                result.append(stage)
+            elif operator == '$match':
+                result.append({operator: self._rename_match(body, notes)})
+            elif operator == '$sort':
+                result.append({operator: {self._rename(key): value for key, value in body.items()}})
+            elif operator == '$project':
+                result.append({operator: {
+                    (self._rename(key) if isinstance(value, (bool, int)) else key): _map_refs(value, self._rename)
+                    for key, value in body.items()
+                }})
+            else:
+                result.append({operator: _map_refs(body, self._rename)})
+
+        text = json.dumps(pipeline)
+        for old in sorted(old for old in self.schema['renames'] if old in text):
+            notes.append({'rule': 'rename_fields', 'exact': True, 'detail': f"{old} -> {self.schema['renames'][old]['to']}"})
+        return result
+
+    # stored_computations
+
+    def _replace_expressions(self, node: Any, used: List[Dict]) -> Any:
+        for spec in self.schema['computed']:
+            if node == spec['expression']:
+                if spec not in used:
+                    used.append(spec)
+                return f"${spec['field']}"
+        if isinstance(node, dict):
+            return {key: self._replace_expressions(value, used) for key, value in node.items()}
+        if isinstance(node, list):
+            return [self._replace_expressions(item, used) for item in node]
+        return node
+
+    def stored_computations(self, pipeline: List[Dict], notes: List[Dict]) -> List[Dict]:
+        reshape = _reshape_index(pipeline)
+        used = []
+        result = [
+            {_operator(stage): self._replace_expressions(stage[_operator(stage)], used)} if i <= reshape else stage
+            for i, stage in enumerate(pipeline)
+        ]
+        for spec in used:
+            notes.append({'rule': 'stored_computations', 'exact': spec['exact'],
+                          'detail': f"computed expression -> ${spec['field']}"
+                                    + ("" if spec['exact'] else " (stored value is rounded)")})
+
+        if reshape == len(pipeline):
+            return result           # no reshaping stage: the added fields are part of the output and stay
+
+        aliases = {}
+        cleaned = []
+        for i, stage in enumerate(result):
+            operator = _operator(stage)
+            if i > reshape:
+                cleaned.append(stage)
+                continue
+
+            if aliases:
+                def resolve(path):
+                    for alias, target in aliases.items():
+                        path = _replace_path(path, alias, target)
+                    return path
+                if operator == '$match':
+                    stage = {operator: {resolve(key) if not key.startswith('$') else key: value
+                                        for key, value in stage[operator].items()}}
+                else:
+                    stage = {operator: _map_refs(stage[operator], resolve)}
+
+            if operator in ('$addFields', '$set'):
+                kept = {}
+                for name, value in stage[operator].items():
+                    if isinstance(value, str) and value.startswith('$') and not value.startswith('$$'):
+                        aliases[name] = value[1:]
+                        notes.append({'rule': 'stored_computations', 'exact': True,
+                                      'detail': f"{operator} {name} removed, uses read {value}"})
+                    else:
+                        kept[name] = value
+                if not kept:
+                    continue
+                stage = {operator: kept}
+            cleaned.append(stage)
+
+        return cleaned
+
+    # match_before_unwind
+
+    def match_before_unwind(self, pipeline: List[Dict], notes: List[Dict]) -> List[Dict]:
+        pipeline = list(pipeline)
+        moved = True
+        while moved:
+            moved = False
+            for i in range(len(pipeline) - 1):
+                if _operator(pipeline[i]) != '$unwind' or _operator(pipeline[i + 1]) != '$match':
+                    continue
+
+                unwind = pipeline[i]['$unwind']
+                path = (unwind if isinstance(unwind, str) else unwind['path'])[1:]
+                created = {path} | ({unwind['includeArrayIndex']} if isinstance(unwind, dict) and unwind.get('includeArrayIndex') else set())
+
+                match = pipeline[i + 1]['$match']
+                movable = {key: condition for key, condition in match.items()
+                           if not key.startswith('$') and not any(key == field or key.startswith(field + '.') for field in created)}
+                if not movable:
+                    continue
+
+                remaining = {key: condition for key, condition in match.items() if key not in movable}
+                before = [{'$match': movable}]
+                if i > 0 and _operator(pipeline[i - 1]) == '$match' and not set(movable) & set(pipeline[i - 1]['$match']):
+                    before = [{'$match': dict(pipeline[i - 1]['$match'], **movable)}]
+                    start = i - 1
+                else:
+                    start = i
+                pipeline = pipeline[:start] + before + [pipeline[i]] + ([{'$match': remaining}] if remaining else []) + pipeline[i + 2:]
+
+                notes.append({'rule': 'match_before_unwind', 'exact': True,
+                              'detail': f"{', '.join(movable)} filtered before $unwind {path}"
+                                        + (f"; {', '.join(remaining)} stays after it" if remaining else "")})
+                moved = True
+                break
+
+        return pipeline
+
+    # category_predicates
+
+    @staticmethod
+    def _interval(condition: Any) -> Optional[Tuple]:
+        """(low, low_inclusive, high, high_inclusive) of a pure range condition, None otherwise"""
+        if not isinstance(condition, dict) or not condition or not set(condition) <= {'$gt', '$gte', '$lt', '$lte'}:
+            return None
+        low, low_inclusive, high, high_inclusive = None, False, None, False
+        for operator, value in condition.items():
+            if not isinstance(value, (int, float)) or isinstance(value, bool):
+                return None
+            if operator in ('$gt', '$gte') and (low is None or value > low or (value == low and operator == '$gt')):
+                low, low_inclusive = value, operator == '$gte'
+            if operator in ('$lt', '$lte') and (high is None or value < high or (value == high and operator == '$lt')):
+                high, high_inclusive = value, operator == '$lte'
+        return low, low_inclusive, high, high_inclusive
+
+    def category_predicates(self, pipeline: List[Dict], notes: List[Dict]) -> List[Dict]:
+        result = []
+        leading = True
+
+        for stage in pipeline:
+            if not (leading and _operator(stage) == '$match'):
+                leading = False
+                result.append(stage)
+                continue
+
+            match = dict(stage['$match'])
+            for spec in self.schema['categories']:
+                interval = self._interval(match.get(spec['source']))
+                if interval is None or spec['field'] in match:
+                    continue
+
+                low, low_inclusive, high, high_inclusive = interval
+                selected = [
+                    (name, category_low, category_high) for name, category_low, category_high in spec['bounds']
+                    if (category_high is None or low is None or low < category_high)
+                    and (category_low is None or high is None or high > category_low or (high == category_low and high_inclusive))
+                ]
+                if not selected or len(selected) == len(spec['bounds']):
+                    continue
+
+                exact_low = low is None or (low_inclusive and low == selected[0][1])
+                exact_high = high is None or (not high_inclusive and high == selected[-1][2])
+                names = [name for name, _, _ in selected]
+                category = {'$in': names} if len(names) > 1 else names[0]
+
+                if exact_low and exact_high:
+                    match = {(spec['field'] if key == spec['source'] else key): (category if key == spec['source'] else value)
+                             for key, value in match.items()}
+                    detail = f"{spec['source']} range -> {spec['field']} {names}"
+                else:
+                    match = dict({spec['field']: category}, **match)
+                    detail = (f"{spec['field']} {names} added in front of the {spec['source']} range, "
+                              f"which stays because its bound is not a category boundary")
+                notes.append({'rule': 'category_predicates', 'exact': True, 'detail': detail})
+
+            result.append({'$match': match})
+
+        return result
+
+
+def _same(expected: Any, actual: Any, tolerance: float) -> bool:
+    if isinstance(expected, bool) or isinstance(actual, bool):
+        return expected == actual
+    if isinstance(expected, (int, float)) and isinstance(actual, (int, float)):
+        return math.isclose(expected, actual, rel_tol=1e-6, abs_tol=tolerance)
+    if isinstance(expected, dict) and isinstance(actual, dict):
+        return expected.keys() == actual.keys() and all(_same(expected[key], actual[key], tolerance) for key in expected)
+    if isinstance(expected, list) and isinstance(actual, list):
+        return len(expected) == len(actual) and all(_same(e, a, tolerance) for e, a in zip(expected, actual))
+    return expected == actual
+
+
+def _sort_key(document: Dict) -> str:
+    def rounded(value):
+        if isinstance(value, float):
+            return round(value, 1)
+        if isinstance(value, dict):
+            return {key: rounded(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [rounded(item) for item in value]
+        return value
+    return json.dumps(rounded(document), sort_keys=True, default=str)
+
+
+def verify(v1_collection, v2_collection, original: List[Dict], optimized: List[Dict], exact: bool = True) -> Dict:
+    """Runs the original on the v1 collection and the rewrite on the v2 collection and compares the results.
+
+    Results of a pipeline with $sort are compared in order; when that fails only
+    because of ties, the result is reported as equivalent up to tie order.
+    """
+    tolerance = 0.0 if exact else 0.01
+
+    start = time.perf_counter()
+    expected = list(v1_collection.aggregate(original, allowDiskUse=True))
+    v1_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    actual = list(v2_collection.aggregate(optimized, allowDiskUse=True))
+    v2_ms = (time.perf_counter() - start) * 1000
+
+    same_order = _same(expected, actual, tolerance)
+    same_set = same_order or _same(sorted(expected, key=_sort_key), sorted(actual, key=_sort_key), tolerance)
+
+    record = {
+        'equivalent': same_set,
+        'order': 'same' if same_order else ('ties reordered' if same_set else 'different'),
+        'expected_documents': len(expected),
+        'actual_documents': len(actual),
+        'v1_ms': round(v1_ms, 2),
+        'v2_ms': round(v2_ms, 2),
+        'speedup': round(v1_ms / v2_ms, 2) if v2_ms > 0 else 0
+    }
+    if not same_set:
+        mismatch = next(((e, a) for e, a in zip(sorted(expected, key=_sort_key), sorted(actual, key=_sort_key))
+                         if not _same(e, a, tolerance)), None)
+        record['first_mismatch'] = {'expected': mismatch[0], 'actual': mismatch[1]} if mismatch else None
+    return record
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rewrite V1 pipelines for the V2 schema and verify the results")
+    parser.add_argument('--queries', nargs='+', help="registered V1 queries to rewrite, e.g. query_1 query_5 (default: all)")
+    parser.add_argument('--pipeline', help="JSON file with a V1 pipeline to rewrite instead of the registered ones")
+    parser.add_argument('--no-verify', action='store_true', help="only print the rewritten pipelines")
+    parser.add_argument('--output', default='output/optimized_pipelines.json')
+    args = parser.parse_args()
+
+    if args.pipeline:
+        with open(args.pipeline, 'r', encoding='utf-8') as f:
+            entries = [{'query': os.path.splitext(os.path.basename(args.pipeline))[0], 'pipeline': json.load(f)}]
+    else:
+        entries = registered_queries(('v1',), args.queries)
+    hand_written = {entry['query']: entry['pipeline'] for entry in QUERY_REGISTRY if entry['version'] == 'v2'}
+
+    client = MongoClient('mongodb://localhost:27017/')
+    db = client['SBP_DB']
+    optimizer = PipelineOptimizer()
+    records = []
+
+    for entry in entries:
+        optimized, notes = optimizer.optimize(entry['pipeline'])
+        exact = all(note['exact'] for note in notes)
+
+        print(f"\n{entry['query']}:")
+        for note in notes:
+            print(f"  [{note['rule']}] {note['detail']}")
+        print(f"  Optimized pipeline: {json.dumps(optimized, ensure_ascii=False)}")
+        if entry['query'] in hand_written:
+            print(f"  Matches hand-written V2: {'yes' if optimized == hand_written[entry['query']] else 'no'}")
+
+        record = {'query': entry['query'], 'optimized': optimized, 'notes': notes, 'exact': exact}
+        if not args.no_verify:
+            try:
+                record['verification'] = verify(db[V1_COLLECTION], db[V2_COLLECTION], entry['pipeline'], optimized, exact)
+                verification = record['verification']
+                print(f"  Equivalent: {'yes' if verification['equivalent'] else 'NO'} ({verification['order']} order, "
+                      f"{verification['expected_documents']} vs {verification['actual_documents']} documents"
+                      + ("" if exact else ", numeric tolerance 0.01") + ")")
+                print(f"  V1: {verification['v1_ms']:.2f}ms | Optimized: {verification['v2_ms']:.2f}ms | Speedup: {verification['speedup']}x")
+            except Exception as e:
+                print(f"  Verification failed: {type(e).__name__}: {str(e)}")
+                record['verification'] = {'equivalent': None, 'error': f"{type(e).__name__}: {str(e)}"}
+        records.append(record)
+
+    os.makedirs(os.path.dirname(args.output) if os.path.dirname(args.output) else '.', exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump({'timestamp': time.strftime('%Y-%m-%d %H:%M:%S'), 'pipelines': records}, f, indent=2, ensure_ascii=False, default=str)
+    print(f"\nResults exported to: {args.output}")
+
+    return 1 if any(record.get('verification', {}).get('equivalent') is False for record in records) else 0
+
+
+if __name__ == "__main__":
+    exit(main())
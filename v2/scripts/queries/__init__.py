@@ -1 +1,30 @@
 # Queries module
+
+from .query_1 import QUERY_1_V1, QUERY_1_V2, QUERY_NAME as Q1_NAME
+from .query_2 import QUERY_2_V1, QUERY_2_V2, QUERY_NAME as Q2_NAME
+from .query_3 import QUERY_3_V1, QUERY_3_V2, QUERY_NAME as Q3_NAME
+from .query_4 import QUERY_4_V1, QUERY_4_V2, QUERY_NAME as Q4_NAME
+from .query_5 import QUERY_5_V1, QUERY_5_V2, QUERY_NAME as Q5_NAME
+
+
+V1_COLLECTION = 'movies'
+V2_COLLECTION = 'movies_optimized'
+
+# Registrovani query-ji: jedan unos po (query, verzija) - dashboard ih izvršava sve
+QUERY_REGISTRY = [
+    {'query': query_name, 'version': version, 'collection': collection, 'pipeline': pipeline, 'description': description}
+    for query_name, v1_pipeline, v2_pipeline, description in [
+        ('query_1', QUERY_1_V1, QUERY_1_V2, Q1_NAME),
+        ('query_2', QUERY_2_V1, QUERY_2_V2, Q2_NAME),
+        ('query_3', QUERY_3_V1, QUERY_3_V2, Q3_NAME),
+        ('query_4', QUERY_4_V1, QUERY_4_V2, Q4_NAME),
+        ('query_5', QUERY_5_V1, QUERY_5_V2, Q5_NAME)
+    ]
+    for version, collection, pipeline in [('v1', V1_COLLECTION, v1_pipeline), ('v2', V2_COLLECTION, v2_pipeline)]
+]
+
+
+def registered_queries(versions=('v1', 'v2'), queries=None):
+    """Registry entries for the given versions, optionally limited to some query names"""
+    return [entry for entry in QUERY_REGISTRY
+            if entry['version'] in versions and (queries is None or entry['query'] in queries)]
@@ -0,0 +1,30 @@
+"""
+Granice kategorija iz models.py (categorize_budget / categorize_quality)
+V2 query-ji prag nad budžetom ili ocenom prevode u skup kategorija koje
+pokrivaju vrednosti iznad praga
+"""
+
+# (kategorija, donja granica) - kategorija važi do donje granice sledeće
+BUDGET_CATEGORIES = [('low', 0), ('medium', 10_000_000), ('high', 50_000_000), ('blockbuster', 100_000_000)]
+QUALITY_TIERS = [('poor', 0.0), ('average', 5.0), ('good', 6.0), ('excellent', 7.0)]
+
+
+def categories_above(categories, threshold):
+    """Names of the categories holding values above threshold, and whether threshold is a category boundary"""
+    names = [name for i, (name, _) in enumerate(categories)
+             if i + 1 == len(categories) or categories[i + 1][1] > threshold]
+    return names, any(lower == threshold for _, lower in categories)
+
+
+def category_match(category_field, source_field, categories, threshold):
+    """$match predicates for `source_field > threshold` on the stored category.
+
+    When the threshold is a category boundary the category alone selects the
+    documents (as the hand-written V2 queries do); otherwise the range on the
+    source field stays next to it so the result matches V1.
+    """
+    names, boundary = categories_above(categories, threshold)
+    match = {category_field: names[0] if len(names) == 1 else {'$in': names}}
+    if not boundary:
+        match[source_field] = {'$gt': threshold}
+    return match
@@ -15,50 +15,80 @@ bez skeniranja cele kolekcije.
 
 """
 
+from .categories import BUDGET_CATEGORIES, category_match
+
+# Parametri: prag budžeta (podrazumevano 50M); selectivity sweep ga menja
+MIN_BUDGET = 50_000_000
+
+
 # V1: Neoptimizovan - direktni filter po budžetu
-QUERY_1_V1 = [
-    {
-        '$match': {
-            'financial.budget': {'$gt': 50000000},
-            'financial.revenue': {'$gt': 0}
+def query_1_v1(min_budget=MIN_BUDGET):
+    return [
+        {
+            '$match': {
+                'financial.budget': {'$gt': min_budget},
+                'financial.revenue': {'$gt': 0}
+            }
+        },
+        {
+            '$unwind': '$production.companies'
+        },
+        {
+            '$group': {
+                '_id': '$production.companies',
+                'avg_revenue': {'$avg': '$financial.revenue'},
+                'total_movies': {'$sum': 1},
+                'total_revenue': {'$sum': '$financial.revenue'}
+            }
+        },
+        {
+            '$sort': {'avg_revenue': -1}
+        },
+        {
+            '$limit': 20
         }
-    },
-    {
-        '$unwind': '$production.companies'
-    },
-    {
-        '$group': {
-            '_id': '$production.companies',
-            'avg_revenue': {'$avg': '$financial.revenue'},
-            'total_movies': {'$sum': 1},
-            'total_revenue': {'$sum': '$financial.revenue'}
-        }
-    },
-    {
-        '$sort': {'avg_revenue': -1}
-    },
-    {
-        '$limit': 20
-    }
-]
+    ]
+
 
 # V2: Optimizovan - koristi kategoriju budžeta + kompozitni indeks
-QUERY_1_V2 = [
-    {
-        '$match': {
-            'financial.budget_category': {'$in': ['high', 'blockbuster']},
-            'financial.revenue': {'$gt': 0}
+def query_1_v2(min_budget=MIN_BUDGET):
+    return [
+        {
+            '$match': {
+                **category_match('financial.budget_category', 'financial.budget', BUDGET_CATEGORIES, min_budget),
+                'financial.revenue': {'$gt': 0}
+            }
+        },
+        {
+            '$unwind': '$production.companies'
+        },
+        {
+            '$group': {
+                '_id': '$production.companies',
+                'avg_revenue': {'$avg': '$financial.revenue'},
+                'total_movies': {'$sum': 1},
+                'total_revenue': {'$sum': '$financial.revenue'}
+            }
+        },
+        {
+            '$sort': {'avg_revenue': -1}
+        },
+        {
+            '$limit': 20
         }
-    },
-    {
-        '$unwind': '$production.companies'
-    },
+    ]
+
+
+QUERY_1_V1 = query_1_v1()
+QUERY_1_V2 = query_1_v2()
+
+# ROLLUP: čita unapred agregiranu kolekciju rollup_company_revenue (rollups.py), bez skeniranja movies_optimized
+QUERY_1_ROLLUP = [
     {
-        '$group': {
-            '_id': '$production.companies',
-            'avg_revenue': {'$avg': '$financial.revenue'},
-            'total_movies': {'$sum': 1},
-            'total_revenue': {'$sum': '$financial.revenue'}
+        '$project': {
+            'avg_revenue': {'$divide': ['$total_revenue', '$total_movies']},
+            'total_movies': 1,
+            'total_revenue': 1
         }
     },
     {
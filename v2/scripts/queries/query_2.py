@@ -80,5 +80,21 @@ QUERY_2_V2 = [
     }
 ]
 
+# ROLLUP: čita unapred agregiranu kolekciju rollup_genre_decade (rollups.py), bez skeniranja movies_optimized
+QUERY_2_ROLLUP = [
+    {
+        '$project': {
+            'avg_rating': {'$divide': ['$rating_sum', '$movie_count']},
+            'movie_count': 1
+        }
+    },
+    {
+        '$sort': {
+            '_id.genre': 1,
+            '_id.decade': 1
+        }
+    }
+]
+
 QUERY_NAME = "Query 2: Average Rating by Genre and Decade"
 QUERY_DESCRIPTION = "Prosečna ocena filmova po žanrovima kroz decenije"
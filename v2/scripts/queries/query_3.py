@@ -14,20 +14,68 @@ i agregaciju blockbuster filmova po mesecima.
 
 """
 
+from .categories import BUDGET_CATEGORIES, category_match
+
+# Parametri: prag budžeta za blockbuster (podrazumevano 100M); selectivity sweep ga menja
+MIN_BUDGET = 100_000_000
+
+
 # V1: Neoptimizovan - direktni budget filter i izdvajanje meseca
-QUERY_3_V1 = [
-    {
-        '$match': {
-            'financial.budget': {'$gt': 100000000},
-            'release_info.release_date.month': {'$exists': True}
+def query_3_v1(min_budget=MIN_BUDGET):
+    return [
+        {
+            '$match': {
+                'financial.budget': {'$gt': min_budget},
+                'release_info.release_date.month': {'$exists': True}
+            }
+        },
+        {
+            '$group': {
+                '_id': '$release_info.release_date.month',
+                'blockbuster_count': {'$sum': 1},
+                'avg_budget': {'$avg': '$financial.budget'},
+                'total_revenue': {'$sum': '$financial.revenue'}
+            }
+        },
+        {
+            '$sort': {'blockbuster_count': -1}
         }
-    },
+    ]
+
+
+# V2: Optimizovan - koristi budžetsku kategoriju + denormalizovan mesec + kompozitni indeks
+def query_3_v2(min_budget=MIN_BUDGET):
+    return [
+        {
+            '$match': {
+                **category_match('financial.budget_category', 'financial.budget', BUDGET_CATEGORIES, min_budget),
+                'release_info.month': {'$exists': True, '$ne': None}
+            }
+        },
+        {
+            '$group': {
+                '_id': '$release_info.month',
+                'blockbuster_count': {'$sum': 1},
+                'avg_budget': {'$avg': '$financial.budget'},
+                'total_revenue': {'$sum': '$financial.revenue'}
+            }
+        },
+        {
+            '$sort': {'blockbuster_count': -1}
+        }
+    ]
+
+
+QUERY_3_V1 = query_3_v1()
+QUERY_3_V2 = query_3_v2()
+
+# ROLLUP: čita unapred agregiranu kolekciju rollup_blockbuster_month (rollups.py), bez skeniranja movies_optimized
+QUERY_3_ROLLUP = [
     {
-        '$group': {
-            '_id': '$release_info.release_date.month',
-            'blockbuster_count': {'$sum': 1},
-            'avg_budget': {'$avg': '$financial.budget'},
-            'total_revenue': {'$sum': '$financial.revenue'}
+        '$project': {
+            'blockbuster_count': 1,
+            'avg_budget': {'$divide': ['$budget_sum', '$blockbuster_count']},
+            'total_revenue': 1
         }
     },
     {
@@ -35,20 +83,26 @@ QUERY_3_V1 = [
     }
 ]
 
-# V2: Optimizovan - koristi budžetsku kategoriju + denormalizovan mesec + kompozitni indeks
-QUERY_3_V2 = [
+# BUCKETS: čita release_month_buckets (bucket pattern, jedan dokument po godini/mesecu)
+QUERY_3_BUCKETS = [
     {
         '$match': {
-            'financial.budget_category': 'blockbuster',
-            'release_info.month': {'$exists': True, '$ne': None}
+            'categories.blockbuster.count': {'$gt': 0}
         }
     },
     {
         '$group': {
-            '_id': '$release_info.month',
-            'blockbuster_count': {'$sum': 1},
-            'avg_budget': {'$avg': '$financial.budget'},
-            'total_revenue': {'$sum': '$financial.revenue'}
+            '_id': '$month',
+            'blockbuster_count': {'$sum': '$categories.blockbuster.count'},
+            'budget_sum': {'$sum': '$categories.blockbuster.budget_sum'},
+            'total_revenue': {'$sum': '$categories.blockbuster.revenue_sum'}
+        }
+    },
+    {
+        '$project': {
+            'blockbuster_count': 1,
+            'avg_budget': {'$divide': ['$budget_sum', '$blockbuster_count']},
+            'total_revenue': 1
         }
     },
     {
@@ -12,6 +12,12 @@ i denormalizovano `content_info.sorted_genres`.
 Kombinacijom sa kompozitnim indeksom nad finansijskim i žanrovskim poljima postiže se 
 značajno brže filtriranje i grupisanje žanrovskih kombinacija.
 
+# PAROVI ŽANROVA:
+Grupisanje po celom nizu `sorted_genres` deli filmove na mnogo malih grupa
+(svaka tačna kombinacija je posebna grupa). Varijanta V2_PAIRS koristi unapred
+izračunato polje `content_info.genre_pairs` (svi parovi žanrova filma) sa multikey
+indeksom i računa profit i ROI po paru žanrova.
+
 """
 
 # V1: Neoptimizovan - računanje profita, ROI i sortiranje žanrova u pipeline-u
@@ -93,5 +99,62 @@ QUERY_4_V2 = [
     }
 ]
 
+# V2_PAIRS: Optimizovan - precomputed parovi žanrova + multikey indeks, grupisanje po paru
+QUERY_4_V2_PAIRS = [
+    {
+        '$match': {
+            'financial.revenue': {'$gt': 0},
+            'financial.budget': {'$gt': 0},
+            'content_info.genre_pairs': {'$exists': True, '$ne': []}
+        }
+    },
+    {
+        '$unwind': '$content_info.genre_pairs'
+    },
+    {
+        '$group': {
+            '_id': '$content_info.genre_pairs',
+            'avg_profit': {'$avg': '$financial.profit'},
+            'avg_roi': {'$avg': '$financial.roi'},
+            'total_profit': {'$sum': '$financial.profit'},
+            'movie_count': {'$sum': 1}
+        }
+    },
+    {
+        '$match': {
+            'movie_count': {'$gte': 10}
+        }
+    },
+    {
+        '$sort': {'avg_profit': -1}
+    },
+    {
+        '$limit': 20
+    }
+]
+
+# ROLLUP: čita unapred agregiranu kolekciju rollup_genre_pairs (rollups.py), bez skeniranja movies_optimized
+QUERY_4_PAIRS_ROLLUP = [
+    {
+        '$match': {
+            'movie_count': {'$gte': 10}
+        }
+    },
+    {
+        '$project': {
+            'avg_profit': {'$divide': ['$total_profit', '$movie_count']},
+            'avg_roi': {'$divide': ['$roi_sum', '$movie_count']},
+            'total_profit': 1,
+            'movie_count': 1
+        }
+    },
+    {
+        '$sort': {'avg_profit': -1}
+    },
+    {
+        '$limit': 20
+    }
+]
+
 QUERY_NAME = "Query 4: Most Profitable Genre Combinations"
 QUERY_DESCRIPTION = "Najprofitabilnije kombinacije žanrova"
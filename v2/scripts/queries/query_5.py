@@ -13,67 +13,106 @@ Time se filtriranje i agregacija po zemlji znatno ubrzava.
 
 """
 
+from .categories import QUALITY_TIERS, category_match
+
+# Parametri: prag ocene (podrazumevano 7.0) i minimalan broj filmova po zemlji (100)
+MIN_RATING = 7.0
+MIN_MOVIES = 100
+
+
 # V1: Neoptimizovan - unwind pa match
-QUERY_5_V1 = [
-    {
-        '$unwind': '$production.countries'
-    },
-    {
-        '$match': {
-            'production.countries': {'$ne': ''},
-            'content_info.runtime': {'$gt': 0},
-            'ratings.vote_average': {'$gt': 7.0}
+def query_5_v1(min_rating=MIN_RATING, min_movies=MIN_MOVIES):
+    return [
+        {
+            '$unwind': '$production.countries'
+        },
+        {
+            '$match': {
+                'production.countries': {'$ne': ''},
+                'content_info.runtime': {'$gt': 0},
+                'ratings.vote_average': {'$gt': min_rating}
+            }
+        },
+        {
+            '$group': {
+                '_id': '$production.countries',
+                'avg_runtime': {'$avg': '$content_info.runtime'},
+                'movie_count': {'$sum': 1},
+                'avg_rating': {'$avg': '$ratings.vote_average'}
+            }
+        },
+        {
+            '$match': {'movie_count': {'$gte': min_movies}}
+        },
+        {
+            '$sort': {'avg_runtime': -1}
+        },
+        {
+            '$limit': 20
         }
-    },
-    {
-        '$group': {
-            '_id': '$production.countries',
-            'avg_runtime': {'$avg': '$content_info.runtime'},
-            'movie_count': {'$sum': 1},
-            'avg_rating': {'$avg': '$ratings.vote_average'}
-        }
-    },
-    {
-        '$match': {'movie_count': {'$gte': 100}}
-    },
-    {
-        '$sort': {'avg_runtime': -1}
-    },
-    {
-        '$limit': 20
-    }
-]
+    ]
+
 
 # V2: Optimizovan - koristi kvalitet ocene + kompozitni indeks
-QUERY_5_V2 = [
-    {
-        '$match': {
-            'ratings.quality_tier': 'excellent',
-            'content_info.runtime': {'$gt': 0},
-            'production.countries': {'$exists': True, '$ne': []}
+def query_5_v2(min_rating=MIN_RATING, min_movies=MIN_MOVIES):
+    return [
+        {
+            '$match': {
+                **category_match('ratings.quality_tier', 'ratings.vote_average', QUALITY_TIERS, min_rating),
+                'content_info.runtime': {'$gt': 0},
+                'production.countries': {'$exists': True, '$ne': []}
+            }
+        },
+        {
+            '$unwind': '$production.countries'
+        },
+        {
+            '$group': {
+                '_id': '$production.countries',
+                'avg_runtime': {'$avg': '$content_info.runtime'},
+                'movie_count': {'$sum': 1},
+                'avg_rating': {'$avg': '$ratings.vote_average'}
+            }
+        },
+        {
+            '$match': {'movie_count': {'$gte': min_movies}}
+        },
+        {
+            '$sort': {'avg_runtime': -1}
+        },
+        {
+            '$limit': 20
         }
-    },
-    {
-        '$unwind': '$production.countries'
-    },
-    {
-        '$group': {
-            '_id': '$production.countries',
-            'avg_runtime': {'$avg': '$content_info.runtime'},
-            'movie_count': {'$sum': 1},
-            'avg_rating': {'$avg': '$ratings.vote_average'}
+    ]
+
+
+QUERY_5_V1 = query_5_v1()
+QUERY_5_V2 = query_5_v2()
+
+# ROLLUP: čita unapred agregiranu kolekciju rollup_country_runtime (rollups.py), bez skeniranja movies_optimized
+# (ocena 'excellent' je fiksirana pri izgradnji rollup-a, min_movies se primenjuje pri čitanju)
+def query_5_rollup(min_movies=MIN_MOVIES):
+    return [
+        {
+            '$match': {'movie_count': {'$gte': min_movies}}
+        },
+        {
+            '$project': {
+                'avg_runtime': {'$divide': ['$runtime_sum', '$movie_count']},
+                'movie_count': 1,
+                'avg_rating': {'$divide': ['$rating_sum', '$movie_count']}
+            }
+        },
+        {
+            '$sort': {'avg_runtime': -1}
+        },
+        {
+            '$limit': 20
         }
-    },
-    {
-        '$match': {'movie_count': {'$gte': 100}}
-    },
-    {
-        '$sort': {'avg_runtime': -1}
-    },
-    {
-        '$limit': 20
-    }
-]
+    ]
+
+
+QUERY_5_ROLLUP = query_5_rollup()
 
 QUERY_NAME = "Query 5: Average Runtime by Country (rating > 7)"
 QUERY_DESCRIPTION = "Prosečno trajanje filma po zemlji produkcije (ocena > 7.0, > 100 filmova)"
@@ -0,0 +1,188 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Query Cache - keš rezultata agregacija sa verzijom podataka
+Ključ je hash pipeline-a, kolekcije i "generacije" podataka koju init_db.py
+povećava pri svakom učitavanju, pa keš nikad ne vraća rezultate od pre učitavanja
+"""
+
+import copy
+import hashlib
+import os
+import sys
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from threading import Lock
+from typing import Dict, List, Optional
+
+import bson
+from pymongo import ASCENDING, ReturnDocument
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from tmdb_loader import current_generation         # bumped by both init_db.py loaders around every load
+
+
+def pipeline_key(namespace: str, pipeline: List[Dict], generation: int) -> str:
+    """Canonical hash: BSON keeps key order, which is part of a pipeline's meaning ($sort, $group _id)"""
+    encoded = bson.encode({'ns': namespace, 'pipeline': pipeline, 'generation': generation})
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class MemoryBackend:
+    """In-process LRU bounded by entry count and by the encoded size of the results.
+
+    put() stores a copy and get() returns one, so a caller that modifies a result
+    cannot change the cached entry.
+    """
+
+    def __init__(self, max_entries: int = 256, max_bytes: int = 64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self.evictions = 0
+        self.lock = Lock()
+
+    def get(self, key: str) -> Optional[List[Dict]]:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            self.entries.move_to_end(key)
+            return copy.deepcopy(entry[0])
+
+    def put(self, key: str, result: List[Dict], size: int):
+        if size > self.max_bytes:
+            return
+        with self.lock:
+            if key in self.entries:
+                self.total_bytes -= self.entries.pop(key)[1]
+            self.entries[key] = (copy.deepcopy(result), size)
+            self.total_bytes += size
+
+            while len(self.entries) > self.max_entries or self.total_bytes > self.max_bytes:
+                _, (_, evicted_size) = self.entries.popitem(last=False)
+                self.total_bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.total_bytes = 0
+
+
+class MongoBackend:
+    """Shared LRU in a MongoDB collection, usable across processes.
+
+    Entry and byte totals are kept in a counter document (<collection>_totals,
+    updated with $inc) and last_used is indexed, so eviction removes the least
+    recently used entries without scanning the cache.
+    """
+
+    MAX_DOCUMENT_BYTES = 15 * 1024 * 1024       # stay under the 16 MB document limit
+    TOTALS_ID = 'totals'
+
+    def __init__(self, collection, max_entries: int = 256, max_bytes: int = 256 * 1024 * 1024):
+        self.collection = collection
+        self.totals = collection.database[f"{collection.name}_totals"]
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.evictions = 0
+        self.collection.create_index([('last_used', ASCENDING)])
+        if self.totals.find_one({'_id': self.TOTALS_ID}) is None:
+            self._recount()
+
+    def _recount(self):
+        """One-time count for a cache collection that has no totals document yet"""
+        stats = next(self.collection.aggregate([
+            {'$group': {'_id': None, 'entries': {'$sum': 1}, 'bytes': {'$sum': '$size'}}}
+        ]), {'entries': 0, 'bytes': 0})
+        self.totals.replace_one({'_id': self.TOTALS_ID}, {'entries': stats['entries'], 'bytes': stats['bytes']}, upsert=True)
+
+    def _add(self, entries: int, size: int) -> Dict:
+        return self.totals.find_one_and_update(
+            {'_id': self.TOTALS_ID},
+            {'$inc': {'entries': entries, 'bytes': size}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+
+    def get(self, key: str) -> Optional[List[Dict]]:
+        entry = self.collection.find_one_and_update({'_id': key}, {'$set': {'last_used': time.time()}})
+        return entry['result'] if entry else None
+
+    def put(self, key: str, result: List[Dict], size: int):
+        if size > min(self.max_bytes, self.MAX_DOCUMENT_BYTES):
+            return
+        previous = self.collection.find_one_and_replace(
+            {'_id': key},
+            {'_id': key, 'result': result, 'size': size, 'last_used': time.time()},
+            projection={'size': 1},
+            upsert=True
+        )
+        totals = self._add(0 if previous else 1, size - (previous['size'] if previous else 0))
+        self._evict(totals['entries'], totals['bytes'])
+
+    def _evict(self, entries: int, total_bytes: int):
+        if entries <= self.max_entries and total_bytes <= self.max_bytes:
+            return
+
+        for entry in self.collection.find({}, {'size': 1}).sort('last_used', ASCENDING):
+            if entries <= self.max_entries and total_bytes <= self.max_bytes:
+                break
+            if self.collection.delete_one({'_id': entry['_id']}).deleted_count:    # another process may have evicted it
+                self._add(-1, -entry['size'])
+                self.evictions += 1
+            entries -= 1
+            total_bytes -= entry['size']
+
+    def clear(self):
+        self.collection.delete_many({})
+        self.totals.replace_one({'_id': self.TOTALS_ID}, {'entries': 0, 'bytes': 0}, upsert=True)
+
+
+class QueryCache:
+    """Caches aggregate() results per (pipeline, collection, data generation).
+
+    Every lookup reads the current generation (one indexed find_one), so a
+    reload is visible immediately. Inside pinned_generation() the generation is
+    read once for the whole block - a dashboard render or a benchmark run -
+    and hits are served from memory without touching MongoDB.
+    """
+
+    def __init__(self, db, backend=None):
+        self.db = db
+        self.backend = backend or MemoryBackend()
+        self.hits = 0
+        self.misses = 0
+        self._pinned = None
+
+    def generation(self) -> int:
+        return self._pinned if self._pinned is not None else current_generation(self.db)
+
+    @contextmanager
+    def pinned_generation(self):
+        self._pinned = current_generation(self.db)
+        try:
+            yield self._pinned
+        finally:
+            self._pinned = None
+
+    def aggregate(self, collection, pipeline: List[Dict], **kwargs) -> List[Dict]:
+        key = pipeline_key(collection.full_name, pipeline, self.generation())
+        result = self.backend.get(key)
+        if result is not None:
+            self.hits += 1
+            return result
+
+        self.misses += 1
+        result = list(collection.aggregate(pipeline, **kwargs))
+        self.backend.put(key, result, len(bson.encode({'result': result})))
+        return result
+
+    def report(self):
+        total = self.hits + self.misses
+        print(f"\nQuery cache ({type(self.backend).__name__}):")
+        print(f"  Hits: {self.hits:,} | Misses: {self.misses:,} | Hit rate: {(self.hits / total * 100) if total else 0:.1f}%")
+        print(f"  Evictions: {self.backend.evictions:,}")
@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Query Profiler - serverska merenja iz system.profile
+Za vreme benchmark-a uključuje MongoDB profiler, svako izvršavanje označava
+sa `comment` i posle iz system.profile čita millis, planSummary,
+docsExamined, keysExamined, nreturned i usedDisk koje je izmerio server
+"""
+
+import re
+import statistics
+import time
+from typing import Dict, List, Optional
+
+
+class QueryProfiler:
+    """Database profiler window for one benchmark run.
+
+    Every execution gets a comment "<run_id>|<query>|<version>|<iteration>";
+    getMore commands inherit the comment of their aggregate, so an execution's
+    numbers are the sum over all of its profile entries.
+    """
+
+    PROFILE_SIZE_MB = 64        # the default 1 MB system.profile can wrap during a long run
+
+    def __init__(self, db, run_id: Optional[str] = None, size_mb: int = PROFILE_SIZE_MB):
+        self.db = db
+        self.run_id = run_id or time.strftime('bench-%Y%m%d-%H%M%S')
+        self.size_mb = size_mb
+        self.previous_level = None
+        self.previous_slowms = None
+        self.started = None
+
+    def start(self):
+        previous = self.db.command('profile', -1)
+        self.previous_level = previous.get('was', 0)
+        self.previous_slowms = previous.get('slowms', 100)
+
+        if self.size_mb and self.previous_level == 0:
+            # system.profile can only be resized while profiling is off
+            if 'system.profile' in self.db.list_collection_names():
+                self.db['system.profile'].drop()
+            self.db.create_collection('system.profile', capped=True, size=self.size_mb * 1024 * 1024)
+
+        self.db.command('profile', 2)
+        self.started = time.time()
+        print(f"Database profiler on for '{self.db.name}', run id {self.run_id}")
+
+    def stop(self):
+        self.db.command('profile', self.previous_level, slowms=self.previous_slowms)
+        print(f"Database profiler restored to level {self.previous_level}")
+
+    def comment(self, query_name: str, version: str, iteration: int) -> str:
+        return f"{self.run_id}|{query_name}|{version}|{iteration}"
+
+    def collect(self, query_name: str, version: str) -> List[Dict]:
+        """Per-execution server metrics of one query/version, in iteration order"""
+        prefix = re.escape(f"{self.run_id}|{query_name}|{version}|")
+        executions = {}
+
+        for entry in self.db['system.profile'].find({'command.comment': {'$regex': f'^{prefix}'}}).sort('ts', 1):
+            comment = entry['command']['comment']
+            execution = executions.setdefault(comment, {
+                'iteration': int(comment.rsplit('|', 1)[1]),
+                'millis': 0,
+                'plan_summary': None,
+                'docs_examined': 0,
+                'keys_examined': 0,
+                'nreturned': 0,
+                'used_disk': False,
+                'operations': 0
+            })
+            execution['millis'] += entry.get('millis', 0)
+            execution['docs_examined'] += entry.get('docsExamined', 0)
+            execution['keys_examined'] += entry.get('keysExamined', 0)
+            execution['nreturned'] += entry.get('nreturned', 0)
+            execution['used_disk'] = execution['used_disk'] or bool(entry.get('usedDisk', False))
+            execution['operations'] += 1
+            if execution['plan_summary'] is None and entry.get('planSummary'):
+                execution['plan_summary'] = entry['planSummary']
+
+        return sorted(executions.values(), key=lambda execution: execution['iteration'])
+
+    @staticmethod
+    def summarize(executions: List[Dict]) -> Dict:
+        if not executions:
+            return {}
+
+        millis = [execution['millis'] for execution in executions]
+        return {
+            'executions': len(executions),
+            'median_millis': statistics.median(millis),
+            'max_millis': max(millis),
+            'docs_examined': statistics.median(execution['docs_examined'] for execution in executions),
+            'keys_examined': statistics.median(execution['keys_examined'] for execution in executions),
+            'nreturned': statistics.median(execution['nreturned'] for execution in executions),
+            'used_disk': any(execution['used_disk'] for execution in executions),
+            'plan_summaries': sorted({execution['plan_summary'] for execution in executions if execution['plan_summary']})
+        }
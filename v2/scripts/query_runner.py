@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Async Query Runner - paralelno izvršavanje registrovanih query-ja
+Koristi asinhroni PyMongo API (AsyncMongoClient) sa ograničenjem konkurentnosti,
+pa ceo dashboard traje približno koliko i najsporiji query
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from typing import Dict, List, Tuple
+
+from pymongo import AsyncMongoClient
+
+from queries import registered_queries
+
+
+class AsyncQueryRunner:
+    """Runs registry entries concurrently, at most `concurrency` in flight at once.
+
+    latency is measured from the moment a query gets its slot, so it does not
+    include the time spent waiting for one; that is reported separately as queued.
+    """
+
+    def __init__(self, uri: str = 'mongodb://localhost:27017/', database_name: str = 'SBP_DB', concurrency: int = 4):
+        self.uri = uri
+        self.database_name = database_name
+        self.concurrency = concurrency
+
+    async def _run_one(self, db, semaphore: asyncio.Semaphore, entry: Dict, started: float) -> Dict:
+        submitted = time.perf_counter()
+        async with semaphore:
+            start = time.perf_counter()
+            record = {
+                'query': entry['query'],
+                'version': entry['version'],
+                'queued_ms': round((start - submitted) * 1000, 2),
+                'start_ms': round((start - started) * 1000, 2)
+            }
+            try:
+                cursor = await db[entry['collection']].aggregate(entry['pipeline'], allowDiskUse=True)
+                documents = await cursor.to_list()
+                record['documents'] = len(documents)
+                record['error'] = None
+            except Exception as e:
+                record['documents'] = 0
+                record['error'] = f"{type(e).__name__}: {str(e)}"
+            end = time.perf_counter()
+
+        record['latency_ms'] = round((end - start) * 1000, 2)
+        record['end_ms'] = round((end - started) * 1000, 2)
+        return record
+
+    async def run_async(self, entries: List[Dict]) -> Tuple[List[Dict], float]:
+        client = AsyncMongoClient(self.uri, maxPoolSize=max(self.concurrency, 1))
+        try:
+            db = client[self.database_name]
+            semaphore = asyncio.Semaphore(self.concurrency)
+            started = time.perf_counter()
+            records = await asyncio.gather(*(self._run_one(db, semaphore, entry, started) for entry in entries))
+            makespan_ms = (time.perf_counter() - started) * 1000
+        finally:
+            await client.close()
+        return list(records), round(makespan_ms, 2)
+
+    def run(self, entries: List[Dict]) -> Tuple[List[Dict], float]:
+        return asyncio.run(self.run_async(entries))
+
+    @staticmethod
+    def summary(records: List[Dict], makespan_ms: float) -> Dict:
+        latencies = [record['latency_ms'] for record in records if record['error'] is None]
+        serial_ms = sum(latencies)
+        slowest_ms = max(latencies) if latencies else 0
+        return {
+            'queries': len(records),
+            'errors': sum(1 for record in records if record['error'] is not None),
+            'makespan_ms': makespan_ms,
+            'serial_ms': round(serial_ms, 2),
+            'slowest_ms': slowest_ms,
+            'speedup_vs_serial': round(serial_ms / makespan_ms, 2) if makespan_ms > 0 else 0,
+            'makespan_vs_slowest': round(makespan_ms / slowest_ms, 2) if slowest_ms > 0 else 0
+        }
+
+    def print_report(self, records: List[Dict], makespan_ms: float):
+        summary = self.summary(records, makespan_ms)
+        print(f"\nAsync run (concurrency {self.concurrency}):")
+        print(f"  {'query':<10} {'version':<8} {'latency ms':>12} {'queued ms':>10} {'docs':>8}")
+        for record in sorted(records, key=lambda r: (r['query'], r['version'])):
+            if record['error']:
+                print(f"  {record['query']:<10} {record['version']:<8} failed: {record['error']}")
+                continue
+            print(f"  {record['query']:<10} {record['version']:<8} {record['latency_ms']:>12.2f} {record['queued_ms']:>10.2f} {record['documents']:>8,}")
+
+        print(f"\n  Makespan: {summary['makespan_ms']:.2f}ms ({summary['makespan_vs_slowest']}x the slowest query, "
+              f"{summary['slowest_ms']:.2f}ms)")
+        print(f"  Sum of latencies (serial estimate): {summary['serial_ms']:.2f}ms | Speedup: {summary['speedup_vs_serial']}x")
+
+    def export(self, filepath: str, records: List[Dict], makespan_ms: float):
+        os.makedirs(os.path.dirname(filepath) if os.path.dirname(filepath) else '.', exist_ok=True)
+        output = {
+            'timestamp': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'concurrency': self.concurrency,
+            'summary': self.summary(records, makespan_ms),
+            'records': records
+        }
+
+        with open(filepath, 'w', encoding='utf-8') as f:
+            json.dump(output, f, indent=2, ensure_ascii=False)
+
+        print(f"\nResults exported to: {filepath}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the registered V1/V2 pipelines concurrently")
+    parser.add_argument('--uri', default='mongodb://localhost:27017/')
+    parser.add_argument('--database', default='SBP_DB')
+    parser.add_argument('--concurrency', type=int, default=4, help="queries in flight at once")
+    parser.add_argument('--versions', nargs='+', default=['v1', 'v2'], choices=['v1', 'v2'])
+    parser.add_argument('--queries', nargs='+', help="limit the run to these query names, e.g. query_1 query_4")
+    parser.add_argument('--export', default='output/async_run.json')
+    args = parser.parse_args()
+
+    entries = registered_queries(args.versions, args.queries)
+    runner = AsyncQueryRunner(args.uri, args.database, args.concurrency)
+
+    print(f"Running {len(entries)} pipelines with concurrency {args.concurrency}...")
+    records, makespan_ms = runner.run(entries)
+    runner.print_report(records, makespan_ms)
+    runner.export(args.export, records, makespan_ms)
+
+    return 1 if any(record['error'] for record in records) else 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,290 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Rollup Manager - materijalizovani agregati za movies_optimized
+Posle učitavanja gradi sumarne kolekcije pomoću $merge, a posle
+inkrementalnog učitavanja osvežava samo ključeve koji su se promenili
+"""
+
+import itertools
+import time
+from threading import Lock
+from typing import Any, Dict, List, Optional
+
+
+# Sume i brojači umesto proseka - prosek se ne može delimično osvežiti, suma može
+ROLLUPS = [
+    {
+        'query': 'query_1',
+        'name': 'rollup_company_revenue',
+        'match': {
+            'financial.budget_category': {'$in': ['high', 'blockbuster']},
+            'financial.revenue': {'$gt': 0}
+        },
+        'unwind': ['production.companies'],
+        'key': 'production.companies',
+        'accumulators': {
+            'total_revenue': {'$sum': '$financial.revenue'},
+            'total_movies': {'$sum': 1}
+        }
+    },
+    {
+        'query': 'query_2',
+        'name': 'rollup_genre_decade',
+        'match': {
+            'release_info.decade': {'$exists': True, '$ne': None},
+            'ratings.vote_average': {'$gt': 0}
+        },
+        'unwind': ['content_info.genres'],
+        'key': {'genre': 'content_info.genres', 'decade': 'release_info.decade'},
+        'accumulators': {
+            'rating_sum': {'$sum': '$ratings.vote_average'},
+            'movie_count': {'$sum': 1}
+        }
+    },
+    {
+        'query': 'query_3',
+        'name': 'rollup_blockbuster_month',
+        'match': {
+            'financial.budget_category': 'blockbuster',
+            'release_info.month': {'$exists': True, '$ne': None}
+        },
+        'unwind': [],
+        'key': 'release_info.month',
+        'accumulators': {
+            'blockbuster_count': {'$sum': 1},
+            'budget_sum': {'$sum': '$financial.budget'},
+            'total_revenue': {'$sum': '$financial.revenue'}
+        }
+    },
+    {
+        'query': 'query_4_pairs',       # sorted_genres is an array and cannot be a rollup _id, genre pairs can
+        'name': 'rollup_genre_pairs',
+        'match': {
+            'financial.revenue': {'$gt': 0},
+            'financial.budget': {'$gt': 0},
+            'content_info.genre_pairs': {'$exists': True, '$ne': []}
+        },
+        'unwind': ['content_info.genre_pairs'],
+        'key': 'content_info.genre_pairs',
+        'accumulators': {
+            'total_profit': {'$sum': '$financial.profit'},
+            'roi_sum': {'$sum': '$financial.roi'},
+            'movie_count': {'$sum': 1}
+        }
+    },
+    {
+        'query': 'query_5',
+        'name': 'rollup_country_runtime',
+        'match': {
+            'ratings.quality_tier': 'excellent',
+            'content_info.runtime': {'$gt': 0},
+            'production.countries': {'$exists': True, '$ne': []}
+        },
+        'unwind': ['production.countries'],
+        'key': 'production.countries',
+        'accumulators': {
+            'runtime_sum': {'$sum': '$content_info.runtime'},
+            'rating_sum': {'$sum': '$ratings.vote_average'},
+            'movie_count': {'$sum': 1}
+        }
+    }
+]
+
+BUDGET_CATEGORIES = ['low', 'medium', 'high', 'blockbuster']
+
+# Bucket pattern: jedan dokument po mesecu izlaska sa sumama po budžetskoj kategoriji
+# i listom id-jeva filmova - mesečne i godišnje analize čitaju stotine bucket-a umesto svih filmova
+RELEASE_MONTH_BUCKETS = {
+    'query': 'query_3_buckets',
+    'name': 'release_month_buckets',
+    'match': {
+        'release_info.year': {'$ne': None},
+        'release_info.month': {'$ne': None}
+    },
+    'unwind': [],
+    'key': {'year': 'release_info.year', 'month': 'release_info.month'},
+    'accumulators': dict(
+        {
+            'movie_count': {'$sum': 1},
+            'budget_sum': {'$sum': '$financial.budget'},
+            'revenue_sum': {'$sum': '$financial.revenue'},
+            'movie_ids': {'$push': '$_id'}
+        },
+        **{
+            f"{category}_{field}": {'$sum': {'$cond': [{'$eq': ['$financial.budget_category', category]}, value, 0]}}
+            for category in BUDGET_CATEGORIES
+            for field, value in [('count', 1), ('budget_sum', '$financial.budget'), ('revenue_sum', '$financial.revenue')]
+        }
+    ),
+    'project': {
+        'year': '$_id.year',
+        'month': '$_id.month',
+        'movie_count': 1,
+        'budget_sum': 1,
+        'revenue_sum': 1,
+        'categories': {
+            category: {
+                'count': f"${category}_count",
+                'budget_sum': f"${category}_budget_sum",
+                'revenue_sum': f"${category}_revenue_sum"
+            }
+            for category in BUDGET_CATEGORIES
+        },
+        'movie_ids': 1
+    }
+}
+
+ROLLUP_COLLECTIONS = {spec['query']: spec['name'] for spec in ROLLUPS + [RELEASE_MONTH_BUCKETS]}
+
+
+class RollupManager:
+    """Builds and refreshes the rollup collections of one source collection.
+
+    build   - recomputes every rollup from the whole source collection
+    refresh - recomputes only the keys touched since the last build/refresh;
+              the loader reports both the old and the new version of every
+              changed or deleted movie through track()
+    """
+
+    REFRESH_BATCH = 1000        # keys per restricted pipeline
+
+    def __init__(self, db, source, specs: Optional[List[Dict]] = None):
+        self.db = db
+        self.source = source
+        self.specs = specs if specs is not None else ROLLUPS
+        self.lock = Lock()
+        self.affected = {spec['name']: {} for spec in self.specs}
+
+    @staticmethod
+    def _key_paths(spec: Dict) -> Dict[str, str]:
+        key = spec['key']
+        return key if isinstance(key, dict) else {None: key}
+
+    @staticmethod
+    def _get(document: Dict, path: str) -> Any:
+        value = document
+        for part in path.split('.'):
+            if not isinstance(value, dict):
+                return None
+            value = value.get(part)
+        return value
+
+    def _document_keys(self, spec: Dict, document: Dict) -> List[Any]:
+        components = []
+        for name, path in self._key_paths(spec).items():
+            value = self._get(document, path)
+            if path in spec['unwind']:
+                components.append(value if isinstance(value, list) else [])
+            else:
+                components.append([value])
+
+        if not isinstance(spec['key'], dict):
+            return components[0]
+        names = list(spec['key'])
+        return [dict(zip(names, values)) for values in itertools.product(*components)]
+
+    def projection(self) -> Dict[str, int]:
+        """Fields the loader has to read from stored documents so track() can find their keys"""
+        return {path: 1 for spec in self.specs for path in self._key_paths(spec).values()}
+
+    def track(self, document: Dict):
+        """Marks every rollup key the document contributes to as affected"""
+        with self.lock:
+            for spec in self.specs:
+                affected = self.affected[spec['name']]
+                for key in self._document_keys(spec, document):
+                    affected[tuple(key.items()) if isinstance(key, dict) else key] = key
+
+    def pending_keys(self) -> int:
+        return sum(len(keys) for keys in self.affected.values())
+
+    def exists(self) -> bool:
+        existing = set(self.db.list_collection_names())
+        return all(spec['name'] in existing for spec in self.specs)
+
+    def _pipeline(self, spec: Dict, keys: Optional[List[Any]] = None) -> List[Dict]:
+        key_paths = self._key_paths(spec)
+        pipeline = [{'$match': spec['match']}]
+
+        if keys is not None:
+            # cheap pre-filter on the source fields, the exact key filter follows the $group
+            restrict = {}
+            for name, path in key_paths.items():
+                values = [key[name] for key in keys] if name is not None else keys
+                restrict[path] = {'$in': list({repr(value): value for value in values}.values())}
+            pipeline.append({'$match': restrict})
+
+        for path in spec['unwind']:
+            pipeline.append({'$unwind': f"${path}"})
+
+        group_id = {name: f"${path}" for name, path in key_paths.items()} if isinstance(spec['key'], dict) else f"${spec['key']}"
+        pipeline.append({'$group': dict({'_id': group_id}, **spec['accumulators'])})
+
+        if keys is not None:
+            pipeline.append({'$match': {'_id': {'$in': keys}}})
+
+        if spec.get('project'):
+            pipeline.append({'$project': spec['project']})
+
+        pipeline.append({'$merge': {'into': spec['name'], 'on': '_id', 'whenMatched': 'replace', 'whenNotMatched': 'insert'}})
+        return pipeline
+
+    def build(self) -> List[Dict]:
+        """Rebuilds every rollup from scratch"""
+        records = []
+
+        for spec in self.specs:
+            start = time.perf_counter()
+            self.db[spec['name']].drop()
+            list(self.source.aggregate(self._pipeline(spec), allowDiskUse=True))
+
+            records.append({
+                'name': spec['name'],
+                'query': spec['query'],
+                'documents': self.db[spec['name']].count_documents({}),
+                'keys_refreshed': None,
+                'time_ms': round((time.perf_counter() - start) * 1000, 2)
+            })
+
+        with self.lock:
+            self.affected = {spec['name']: {} for spec in self.specs}
+        return records
+
+    def refresh(self) -> List[Dict]:
+        """Recomputes only the affected keys; keys no longer produced by any movie disappear"""
+        records = []
+
+        with self.lock:
+            affected = self.affected
+            self.affected = {spec['name']: {} for spec in self.specs}
+
+        for spec in self.specs:
+            keys = list(affected[spec['name']].values())
+            start = time.perf_counter()
+            rollup = self.db[spec['name']]
+
+            for offset in range(0, len(keys), self.REFRESH_BATCH):
+                batch = keys[offset:offset + self.REFRESH_BATCH]
+                rollup.delete_many({'_id': {'$in': batch}})
+                list(self.source.aggregate(self._pipeline(spec, batch), allowDiskUse=True))
+
+            records.append({
+                'name': spec['name'],
+                'query': spec['query'],
+                'documents': rollup.count_documents({}),
+                'keys_refreshed': len(keys),
+                'time_ms': round((time.perf_counter() - start) * 1000, 2)
+            })
+
+        return records
+
+    @staticmethod
+    def print_report(records: List[Dict]):
+        if not records:
+            return
+
+        print(f"\nRollups:")
+        for record in records:
+            refreshed = f", {record['keys_refreshed']:,} keys refreshed" if record['keys_refreshed'] is not None else ""
+            print(f"  {record['name']}: {record['documents']:,} documents{refreshed}, {record['time_ms']:.0f}ms")